@@ -8,6 +8,7 @@ from alembic import context
 
 # Importe o target_metadata do seu arquivo de banco de dados
 from db.database import target_metadata # <--- Apenas esta importação é necessária aqui
+from utils.search import is_search_object
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -31,6 +32,11 @@ if config.config_file_name is not None:
 # ... etc.
 
 
+# Os objetos da busca textual (coluna tsvector, índice GIN, tabelas FTS5) são criados fora do metadata
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and is_search_object(name, type_))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -47,6 +53,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata, # Alembic usará este metadata completo
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -70,7 +77,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata # Alembic usará este metadata completo
+            connection=connection, target_metadata=target_metadata, # Alembic usará este metadata completo
+            include_object=include_object,
         )
 
         with context.begin_transaction():
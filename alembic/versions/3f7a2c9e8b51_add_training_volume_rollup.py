@@ -0,0 +1,71 @@
+"""add training volume rollup
+
+Revision ID: 3f7a2c9e8b51
+Revises: e6b1d9a4c7f2
+Create Date: 2026-10-18 16:05:37.904122
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a2c9e8b51'
+down_revision: Union[str, None] = 'e6b1d9a4c7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Início do período de uma data: semana começando na segunda-feira e mês
+PERIOD_STARTS = {
+    'postgresql': {
+        'week': "CAST(date_trunc('week', training_date) AS date)",
+        'month': "CAST(date_trunc('month', training_date) AS date)",
+    },
+    'sqlite': {
+        'week': "date(training_date, '-' || ((CAST(strftime('%w', training_date) AS integer) + 6) % 7) || ' days')",
+        'month': "date(training_date, 'start of month')",
+    },
+}
+
+
+def _backfill_sql(dialect: str) -> str:
+    # Volume de cada treino (séries x repetições x peso) somado por usuário e período
+    period_selects = ' UNION ALL '.join(
+        f"SELECT user_id, '{period}', {start}, sum(volume), count(*), sum(total_duration) "
+        f"FROM trainings GROUP BY user_id, {start}"
+        for period, start in PERIOD_STARTS[dialect].items()
+    )
+    return (
+        'WITH trainings AS ('
+        'SELECT t.user_id, t.training_date, t.total_duration, '
+        'coalesce(sum(e.sets_done * e.reps_done * e.weight_used), 0.0) AS volume '
+        'FROM executeddailytraining t LEFT JOIN executedexercise e ON e.daily_training_id = t.id '
+        'GROUP BY t.id, t.user_id, t.training_date, t.total_duration) '
+        'INSERT INTO trainingvolumerollup (user_id, period, period_start, volume, session_count, total_duration) '
+        f'{period_selects}'
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('trainingvolumerollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sqlmodel.sql.sqltypes.AutoString(length=5), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.Column('total_duration', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start')
+    )
+
+    # Preenche os totais com o histórico existente
+    op.execute(_backfill_sql(op.get_bind().dialect.name))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('trainingvolumerollup')
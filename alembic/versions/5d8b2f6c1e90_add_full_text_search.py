@@ -0,0 +1,100 @@
+"""add full text search
+
+Revision ID: 5d8b2f6c1e90
+Revises: a7c3e1f9d2b4
+Create Date: 2026-10-18 11:03:47.218934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8b2f6c1e90'
+down_revision: Union[str, None] = 'a7c3e1f9d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Snapshot do DDL que utils/search.py gerava quando esta migração foi criada. Fica fixo aqui (em vez de
+# chamar utils/search.py) para que a migração continue aplicando o mesmo schema mesmo se a busca mudar
+# depois; uma mudança na busca precisa de uma migração nova. tests/test_search_migration.py confere que
+# o snapshot continua igual ao schema criado pelo create_all.
+POSTGRESQL_DDL = {
+    'trainingsheetweek': [
+        "ALTER TABLE trainingsheetweek ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+        'CREATE INDEX ix_trainingsheetweek_search_vector ON trainingsheetweek USING GIN (search_vector)',
+    ],
+    'exercise': [
+        "ALTER TABLE exercise ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(target_muscle_group, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(equipment, '')), 'C')) STORED",
+        'CREATE INDEX ix_exercise_search_vector ON exercise USING GIN (search_vector)',
+    ],
+}
+
+SQLITE_DDL = {
+    'trainingsheetweek': [
+        "CREATE VIRTUAL TABLE trainingsheetweek_fts USING fts5(name, description, content='trainingsheetweek', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        'CREATE TRIGGER trainingsheetweek_fts_ai AFTER INSERT ON trainingsheetweek BEGIN '
+        'INSERT INTO trainingsheetweek_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END',
+        'CREATE TRIGGER trainingsheetweek_fts_ad AFTER DELETE ON trainingsheetweek BEGIN '
+        "INSERT INTO trainingsheetweek_fts(trainingsheetweek_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        'CREATE TRIGGER trainingsheetweek_fts_au AFTER UPDATE ON trainingsheetweek BEGIN '
+        "INSERT INTO trainingsheetweek_fts(trainingsheetweek_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        'INSERT INTO trainingsheetweek_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END',
+    ],
+    'exercise': [
+        "CREATE VIRTUAL TABLE exercise_fts USING fts5(name, target_muscle_group, equipment, content='exercise', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        'CREATE TRIGGER exercise_fts_ai AFTER INSERT ON exercise BEGIN '
+        'INSERT INTO exercise_fts(rowid, name, target_muscle_group, equipment) '
+        'VALUES (new.id, new.name, new.target_muscle_group, new.equipment); END',
+        'CREATE TRIGGER exercise_fts_ad AFTER DELETE ON exercise BEGIN '
+        'INSERT INTO exercise_fts(exercise_fts, rowid, name, target_muscle_group, equipment) '
+        "VALUES ('delete', old.id, old.name, old.target_muscle_group, old.equipment); END",
+        'CREATE TRIGGER exercise_fts_au AFTER UPDATE ON exercise BEGIN '
+        'INSERT INTO exercise_fts(exercise_fts, rowid, name, target_muscle_group, equipment) '
+        "VALUES ('delete', old.id, old.name, old.target_muscle_group, old.equipment); "
+        'INSERT INTO exercise_fts(rowid, name, target_muscle_group, equipment) '
+        'VALUES (new.id, new.name, new.target_muscle_group, new.equipment); END',
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Coluna gerada: o PostgreSQL preenche as linhas existentes e mantém o vetor atualizado
+        for statements in POSTGRESQL_DDL.values():
+            for statement in statements:
+                op.execute(statement)
+    elif dialect == 'sqlite':
+        for table_name, statements in SQLITE_DDL.items():
+            for statement in statements:
+                op.execute(statement)
+            # Indexa as linhas que já existem na tabela
+            op.execute(f"INSERT INTO {table_name}_fts({table_name}_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table_name in POSTGRESQL_DDL:
+            op.drop_index(f'ix_{table_name}_search_vector', table_name=table_name, postgresql_using='gin')
+            op.drop_column(table_name, 'search_vector')
+    elif dialect == 'sqlite':
+        for table_name in SQLITE_DDL:
+            fts = f'{table_name}_fts'
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
@@ -0,0 +1,62 @@
+"""add personal record
+
+Revision ID: 8b4e6d1f3a27
+Revises: 3f7a2c9e8b51
+Create Date: 2026-10-18 17:21:48.116390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6d1f3a27'
+down_revision: Union[str, None] = '3f7a2c9e8b51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Recordes a partir do histórico: para cada usuário e exercício, o maior peso e o maior 1RM estimado
+# (fórmula de Epley, arredondado em 2 casas), cada um com a primeira data em que foi alcançado
+BACKFILL_SQL = (
+    'WITH executions AS ('
+    'SELECT t.user_id, e.id_exercise AS exercise_id, e.weight_used, t.training_date, '
+    'CAST(round(CAST(CASE WHEN e.reps_done <= 1 THEN e.weight_used ELSE e.weight_used * (1 + e.reps_done / 30.0) END AS numeric), 2) AS float) AS one_rm '
+    'FROM executedexercise e JOIN executeddailytraining t ON e.daily_training_id = t.id), '
+    'best_weights AS ('
+    'SELECT user_id, exercise_id, weight_used, training_date, '
+    'row_number() OVER (PARTITION BY user_id, exercise_id ORDER BY weight_used DESC, training_date) AS position '
+    'FROM executions), '
+    'best_one_rms AS ('
+    'SELECT user_id, exercise_id, one_rm, training_date, '
+    'row_number() OVER (PARTITION BY user_id, exercise_id ORDER BY one_rm DESC, training_date) AS position '
+    'FROM executions) '
+    'INSERT INTO personalrecord (user_id, exercise_id, best_weight, best_weight_date, best_estimated_1rm, best_estimated_1rm_date) '
+    'SELECT w.user_id, w.exercise_id, w.weight_used, w.training_date, o.one_rm, o.training_date '
+    'FROM best_weights w JOIN best_one_rms o ON o.user_id = w.user_id AND o.exercise_id = w.exercise_id '
+    'WHERE w.position = 1 AND o.position = 1'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('personalrecord',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('best_weight', sa.Float(), nullable=False),
+    sa.Column('best_weight_date', sa.Date(), nullable=False),
+    sa.Column('best_estimated_1rm', sa.Float(), nullable=False),
+    sa.Column('best_estimated_1rm_date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercise.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id')
+    )
+
+    # Preenche os recordes com o histórico existente
+    op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('personalrecord')
@@ -0,0 +1,54 @@
+"""add popularity counters
+
+Revision ID: 9e4a7c2d5f13
+Revises: 5d8b2f6c1e90
+Create Date: 2026-10-18 12:20:05.331870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a7c2d5f13'
+down_revision: Union[str, None] = '5d8b2f6c1e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('exerciseexecutioncount',
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('execution_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercise.id'], ),
+    sa.PrimaryKeyConstraint('exercise_id')
+    )
+    op.create_index(op.f('ix_exerciseexecutioncount_execution_count'), 'exerciseexecutioncount', ['execution_count'], unique=False)
+    op.create_table('trainingsheetusercount',
+    sa.Column('training_sheet_week_id', sa.Integer(), nullable=False),
+    sa.Column('user_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['training_sheet_week_id'], ['trainingsheetweek.id'], ),
+    sa.PrimaryKeyConstraint('training_sheet_week_id')
+    )
+    op.create_index(op.f('ix_trainingsheetusercount_user_count'), 'trainingsheetusercount', ['user_count'], unique=False)
+
+    # Preenche os contadores com o histórico existente
+    op.execute(
+        'INSERT INTO exerciseexecutioncount (exercise_id, execution_count) '
+        'SELECT id_exercise, count(id) FROM executedexercise GROUP BY id_exercise'
+    )
+    op.execute(
+        'INSERT INTO trainingsheetusercount (training_sheet_week_id, user_count) '
+        'SELECT training_sheet_week_id, count(user_id) FROM trainingsheetweekuserlink GROUP BY training_sheet_week_id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_trainingsheetusercount_user_count'), table_name='trainingsheetusercount')
+    op.drop_table('trainingsheetusercount')
+    op.drop_index(op.f('ix_exerciseexecutioncount_execution_count'), table_name='exerciseexecutioncount')
+    op.drop_table('exerciseexecutioncount')
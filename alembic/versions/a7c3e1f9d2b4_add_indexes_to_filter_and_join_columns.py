@@ -0,0 +1,49 @@
+"""add indexes to filter and join columns
+
+Revision ID: a7c3e1f9d2b4
+Revises: 3e8fd4050122
+Create Date: 2026-10-18 10:12:31.502417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e1f9d2b4'
+down_revision: Union[str, None] = '3e8fd4050122'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Chaves estrangeiras usadas nos joins e nas cargas em lote
+    op.create_index(op.f('ix_executedexercise_daily_training_id'), 'executedexercise', ['daily_training_id'], unique=False)
+    op.create_index(op.f('ix_executedexercise_id_exercise'), 'executedexercise', ['id_exercise'], unique=False)
+    op.create_index(op.f('ix_physicalrecord_user_id'), 'physicalrecord', ['user_id'], unique=False)
+    op.create_index(op.f('ix_trainingsheetday_training_sheet_week_id'), 'trainingsheetday', ['training_sheet_week_id'], unique=False)
+
+    # Filtro do histórico de treinos por usuário e data
+    op.create_index('ix_executeddailytraining_user_id_training_date', 'executeddailytraining', ['user_id', 'training_date'], unique=False)
+
+    # Filtros case-insensitive (func.lower) de /user/filter e /exercise/filter
+    op.create_index('ix_user_lower_name', 'user', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_user_lower_objective', 'user', [sa.text('lower(objective)')], unique=False)
+    op.create_index('ix_exercise_lower_target_muscle_group', 'exercise', [sa.text('lower(target_muscle_group)')], unique=False)
+    op.create_index('ix_exercise_lower_equipment', 'exercise', [sa.text('lower(equipment)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_exercise_lower_equipment', table_name='exercise')
+    op.drop_index('ix_exercise_lower_target_muscle_group', table_name='exercise')
+    op.drop_index('ix_user_lower_objective', table_name='user')
+    op.drop_index('ix_user_lower_name', table_name='user')
+    op.drop_index('ix_executeddailytraining_user_id_training_date', table_name='executeddailytraining')
+    op.drop_index(op.f('ix_trainingsheetday_training_sheet_week_id'), table_name='trainingsheetday')
+    op.drop_index(op.f('ix_physicalrecord_user_id'), table_name='physicalrecord')
+    op.drop_index(op.f('ix_executedexercise_id_exercise'), table_name='executedexercise')
+    op.drop_index(op.f('ix_executedexercise_daily_training_id'), table_name='executedexercise')
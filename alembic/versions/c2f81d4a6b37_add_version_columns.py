@@ -0,0 +1,35 @@
+"""add version columns
+
+Revision ID: c2f81d4a6b37
+Revises: 9e4a7c2d5f13
+Create Date: 2026-10-18 13:41:22.804215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f81d4a6b37'
+down_revision: Union[str, None] = '9e4a7c2d5f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tabelas com versão de linha (usada nos ETags)
+VERSIONED_TABLES = ['user', 'exercise', 'physicalrecord', 'trainingsheetweek', 'executeddailytraining']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in VERSIONED_TABLES:
+        # server_default preenche as linhas existentes com a versão 1
+        op.add_column(table_name, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in VERSIONED_TABLES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,46 @@
+"""add latest physical record pointer
+
+Revision ID: d5c8a3e7f104
+Revises: 8b4e6d1f3a27
+Create Date: 2026-10-18 18:02:55.670213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5c8a3e7f104'
+down_revision: Union[str, None] = '8b4e6d1f3a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Registro mais recente de cada usuário e consultas por período
+    op.create_index('ix_physicalrecord_user_id_recorded_at', 'physicalrecord', ['user_id', 'recorded_at'], unique=False)
+
+    # batch_alter_table: o SQLite não aceita ALTER TABLE ADD CONSTRAINT
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('latest_physical_record_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_latest_physical_record_id'), ['latest_physical_record_id'], unique=False)
+        batch_op.create_foreign_key('fk_user_latest_physical_record_id', 'physicalrecord', ['latest_physical_record_id'], ['id'], ondelete='SET NULL')
+
+    # Preenche o ponteiro com o histórico existente
+    op.execute(
+        'UPDATE "user" SET latest_physical_record_id = ('
+        'SELECT id FROM physicalrecord WHERE physicalrecord.user_id = "user".id '
+        'ORDER BY recorded_at DESC, id DESC LIMIT 1)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_constraint('fk_user_latest_physical_record_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_user_latest_physical_record_id'))
+        batch_op.drop_column('latest_physical_record_id')
+    op.drop_index('ix_physicalrecord_user_id_recorded_at', table_name='physicalrecord')
@@ -0,0 +1,32 @@
+"""add daily training content hash
+
+Revision ID: e6b1d9a4c7f2
+Revises: c2f81d4a6b37
+Create Date: 2026-10-18 15:12:09.531607
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1d9a4c7f2'
+down_revision: Union[str, None] = 'c2f81d4a6b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Treinos já existentes ficam sem hash (NULL não conflita no índice único)
+    op.add_column('executeddailytraining', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_executeddailytraining_content_hash'), 'executeddailytraining', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_executeddailytraining_content_hash'), table_name='executeddailytraining')
+    with op.batch_alter_table('executeddailytraining') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -1,22 +1,106 @@
-from sqlmodel import SQLModel, create_engine
+import time
+from sqlmodel import SQLModel
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models.physical_record import PhysicalRecord
 from models.executed_daily_training import ExecutedDailyTraining
 from models.user import User
-from models.exercise import Exercise 
+from models.exercise import Exercise
 from models.executed_exercise import ExecutedExercise
 from models.training_sheet_day import TrainingSheetDay
 from models.models_links import TrainingSheetDayExerciseLink
 from models.training_sheet_week import TrainingSheetWeek
 from models.models_links import TrainingSheetWeekUserLink
+from models.popularity_counters import ExerciseExecutionCount, TrainingSheetUserCount
+from models.training_volume_rollup import TrainingVolumeRollup
+from models.personal_record import PersonalRecord
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True)
+# Configuração do pool de conexões, ajustável por variáveis de ambiente.
+# Some pool_size + max_overflow de todos os workers para não passar do max_connections do PostgreSQL.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Troca o driver síncrono da URL pelo equivalente assíncrono (asyncpg no PostgreSQL, aiosqlite no SQLite),
+# assim a mesma DATABASE_URL usada pelo alembic continua funcionando para a aplicação.
+def to_async_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    return url
+
+# Estatísticas de espera por conexão do pool, alimentadas por _TimedQueuePool
+_pool_stats = {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+# Pool que mede quanto tempo cada checkout esperou por uma conexão (inclui o pre-ping). A medição fica
+# no pool, e não na sessão, para que as requisições que não consultam o banco não peguem conexão.
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        waited = time.perf_counter() - start
+
+        _pool_stats["checkouts"] += 1
+        _pool_stats["wait_seconds_total"] += waited
+        _pool_stats["wait_seconds_max"] = max(_pool_stats["wait_seconds_max"], waited)
+        return connection
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    # SQLite em memória usa StaticPool, que não aceita dimensionamento
+    parsed = make_url(url)
+    if not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")):
+        options.update(poolclass=_TimedQueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+engine = create_async_engine(to_async_url(DATABASE_URL), **_engine_options(DATABASE_URL))
+
+# expire_on_commit=False: no asyncio não é possível recarregar atributos de forma implícita
+# depois do commit, então os objetos continuam com os valores já carregados.
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 target_metadata = SQLModel.metadata
 
-def create_db_and_tables():
-    target_metadata.create_all(engine)
+async def create_db_and_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(target_metadata.create_all)
+
+# Dependência do FastAPI: uma sessão por requisição, compartilhada por tudo que a requisição usar.
+# A conexão só é obtida do pool na primeira consulta, então rotas atendidas pela memória (ex.: o
+# catálogo de exercícios) não ocupam conexão.
+async def get_session():
+    async with async_session() as session:
+        yield session
 
+def get_pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    status = {"pool": pool.status(), **_pool_stats}
+    # Só os pools com fila (QueuePool) têm tamanho e overflow
+    if hasattr(pool, "size"):
+        capacity = pool.size() + DB_MAX_OVERFLOW
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=DB_MAX_OVERFLOW,
+            saturation=pool.checkedout() / capacity if capacity else 0.0,
+        )
+    if _pool_stats["checkouts"]:
+        status["wait_seconds_avg"] = _pool_stats["wait_seconds_total"] / _pool_stats["checkouts"]
+    return status
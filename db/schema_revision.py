@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from db.database import engine
+
+# Verificação do schema na inicialização sem create_all: compara a revisão gravada pelo alembic no
+# banco (tabela alembic_version) com a revisão head dos scripts de migração.
+# Descobrir a head exige carregar todos os scripts de alembic/versions, então o resultado é gravado
+# em SCHEMA_HEAD_CACHE_PATH, identificado pelos arquivos de migração (nome, tamanho e data de
+# alteração): os workers seguintes do mesmo deploy leem só o cache. SCHEMA_HEAD_REVISION permite
+# informar a head já conhecida (ex.: calculada no build da imagem), sem consultar os scripts.
+
+ALEMBIC_CONFIG_PATH = os.getenv("ALEMBIC_CONFIG_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+SCHEMA_HEAD_CACHE_PATH = os.getenv("SCHEMA_HEAD_CACHE_PATH", os.path.join(tempfile.gettempdir(), "muscleflow_alembic_head.json"))
+SCHEMA_HEAD_REVISION = os.getenv("SCHEMA_HEAD_REVISION")
+
+_VERSIONS_PATH = os.path.join(os.path.dirname(ALEMBIC_CONFIG_PATH), "alembic", "versions")
+
+def _versions_fingerprint() -> list:
+    return sorted(
+        [entry.name, entry.stat().st_size, entry.stat().st_mtime_ns]
+        for entry in os.scandir(_VERSIONS_PATH)
+        if entry.name.endswith(".py")
+    )
+
+def _read_cache(fingerprint: list) -> Optional[str]:
+    try:
+        with open(SCHEMA_HEAD_CACHE_PATH) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return cache.get("head") if cache.get("fingerprint") == fingerprint else None
+
+def _write_cache(fingerprint: list, head: str):
+    # Gravado em um arquivo temporário e renomeado, para que workers iniciando juntos não leiam um cache pela metade
+    try:
+        directory = os.path.dirname(SCHEMA_HEAD_CACHE_PATH) or "."
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as file:
+            json.dump({"fingerprint": fingerprint, "head": head}, file)
+        os.replace(file.name, SCHEMA_HEAD_CACHE_PATH)
+    except OSError:
+        pass  # Sem cache a próxima inicialização apenas calcula a head de novo
+
+def _alembic_head() -> str:
+    # Importado só quando o cache não vale: o alembic e os scripts de migração são lentos de carregar
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    heads = ScriptDirectory.from_config(Config(ALEMBIC_CONFIG_PATH)).get_heads()
+    if len(heads) != 1:
+        raise RuntimeError(f"Expected a single alembic head, found {len(heads)}: {', '.join(heads)}")
+    return heads[0]
+
+def expected_head_revision() -> str:
+    if SCHEMA_HEAD_REVISION:
+        return SCHEMA_HEAD_REVISION
+
+    fingerprint = _versions_fingerprint()
+    head = _read_cache(fingerprint)
+    if head is None:
+        head = _alembic_head()
+        _write_cache(fingerprint, head)
+    return head
+
+# Falha a inicialização se o banco não estiver na revisão head (migrações pendentes ou código antigo)
+async def check_schema_revision():
+    expected = expected_head_revision()
+    try:
+        async with engine.connect() as conn:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars().all()
+    except DBAPIError as exc:
+        raise RuntimeError("The database is not managed by alembic (alembic_version not found); run `alembic upgrade head`") from exc
+
+    if current != [expected]:
+        found = ", ".join(current) or "none"
+        raise RuntimeError(f"The database schema is at revision {found} but the code expects {expected}; run `alembic upgrade head`")
@@ -0,0 +1,14 @@
+from typing import List
+from pydantic import BaseModel
+
+class bulk_create_item_created(BaseModel):
+    index: int # Posição do item na lista enviada
+    id: int
+
+class bulk_create_item_error(BaseModel):
+    index: int # Posição do item na lista enviada
+    detail: str
+
+class bulk_create_response(BaseModel):
+    created: List[bulk_create_item_created]
+    errors: List[bulk_create_item_error]
\ No newline at end of file
@@ -0,0 +1,13 @@
+from typing import List
+from pydantic import BaseModel
+
+class import_csv_error(BaseModel):
+    line: int # Linha do arquivo CSV (a primeira linha é 1)
+    detail: str
+
+class import_csv_response(BaseModel):
+    imported: int # Treinos gravados
+    imported_exercises: int # Exercícios executados gravados
+    skipped_duplicates: int # Treinos ignorados por já terem sido importados (mesmo hash de conteúdo)
+    error_count: int # Total de linhas rejeitadas
+    errors: List[import_csv_error] # Apenas as primeiras linhas rejeitadas
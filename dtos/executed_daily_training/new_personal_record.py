@@ -0,0 +1,8 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class new_personal_record(BaseModel):
+    exercise_id: int
+    record: str # "weight" ou "estimated_1rm"
+    value: float
+    previous_value: Optional[float] = None # None quando é a primeira execução do exercício pelo usuário
@@ -0,0 +1,14 @@
+from datetime import date
+from typing import List
+from pydantic import BaseModel
+
+class physical_record_series_point(BaseModel):
+    id: int # ID do registro físico
+    recorded_at: date
+    value: float
+
+class physical_record_series_response(BaseModel):
+    user_id: int
+    metric: str
+    total_records: int # Registros no intervalo antes da redução
+    points: List[physical_record_series_point]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+class TrainingSheetBulkImportCreated(BaseModel):
+    index: int # Posição da ficha na lista enviada
+    id: int
+
+class TrainingSheetBulkImportError(BaseModel):
+    index: int # Posição da ficha na lista enviada
+    detail: str
+
+class TrainingSheetBulkImportResponse(BaseModel):
+    created: list[TrainingSheetBulkImportCreated]
+    errors: list[TrainingSheetBulkImportError]
\ No newline at end of file
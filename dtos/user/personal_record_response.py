@@ -0,0 +1,11 @@
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel
+
+class personal_record_response(BaseModel):
+    exercise_id: int
+    exercise_name: Optional[str] # None se o exercício não existe mais
+    best_weight: float
+    best_weight_date: date
+    best_estimated_1rm: float
+    best_estimated_1rm_date: date
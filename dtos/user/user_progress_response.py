@@ -0,0 +1,14 @@
+from datetime import date
+from typing import List
+from pydantic import BaseModel
+
+class user_progress_period(BaseModel):
+    period_start: date # Segunda-feira da semana ou primeiro dia do mês
+    volume: float # Soma de séries x repetições x peso
+    session_count: int
+    total_duration: int # em minutos
+
+class user_progress_response(BaseModel):
+    user_id: int
+    period: str # "week" ou "month"
+    periods: List[user_progress_period]
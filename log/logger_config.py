@@ -1,5 +1,142 @@
-import os
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# Logs gravados fora da thread da requisição: os loggers das rotas só colocam o registro em uma fila
+# (QueueHandler) e uma thread de fundo (QueueListener) formata e grava nos arquivos, com rotação.
+# Configuração por variáveis de ambiente:
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text ou json (uma linha JSON por registro)
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size")  # size (por tamanho) ou time (por horário)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Tamanho máximo de cada arquivo (size)
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")  # Quando rotacionar (time), como no TimedRotatingFileHandler
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # Arquivos antigos mantidos
+# Limite de mensagens iguais (mesmo modelo, números ignorados, ex.: "User with ID %s not found") por janela, para
+# os níveis de LOG_RATE_LIMIT_LEVELS. As excedentes são descartadas e contadas na próxima gravada. 0 desliga.
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_LIMIT_WINDOW = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "60"))
+LOG_RATE_LIMIT_LEVELS = {logging.getLevelName(level.strip().upper()) for level in os.getenv("LOG_RATE_LIMIT_LEVELS", "WARNING").split(",")}
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))  # Fração das mensagens INFO gravadas
+
+_DATE_FORMAT = '%Y/%m/%d %H:%M:%S'
+_RATE_LIMIT_MAX_KEYS = 10000
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+def _formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return _JsonFormatter(datefmt=_DATE_FORMAT)
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt=_DATE_FORMAT)
+
+def _file_handler(file_path: str) -> logging.Handler:
+    if LOG_ROTATION == "time":
+        handler = TimedRotatingFileHandler(file_path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    else:
+        handler = RotatingFileHandler(file_path, mode="a", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(_formatter())
+    return handler
+
+# Amostragem das mensagens INFO e limite por mensagem repetida, aplicados antes de enfileirar
+class _RateLimitFilter(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self._windows: dict[tuple, list] = {}  # chave -> [início da janela, gravadas, descartadas]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno == logging.INFO and LOG_INFO_SAMPLE_RATE < 1.0 and random.random() >= LOG_INFO_SAMPLE_RATE:
+            return False
+        if LOG_RATE_LIMIT <= 0 or record.levelno not in LOG_RATE_LIMIT_LEVELS:
+            return True
+
+        key = (record.levelno, re.sub(r"\d+", "#", str(record.msg)))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= LOG_RATE_LIMIT_WINDOW:
+                if len(self._windows) >= _RATE_LIMIT_MAX_KEYS:
+                    self._windows = {k: w for k, w in self._windows.items() if now - w[0] < LOG_RATE_LIMIT_WINDOW}
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, suppressed]
+            if window[1] >= LOG_RATE_LIMIT:
+                window[2] += 1
+                return False
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+
+        if suppressed:
+            # Só acrescenta ao modelo da mensagem: a junção com os argumentos fica na thread de fundo
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+# Coloca o registro na fila indicando o arquivo de destino. A mensagem segue como modelo + argumentos
+# (logger.info("... %s", valor)): a junção (getMessage) e a formatação ficam na thread de fundo.
+class _FileQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue, file_path: str):
+        super().__init__(log_queue)
+        self.file_path = file_path
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        if record.exc_info:
+            # A exceção não pode atravessar a fila (traceback com referências a frames)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.log_file = self.file_path
+        return record
+
+# Na thread de fundo, entrega cada registro ao handler de arquivo do seu destino
+class _FileDispatcher(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.file_handlers: dict[str, logging.Handler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        handler = self.file_handlers.get(getattr(record, "log_file", None))
+        if handler is not None:
+            handler.handle(record)
+
+    def close(self):
+        for handler in self.file_handlers.values():
+            handler.close()
+        super().close()
+
+_queue: queue.Queue = queue.Queue(-1)
+_dispatcher = _FileDispatcher()
+_listener = None
+_listener_lock = threading.Lock()
+
+def _stop_listener():
+    # Grava o que ainda está na fila antes de o processo terminar
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _dispatcher.close()
+
+def _ensure_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_queue, _dispatcher)
+            _listener.start()
+            atexit.register(_stop_listener)
 
 def get_logger(name: str, file_path: str) -> logging.Logger:
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -8,12 +145,11 @@ def get_logger(name: str, file_path: str) -> logging.Logger:
     logger.setLevel(logging.INFO)
 
     if not logger.handlers:
-        file_handler = logging.FileHandler(file_path, mode="a", encoding="utf-8")
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y/%m/%d %H:%M:%S'
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        if file_path not in _dispatcher.file_handlers:
+            _dispatcher.file_handlers[file_path] = _file_handler(file_path)
+        queue_handler = _FileQueueHandler(_queue, file_path)
+        queue_handler.addFilter(_RateLimitFilter())
+        logger.addHandler(queue_handler)
+        _ensure_listener()
 
     return logger
@@ -1,21 +1,70 @@
-from fastapi import FastAPI
-from routes.training_sheet_router import training_sheet_router
-from routes.executed_daily_training_router import daily_training_router
-from routes.exercise_router import exercise_router
-from routes.user_router import user_router 
-from routes.physical_record_router import physical_record_router
-from db.database import create_db_and_tables
+import os
+import time
+from fastapi import FastAPI, Request, status
+from fastapi.responses import PlainTextResponse
+from db.database import async_session, create_db_and_tables, engine, get_pool_status
+from db.schema_revision import check_schema_revision
+from utils.exercise_catalog import exercise_catalog
+from utils.lazy_routers import LazyRouters
+from utils.metrics import instrument_engine, metrics_registry, route_template, start_request_db_stats
+
+# Preparação do schema na inicialização: create_all (cria o que faltar, padrão para desenvolvimento)
+# ou check_revision (só confere a revisão do alembic, mais rápido; as migrações rodam no deploy)
+DB_SCHEMA_STARTUP = os.getenv("DB_SCHEMA_STARTUP", "create_all")
+# Com true, cada router é importado na primeira requisição ao seu caminho (ver utils/lazy_routers.py)
+LAZY_ROUTERS = os.getenv("LAZY_ROUTERS", "false").lower() in ("1", "true", "yes")
 
 app = FastAPI()
 
+# Mede cada comando SQL do engine; os totais são atribuídos à requisição em andamento
+instrument_engine(engine)
+
+# Latência, comandos SQL, tempo no banco e linhas por rota, expostos em /metrics
+@app.middleware("http")
+async def collect_metrics(request: Request, call_next):
+    db_stats = start_request_db_stats()
+    start = time.perf_counter()
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics_registry.observe_request(request.method, route_template(request), status_code, time.perf_counter() - start, db_stats)
+
 @app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+async def on_startup():
+    if DB_SCHEMA_STARTUP == "check_revision":
+        await check_schema_revision()
+    else:
+        await create_db_and_tables()
+    # Carrega o catálogo de exercícios em memória antes de atender as requisições
+    async with async_session() as session:
+        await exercise_catalog.load(session)
+
+#Registra os routers na aplicação: prefixo do caminho -> (módulo, router)
+routers = LazyRouters(app, {
+    "/user": ("routes.user_router", "user_router"),
+    "/exercise": ("routes.exercise_router", "exercise_router"),
+    "/daily_training": ("routes.executed_daily_training_router", "daily_training_router"),
+    "/edaily_trainingxercise": ("routes.executed_daily_training_router", "daily_training_router"),
+    "/training_sheet": ("routes.training_sheet_router", "training_sheet_router"),
+    "/physical_record": ("routes.physical_record_router", "physical_record_router"),
+})
+if LAZY_ROUTERS:
+    @app.middleware("http")
+    async def load_routers(request: Request, call_next):
+        routers.load_for_path(request.url.path)
+        return await call_next(request)
+else:
+    routers.load_all()
 
-#Registra o router na aplicação
-app.include_router(user_router)
-app.include_router(exercise_router)
-app.include_router(daily_training_router)
-app.include_router(training_sheet_router)
-app.include_router(physical_record_router)
+# Estado do pool de conexões (uso, overflow, saturação e espera por conexão) para dimensionar os workers
+@app.get("/health/db_pool", tags=["Health"])
+async def db_pool_status():
+    return get_pool_status()
 
+# Métricas por rota no formato texto do Prometheus
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,15 +1,22 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, List, TYPE_CHECKING
 from datetime import date
+from models.versioned import Versioned
 
 if TYPE_CHECKING:
     from models.executed_exercise import ExecutedExercise # Importa ExecutedExercise para evitar erro de referência circular
 
-class ExecutedDailyTraining(SQLModel, table=True):
+class ExecutedDailyTraining(Versioned, table=True):
+    # Índice para o filtro por usuário (e data) do histórico de treinos
+    __table_args__ = (Index("ix_executeddailytraining_user_id_training_date", "user_id", "training_date"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")  # FK para User
     training_date: date
     total_duration: int  # em minutos
     notes: Optional[str] = Field(default=None, nullable=True)  # Novo campo opcional
+    # SHA-256 do conteúdo do treino, preenchido só pela importação de CSV para ignorar treinos já importados
+    content_hash: Optional[str] = Field(default=None, max_length=64, unique=True, index=True)
     #1:N -> Um ExecutedDailyTraining pode ter N ExecutedExercise
     exercises: List["ExecutedExercise"] = Relationship(back_populates="daily_training") 
@@ -7,8 +7,8 @@ if TYPE_CHECKING:
 class ExecutedExercise(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     
-    daily_training_id: int = Field(foreign_key="executeddailytraining.id")  # FK para ExecutedDailyTraining
-    id_exercise: int = Field(foreign_key="exercise.id") # FK para Exercise
+    daily_training_id: int = Field(foreign_key="executeddailytraining.id", index=True)  # FK para ExecutedDailyTraining
+    id_exercise: int = Field(foreign_key="exercise.id", index=True) # FK para Exercise
     sets_done: int = Field(ge=1)
     reps_done: int = Field(ge=1)
     weight_used: float = Field(ge=0.0)
@@ -1,14 +1,17 @@
 from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import Index, func
 from typing import TYPE_CHECKING, List, Optional
 from utils.level_exercise import level_exercise
+from utils.search import register_search_index
 from models.training_sheet_day import TrainingSheetDayExerciseLink
+from models.versioned import Versioned
 
 if TYPE_CHECKING:
     from models.training_sheet_day import TrainingSheetDay
 
 
 #classe utilizada para armazenar os dados de um exercício e sets,reps e weight recomendados.
-class Exercise(SQLModel, table=True):
+class Exercise(Versioned, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     target_muscle_group: str 
@@ -23,4 +26,10 @@ class Exercise(SQLModel, table=True):
         back_populates="exercises",
         link_model=TrainingSheetDayExerciseLink
     )
-    
\ No newline at end of file
+
+# Índices de expressão usados pelo filtro case-insensitive de /exercise/filter
+Index("ix_exercise_lower_target_muscle_group", func.lower(Exercise.target_muscle_group))
+Index("ix_exercise_lower_equipment", func.lower(Exercise.equipment))
+
+# Busca textual de /exercise/search
+register_search_index(Exercise, {"name": "A", "target_muscle_group": "B", "equipment": "C"})
@@ -0,0 +1,14 @@
+from datetime import date
+from sqlmodel import Field, SQLModel
+
+# Recordes pessoais por usuário e exercício, mantidos na mesma transação das escritas em
+# ExecutedDailyTraining, para que /user/{id}/personal_records não percorra o histórico.
+# scripts/backfill_personal_records.py recalcula tudo a partir de ExecutedExercise.
+
+class PersonalRecord(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    exercise_id: int = Field(foreign_key="exercise.id", primary_key=True)
+    best_weight: float  # Maior peso usado
+    best_weight_date: date  # Primeiro treino com esse peso
+    best_estimated_1rm: float  # Maior 1RM estimado (fórmula de Epley)
+    best_estimated_1rm_date: date  # Primeiro treino com esse 1RM
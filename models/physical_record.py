@@ -1,18 +1,23 @@
 from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import Index
 from datetime import date
 from typing import TYPE_CHECKING, Optional
+from models.versioned import Versioned
 
 if TYPE_CHECKING:
     from models.user import User 
 
-class PhysicalRecord(SQLModel, table=True):
+class PhysicalRecord(Versioned, table=True):
+    # Índice para achar o registro mais recente de cada usuário e para as consultas por período
+    __table_args__ = (Index("ix_physicalrecord_user_id_recorded_at", "user_id", "recorded_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     weight: float
     height: float 
     body_fat_percentage: Optional[float] = None
     muscle_mass_percentage: Optional[float] = None
     recorded_at: date 
 
-    user: Optional["User"] = Relationship(back_populates="physical_record")
\ No newline at end of file
+    user: Optional["User"] = Relationship(back_populates="physical_record", sa_relationship_kwargs={"foreign_keys": "[PhysicalRecord.user_id]"})
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlmodel import Field, SQLModel
+
+# Contadores de popularidade mantidos na mesma transação das escritas que os alteram,
+# para que os rankings sejam uma leitura top-N pelo índice em vez de um GROUP BY sobre o histórico.
+# scripts/reconcile_popularity_counters.py recalcula os valores a partir das tabelas de origem.
+
+class ExerciseExecutionCount(SQLModel, table=True):
+    exercise_id: int = Field(foreign_key="exercise.id", primary_key=True)
+    execution_count: int = Field(default=0, index=True)  # Quantidade de ExecutedExercise do exercício
+
+class TrainingSheetUserCount(SQLModel, table=True):
+    training_sheet_week_id: int = Field(foreign_key="trainingsheetweek.id", primary_key=True)
+    user_count: int = Field(default=0, index=True)  # Quantidade de usuários associados à ficha
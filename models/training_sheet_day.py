@@ -10,7 +10,7 @@ if TYPE_CHECKING:
 class TrainingSheetDay(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     focus_area: Optional[str] = Field(default=None)
-    training_sheet_week_id: int = Field(foreign_key="trainingsheetweek.id")  
+    training_sheet_week_id: int = Field(foreign_key="trainingsheetweek.id", index=True)  
     day_of_week: day_week
 
     exercises: List["Exercise"] = Relationship(
@@ -1,13 +1,15 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import TYPE_CHECKING, List, Optional
 from utils.level_exercise import level_exercise
+from utils.search import register_search_index
 from models.models_links import TrainingSheetWeekUserLink
+from models.versioned import Versioned
 
 if TYPE_CHECKING:
     from models.training_sheet_day import TrainingSheetDay
     from models.user import User
 
-class TrainingSheetWeek(SQLModel, table=True):
+class TrainingSheetWeek(Versioned, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(max_length=100)
     description: Optional[str] = Field(default=None)
@@ -21,4 +23,7 @@ class TrainingSheetWeek(SQLModel, table=True):
     users: List["User"] = Relationship(
         back_populates="training_sheets",
         link_model=TrainingSheetWeekUserLink,
-    )
\ No newline at end of file
+    )
+
+# Busca textual de /training_sheet/search
+register_search_index(TrainingSheetWeek, {"name": "A", "description": "B"})
@@ -0,0 +1,14 @@
+from datetime import date
+from sqlmodel import Field, SQLModel
+
+# Totais de treino por usuário e período (semana começando na segunda-feira ou mês), mantidos na
+# mesma transação das escritas em ExecutedDailyTraining, para que /user/{id}/progress leia poucas
+# linhas em vez de percorrer o histórico. scripts/backfill_training_volume_rollups.py recalcula tudo.
+
+class TrainingVolumeRollup(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    period: str = Field(primary_key=True, max_length=5)  # "week" ou "month" (ver utils/progress_period.py)
+    period_start: date = Field(primary_key=True)  # Segunda-feira da semana ou primeiro dia do mês
+    volume: float = Field(default=0.0)  # Soma de séries x repetições x peso
+    session_count: int = Field(default=0)
+    total_duration: int = Field(default=0)  # em minutos
@@ -1,22 +1,38 @@
 from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import Column, ForeignKey, Index, Integer, func
 from datetime import date
 from typing import TYPE_CHECKING, List, Optional
 from models.physical_record import PhysicalRecord
 from models.training_sheet_week import TrainingSheetWeek
 from models.models_links import TrainingSheetWeekUserLink
+from models.versioned import Versioned
 
-class User(SQLModel, table=True):
+class User(Versioned, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     objective: str  
     registration_date: date
+    # Registro físico mais recente do usuário, mantido pelas rotas de registro físico (ver
+    # utils/latest_physical_record.py). use_alter porque physicalrecord também referencia user.
+    # Fica fora das respostas: é atualizado sem mudar a versão do usuário, da qual sai o ETag.
+    latest_physical_record_id: Optional[int] = Field(default=None, exclude=True, sa_column=Column(
+        Integer,
+        ForeignKey("physicalrecord.id", name="fk_user_latest_physical_record_id", use_alter=True, ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    ))
 
     physical_record: List["PhysicalRecord"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        # user também tem a FK latest_physical_record_id, então a relação indica a coluna usada
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "foreign_keys": "[PhysicalRecord.user_id]"}
 
     )    
     training_sheets: List["TrainingSheetWeek"] = Relationship(
         back_populates="users",
         link_model=TrainingSheetWeekUserLink
     )
+
+# Índices de expressão usados pelo filtro case-insensitive de /user/filter
+Index("ix_user_lower_name", func.lower(User.name))
+Index("ix_user_lower_objective", func.lower(User.objective))
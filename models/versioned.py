@@ -0,0 +1,22 @@
+from sqlalchemy import event
+from sqlalchemy.orm import declared_attr, object_session
+from sqlmodel import SQLModel, Field
+
+# Base para models com número de versão da linha, usado para gerar os ETags das rotas de leitura.
+# A versão é só um contador incrementado no próprio UPDATE feito pelo ORM (version = version + 1):
+# não há controle de concorrência, gravações simultâneas na mesma linha continuam valendo e cada
+# uma recebe uma versão diferente.
+class Versioned(SQLModel):
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+
+    # Busca a versão gerada pelo banco logo após o UPDATE (RETURNING), já que no asyncio
+    # o atributo não pode ser recarregado de forma implícita depois
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"eager_defaults": True}
+
+@event.listens_for(Versioned, "before_update", propagate=True)
+def _increment_version(mapper, connection, target):
+    # before_update também é chamado para objetos marcados como alterados sem mudança real
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = mapper.local_table.c.version + 1
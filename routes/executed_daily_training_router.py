@@ -1,369 +1,356 @@
 from datetime import date, datetime
-import math
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Response
-from fastapi.responses import FileResponse
-from sqlmodel import Session, func, select
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlmodel import func, insert, select
 from models.executed_daily_training import ExecutedDailyTraining
 from models.executed_exercise import ExecutedExercise
 from dtos.executed_daily_training.executed_daily_training_request import executed_daily_training_request
-from dtos.executed_daily_training.executed_exercise_dto import executed_exercise_dto
-from dtos.executed_daily_training.executed_daily_training_response import executed_daily_training_response 
+from dtos.executed_daily_training.bulk_create_response import bulk_create_item_created, bulk_create_item_error, bulk_create_response
+from dtos.executed_daily_training.new_personal_record import new_personal_record
 from models.executed_daily_training import ExecutedDailyTraining
 from log.logger_config import get_logger
-from db.database import engine
-from models.exercise import Exercise
+from db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
 from models.user import User
-from utils.pagination import PaginatedResponse, PaginationParams
+from utils.exercise_catalog import exercise_catalog
+from utils.personal_records import Execution, recompute_personal_records, update_personal_records
+from utils.popularity_counters import update_exercise_execution_counts
+from utils.training_volume_rollups import training_contribution, update_training_volume_rollups
+from utils.daily_training_export import CSV_FILENAME, HashedExportResponse, export_digest, zip_chunks
+from utils.daily_training_import import import_csv as import_daily_trainings_csv
+from utils.etag import entity_etag, list_etag, not_modified_response
+from utils.pagination import PaginatedResponse, PaginationParams, paginate
+from utils.totals import count_total
+from utils.total_mode import total_mode
+from utils.export_format import export_format
+from utils.daily_training_assembler import build_daily_training_responses
 
 logger = get_logger("daily_training_logger", "log/daily_training.log")
 
+# Limite de treinos aceitos por chamada do bulk_create
+BULK_CREATE_MAX_ITEMS = 1000
+
 daily_training_router = APIRouter(tags=["Executed daily training"])
 
 @daily_training_router.get("/daily_training/get_by_id/{user_id}")
-def get_by_id(training_id: int):
-    with Session(engine) as session:
-        statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
-        result = session.exec(statement).first()
-        if not result:
-            logger.warning(f"Executed daily training with ID {training_id} not found")
-            raise HTTPException(status_code=404, detail="Executed daily training not found")
-        
-        # Carrega os exercícios associados
-        executed_exercises = session.exec(
-            select(ExecutedExercise).where(ExecutedExercise.daily_training_id == result.id)
-        ).all()
-        
-        training = executed_daily_training_response(
-            id=result.id,
-            user_id=result.user_id,
-            training_date=result.training_date,
-            total_duration=result.total_duration,
-            notes = result.notes,
-            exercises=[
-                executed_exercise_dto(
-                    id_exercise=ex.id_exercise,
-                    sets_done=ex.sets_done,
-                    reps_done=ex.reps_done,
-                    weight_used=ex.weight_used
-                ) for ex in executed_exercises
-            ]
-        )
-        
-        logger.info(f"Successfully fetched executed daily training with ID {training_id}")
-        return training
+async def get_by_id(training_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
+    result = (await session.exec(statement)).first()
+    if not result:
+        logger.warning("Executed daily training with ID %s not found", training_id)
+        raise HTTPException(status_code=404, detail="Executed daily training not found")
+
+    not_modified = not_modified_response(request, response, entity_etag(result))
+    if not_modified is not None:
+        return not_modified
+
+    # Carrega os exercícios associados
+    training = (await build_daily_training_responses(session, [result]))[0]
+
+    logger.info("Successfully fetched executed daily training with ID %s", training_id)
+    return training
 
 
 @daily_training_router.get("/daily_training/get_all")
-def get_all(pagination: PaginationParams = Depends()):
-    with Session(engine) as session:
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(ExecutedDailyTraining).offset(offset).limit(pagination.per_page)
-        result = session.exec(statement).all()
-        
-        if not result:
-            logger.warning("No executed daily trainings found")
-            raise HTTPException(status_code=404, detail="Executed daily trainings not found")
-        
-        trainings = []
-
-        for t in result:
-            # Carrega os exercícios associados para cada treino
-            executed_exercises = session.exec(
-                select(ExecutedExercise).where(ExecutedExercise.daily_training_id == t.id)
-            ).all()
-
-            training = executed_daily_training_response(
-                id=t.id,
-                user_id=t.user_id,
-                training_date=t.training_date,
-                total_duration=t.total_duration,
-                notes = t.notes,
-                exercises=[
-                    executed_exercise_dto(
-                        id_exercise=ex.id_exercise,
-                        sets_done=ex.sets_done,
-                        reps_done=ex.reps_done,
-                        weight_used=ex.weight_used
-                    ) for ex in executed_exercises
-                ]
-            )
-            trainings.append(training)
-
-        total = session.exec(select(func.count(ExecutedDailyTraining.id))).one()
-
-        logger.info(f"Successfully fetched {len(trainings)} executed daily trainings")
-        return PaginatedResponse(
-            items=trainings,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
+async def get_all(request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    result, next_cursor = await paginate(session, select(ExecutedDailyTraining), pagination, ExecutedDailyTraining.id)
+
+    if not result:
+        logger.warning("No executed daily trainings found")
+        raise HTTPException(status_code=404, detail="Executed daily trainings not found")
+
+    total = await count_total(session, ExecutedDailyTraining, [], pagination.total)
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(result, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    # Carrega os exercícios de todos os treinos da página em uma única consulta
+    trainings = await build_daily_training_responses(session, result)
+
+    logger.info("Successfully fetched %s executed daily trainings", len(trainings))
+    return PaginatedResponse(
+        items=trainings,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
 
 @daily_training_router.get("/edaily_trainingxercise/filter")
-def filter_daily_training(user_id: int = None, training_date: str = None, pagination: PaginationParams = Depends()):
-
-   with Session(engine) as session:  
-
-        #validando a data        
-        try:
-            if training_date:
-                datetime.strptime(training_date, '%Y-%m-%d').date()
-        except ValueError:
-            logger.error(f"Invalid date format: {training_date}")
-            raise HTTPException(
-                status_code=404,
-                detail="Formato de data inválido. Use YYYY-MM-DD"
-            )  
-
-        conditions = []
-        if user_id:
-            conditions.append(user_id == ExecutedDailyTraining.user_id)
+async def filter_daily_training(request: Request, response: Response, user_id: int = None, training_date: str = None, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    #validando a data        
+    try:
         if training_date:
-            conditions.append(training_date == ExecutedDailyTraining.training_date)
-       
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(ExecutedDailyTraining).offset(offset).limit(pagination.per_page)
-        
-         # Pegando o total de registros com tais condições
-        count_stmt = select(func.count(ExecutedDailyTraining.id))
-        if conditions:
-            count_stmt = count_stmt.where(*conditions)
-        total = session.exec(count_stmt).one()
-
-        # Aplicando condições de filtro e executando
-        if conditions:
-            statement = statement.where(*conditions)
-        result = session.exec(statement).all()
-        
-        if not result:
-            logger.warning("No executed daily trainings found with the given criteria")
-            raise HTTPException(status_code=404, detail="No executed daily trainings found with the given criteria")
-        
-        #transformando para os dtos de response
-        trainings = []
-        for t in result:
-            # Carrega os exercícios associados para cada daily training
-            executed_exercises = session.exec(
-                select(ExecutedExercise).where(ExecutedExercise.daily_training_id == t.id)
-            ).all()
-
-            training = executed_daily_training_response(
-                id=t.id,
-                user_id=t.user_id,
-                training_date=t.training_date,
-                total_duration=t.total_duration,
-                notes = t.notes,
-                exercises=[
-                    executed_exercise_dto(
-                        id_exercise=ex.id_exercise,
-                        sets_done=ex.sets_done,
-                        reps_done=ex.reps_done,
-                        weight_used=ex.weight_used
-                    ) for ex in executed_exercises
-                ]
-            )
-            trainings.append(training)
-
-        logger.info(f"Successfully fetched {len(trainings)} executed daily trainings")
-        return PaginatedResponse(
-            items=result,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
+            datetime.strptime(training_date, '%Y-%m-%d').date()
+    except ValueError:
+        logger.error("Invalid date format: %s", training_date)
+        raise HTTPException(
+            status_code=404,
+            detail="Formato de data inválido. Use YYYY-MM-DD"
+        )  
+
+    conditions = []
+    if user_id:
+        conditions.append(user_id == ExecutedDailyTraining.user_id)
+    if training_date:
+        conditions.append(training_date == ExecutedDailyTraining.training_date)
+
+    statement = select(ExecutedDailyTraining)
+
+     # Pegando o total de registros com tais condições
+    total = await count_total(session, ExecutedDailyTraining, conditions, pagination.total)
+
+    # Aplicando condições de filtro e executando
+    if conditions:
+        statement = statement.where(*conditions)
+    result, next_cursor = await paginate(session, statement, pagination, ExecutedDailyTraining.id)
+
+    if not result:
+        logger.warning("No executed daily trainings found with the given criteria")
+        raise HTTPException(status_code=404, detail="No executed daily trainings found with the given criteria")
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(result, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    #transformando para os dtos de response
+    trainings = await build_daily_training_responses(session, result)
+
+    logger.info("Successfully fetched %s executed daily trainings", len(trainings))
+    return PaginatedResponse(
+        items=trainings,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
 
 @daily_training_router.get("/daily_training/get_quantity")
-def get_quantity():
-    with Session(engine) as session:
-        quantity = session.exec(select(func.count(ExecutedDailyTraining.id))).one()
-    logger.info(f"Successfully fetched the total number of Executed Daily Trainings: {quantity}")
+async def get_quantity(approx: bool = False, session: AsyncSession = Depends(get_session)):
+    quantity = await count_total(session, ExecutedDailyTraining, [], total_mode.approx if approx else total_mode.exact)
+    logger.info("Successfully fetched the total number of Executed Daily Trainings: %s", quantity)
     return {"quantity": quantity}
 
-@daily_training_router.post("/daily_training/create")
-def create(executed_training: executed_daily_training_request):
-  
-    with Session(engine) as session:
-        user = session.get(User, executed_training.user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Verificando se todos os exercise_id existem
-        exercise_ids = [ex.id_exercise for ex in executed_training.exercises]
-        existing_ids = session.exec(select(Exercise.id).where(Exercise.id.in_(exercise_ids))).all()
-
-        not_found = set(exercise_ids) - set(existing_ids)
-        if not_found:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Exercises not found with IDs: {list(not_found)}"
-            )
-        
-   
-
-    dailyTraining = ExecutedDailyTraining(
+def _new_daily_training(executed_training: executed_daily_training_request) -> ExecutedDailyTraining:
+    return ExecutedDailyTraining(
         user_id=executed_training.user_id,
         training_date=executed_training.training_date,
         total_duration=executed_training.total_duration,
-        notes = executed_training.notes,   
+        notes=executed_training.notes,
     )
 
-    with Session(engine) as session:
-        # Adicionando o treino executado ao db
-        session.add(dailyTraining)
-        session.commit()  # Commit para salvar o treino executado
-        session.refresh(dailyTraining)  # Necessário para pegar o ID gerado
-
-        exercises = [ExecutedExercise(
-            daily_training_id=dailyTraining.id,
-            id_exercise=ex.id_exercise,
-            sets_done=ex.sets_done,
-            reps_done=ex.reps_done,
-            weight_used=ex.weight_used
-        ) for ex in executed_training.exercises]
-
-        # Adicionanado executed exercises ao db 
-        for ex in exercises:
-            session.add(ex)
-            session.commit()  # Commit para garantir que o ID seja gerado antes de associar ao treino
-            session.refresh(ex)  # Necessário para pegar o ID gerado
-        
-        logger.info(f"Executed daily training created successfully with ID {dailyTraining.id}")
-        return {
-            "message": "Executed daily training created successfully",
-            "id": dailyTraining.id
+# Insere os exercícios executados de vários treinos com um único INSERT em lote (executemany)
+# e soma as execuções aos contadores de popularidade, aos recordes pessoais e os treinos aos totais
+# de volume, na mesma transação. Retorna os recordes pessoais batidos pelos exercícios inseridos.
+async def _insert_executed_exercises(session: AsyncSession, trainings: list[tuple[ExecutedDailyTraining, executed_daily_training_request]]) -> list[new_personal_record]:
+    rows = [
+        {
+            "daily_training_id": daily_training.id,
+            "id_exercise": ex.id_exercise,
+            "sets_done": ex.sets_done,
+            "reps_done": ex.reps_done,
+            "weight_used": ex.weight_used,
         }
+        for daily_training, executed_training in trainings
+        for ex in executed_training.exercises
+    ]
+    if rows:
+        await session.exec(insert(ExecutedExercise), params=rows)
+        await update_exercise_execution_counts(session, added=[row["id_exercise"] for row in rows])
+    await update_training_volume_rollups(session, added=[
+        training_contribution(daily_training.user_id, daily_training.training_date, daily_training.total_duration, executed_training.exercises)
+        for daily_training, executed_training in trainings
+    ])
+    return await update_personal_records(session, [
+        Execution(daily_training.user_id, ex.id_exercise, ex.weight_used, ex.reps_done, daily_training.training_date)
+        for daily_training, executed_training in trainings
+        for ex in executed_training.exercises
+    ])
+
+@daily_training_router.post("/daily_training/create")
+async def create(executed_training: executed_daily_training_request, session: AsyncSession = Depends(get_session)):
+  
+    user = await session.get(User, executed_training.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Verificando se todos os exercise_id existem
+    exercise_ids = [ex.id_exercise for ex in executed_training.exercises]
+    not_found = await exercise_catalog.missing_ids(session, exercise_ids)
+    if not_found:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Exercises not found with IDs: {list(not_found)}"
+        )
+
+    # Treino e exercícios executados são gravados em uma única transação:
+    # o flush gera o ID do treino e os exercícios entram em um único INSERT em lote
+    dailyTraining = _new_daily_training(executed_training)
+    session.add(dailyTraining)
+    await session.flush()
+    new_personal_records = await _insert_executed_exercises(session, [(dailyTraining, executed_training)])
+    await session.commit()
+
+    logger.info("Executed daily training created successfully with ID %s", dailyTraining.id)
+    return {
+        "message": "Executed daily training created successfully",
+        "id": dailyTraining.id,
+        "new_personal_records": new_personal_records
+    }
+
+@daily_training_router.post("/daily_training/bulk_create")
+async def bulk_create(executed_trainings: list[executed_daily_training_request], session: AsyncSession = Depends(get_session)):
+    if len(executed_trainings) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_CREATE_MAX_ITEMS} trainings per request")
+
+    # Valida os usuários de todos os itens com uma consulta e os exercícios pelo catálogo em memória
+    user_ids = {t.user_id for t in executed_trainings}
+    exercise_ids = {ex.id_exercise for t in executed_trainings for ex in t.exercises}
+    existing_users = set((await session.exec(select(User.id).where(User.id.in_(user_ids)))).all()) if user_ids else set()
+    missing_exercises = await exercise_catalog.missing_ids(session, exercise_ids)
+
+    errors: list[bulk_create_item_error] = []
+    valid: list[tuple[int, ExecutedDailyTraining, executed_daily_training_request]] = []
+    for index, executed_training in enumerate(executed_trainings):
+        if executed_training.user_id not in existing_users:
+            errors.append(bulk_create_item_error(index=index, detail=f"User with ID {executed_training.user_id} not found"))
+            continue
+        not_found = {ex.id_exercise for ex in executed_training.exercises} & missing_exercises
+        if not_found:
+            errors.append(bulk_create_item_error(index=index, detail=f"Exercises not found with IDs: {sorted(not_found)}"))
+            continue
+        valid.append((index, _new_daily_training(executed_training), executed_training))
+
+    # Todos os itens válidos são gravados na mesma transação: um flush para os treinos
+    # (que devolve os IDs gerados) e um INSERT em lote para todos os exercícios
+    session.add_all([training for _, training, _ in valid])
+    await session.flush()
+    await _insert_executed_exercises(session, [(training, request) for _, training, request in valid])
+    await session.commit()
+
+    created = [bulk_create_item_created(index=index, id=training.id) for index, training, _ in valid]
+    logger.info("Bulk create: %s executed daily trainings created, %s rejected", len(created), len(errors))
+    return bulk_create_response(created=created, errors=errors)
+
+# O CSV é enviado como corpo da requisição (text/csv), no layout da exportação, e lido em pedaços
+@daily_training_router.post(
+    "/daily_training/import_csv",
+    openapi_extra={"requestBody": {"required": True, "content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}}}},
+)
+async def import_csv(request: Request, session: AsyncSession = Depends(get_session)):
+    result = await import_daily_trainings_csv(session, request.stream())
+    logger.info(
+        "CSV import: %s executed daily trainings imported, %s duplicates skipped, %s lines rejected",
+        result.imported, result.skipped_duplicates, result.error_count
+    )
+    return result
 
 @daily_training_router.put("/daily_training/update/{training_id}")
-def update(training_id: int, executed_training: executed_daily_training_request):
-    with Session(engine) as session:
-        statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
-        result = session.exec(statement).first()
-
-        if not result:
-            logger.info("No Executed daily training found with id: {training_id}.")
-            raise HTTPException(status_code=400, detail=f"Exercises not found with ID: {training_id}")
-        
-        # Atualiza os campos do treino diário executado
-        result.user_id = executed_training.user_id
-        result.training_date = executed_training.training_date
-        result.total_duration = executed_training.total_duration
-        result.notes = executed_training.notes
-
-        # Remove os exercícios antigos associados a este treino
-        old_exercises = session.exec(
-            select(ExecutedExercise).where(ExecutedExercise.daily_training_id == training_id)
-        ).all()
-
-        for ex in old_exercises:
-            session.delete(ex)
-        session.commit()
-
-        # Adiciona os novos exercícios
-        for ex_req in executed_training.exercises:
-            new_ex = ExecutedExercise(
-                daily_training_id=training_id,
-                id_exercise=ex_req.id_exercise,
-                sets_done=ex_req.sets_done,
-                reps_done=ex_req.reps_done,
-                weight_used=ex_req.weight_used
-            )
-            session.add(new_ex)
-        session.commit()
-
-        logger.info(f"Executed daily training with ID {training_id} updated successfully")
-        return {"message": "Executed daily training updated successfully"}
-    
+async def update(training_id: int, executed_training: executed_daily_training_request, session: AsyncSession = Depends(get_session)):
+    statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
+    result = (await session.exec(statement)).first()
+
+    if not result:
+        logger.info("No Executed daily training found with id: %s.", training_id)
+        raise HTTPException(status_code=400, detail=f"Exercises not found with ID: {training_id}")
+
+    # Remove os exercícios antigos associados a este treino
+    old_exercises = (await session.exec(
+        select(ExecutedExercise).where(ExecutedExercise.daily_training_id == training_id)
+    )).all()
+
+    for ex in old_exercises:
+        await session.delete(ex)
+    await update_exercise_execution_counts(session, removed=[ex.id_exercise for ex in old_exercises])
+    # Os valores antigos saem dos totais de volume antes de os campos serem alterados
+    await update_training_volume_rollups(session, removed=[
+        training_contribution(result.user_id, result.training_date, result.total_duration, old_exercises)
+    ])
+    old_record_keys = {(result.user_id, ex.id_exercise) for ex in old_exercises}
+
+    # Atualiza os campos do treino diário executado
+    result.user_id = executed_training.user_id
+    result.training_date = executed_training.training_date
+    result.total_duration = executed_training.total_duration
+    result.notes = executed_training.notes
+    # Os exercícios ficam em outra tabela: força o UPDATE do treino para incrementar a versão (e o ETag)
+    flag_modified(result, "notes")
+
+    # Adiciona os novos exercícios em lote (tudo é confirmado em um único commit)
+    await _insert_executed_exercises(session, [(result, executed_training)])
+    # Os recordes que podiam vir dos exercícios antigos são recalculados a partir do histórico
+    await recompute_personal_records(session, old_record_keys)
+    await session.commit()
+
+    logger.info("Executed daily training with ID %s updated successfully", training_id)
+    return {"message": "Executed daily training updated successfully"}
+
 @daily_training_router.delete("/daily_training/delete/{training_id}")
-def delete(training_id: int):
-    with Session(engine) as session:
-        statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
-        result = session.exec(statement).first()
+async def delete(training_id: int, session: AsyncSession = Depends(get_session)):
+    statement = select(ExecutedDailyTraining).where(ExecutedDailyTraining.id == training_id)
+    result = (await session.exec(statement)).first()
+
+    if not result:
+        logger.info("No Executed daily training found with id: %s.", training_id)
+        raise HTTPException(status_code=400, detail=f"Exercises not found with ID: {training_id}")
 
-        if not result:
-            logger.info("No Executed daily training found with id: {training_id}.")
-            raise HTTPException(status_code=400, detail=f"Exercises not found with ID: {training_id}")
-        
-        old_exercises = session.exec(
-            select(ExecutedExercise).where(ExecutedExercise.daily_training_id == training_id)
-        ).all()
+    old_exercises = (await session.exec(
+        select(ExecutedExercise).where(ExecutedExercise.daily_training_id == training_id)
+    )).all()
 
-        for ex in old_exercises:
-            session.delete(ex)
-        session.commit()
+    for ex in old_exercises:
+        await session.delete(ex)
+    await update_exercise_execution_counts(session, removed=[ex.id_exercise for ex in old_exercises])
+    await update_training_volume_rollups(session, removed=[
+        training_contribution(result.user_id, result.training_date, result.total_duration, old_exercises)
+    ])
 
-        session.delete(result)
-        session.commit()
+    await session.delete(result)
+    await recompute_personal_records(session, {(result.user_id, ex.id_exercise) for ex in old_exercises})
+    await session.commit()
 
-        logger.info(f"Executed daily training with ID {training_id} deleted successfully")
-        return {"message": "Executed daily training deleted successfully"}
+    logger.info("Executed daily training with ID %s deleted successfully", training_id)
+    return {"message": "Executed daily training deleted successfully"}
 
 #===========================================================================================================
+# Exportações geradas a partir do banco em streaming (ver utils/daily_training_export.py)
+
+@daily_training_router.get("/daily_training/download_csv")
+async def download_csv():
+    # O SHA-256 é calculado durante o envio: trailer X-Content-SHA256 ou /daily_training/hash?export_id=
+    logger.info("Streaming executed daily trainings CSV export")
+    return HashedExportResponse(export_format.csv, "text/csv", CSV_FILENAME)
+
+@daily_training_router.get("/daily_training/download_zip")
+async def download_zip():
+    # O zip traz o CSV e o SHA-256 dele (executed_daily_training.csv.sha256), gravado depois do CSV
+    logger.info("Streaming executed daily trainings ZIP export")
+    return StreamingResponse(
+        zip_chunks(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="executed_daily_training.zip"'}
+    )
 
-# @daily_training_router.get("/daily_training/download_zip", tags=["executed daily training"])
-# def download_zip():
-#     try:
-#         with zipfile.ZipFile("data_zip/e.zip", 'w', zipfile.ZIP_DEFLATED) as zipf:
-#             zipf.write("data/executed_daily_training.csv", os.path.basename("data/executed_daily_training.csv"))  
-        
-#         logger.info("ZIP file created successfully")
-#         hash_sha256 = get_hash_csv()
-#         return FileResponse(
-#                     path="data_zip/executed_daily_training.zip",
-#                     media_type='application/zip',
-#                     filename='executed_daily_training.zip',
-#                     headers={"X-CSV-Hash": str(hash_sha256)}
-#                 )
-#     except Exception as e:
-#         logger.error(f"Error creating ZIP file: {e}")
-#         raise HTTPException(status_code=500, detail="Internal server error")
-
-# @daily_training_router.get("/daily_training/download_xml", tags=["executed daily training"])
-# def download_xml():
-#     try: 
-#         root = ET.Element("executed_daily_trainings")
-#         with open("data/executed_daily_training.csv", newline='', encoding='utf-8') as csvfile:
-#             reader = csv.reader(csvfile)
-#             next(reader) 
-            
-#             for row in reader:
-#                 training = ET.SubElement(root, "training")
-#                 ET.SubElement(training, "id").text = row[0]
-#                 ET.SubElement(training, "user_id").text = row[1]
-#                 ET.SubElement(training, "training_date").text = row[2]
-#                 ET.SubElement(training, "total_duration").text = row[3]
-                
-#                 exercises = ET.SubElement(training, "exercises")
-                
-#                 for i in range(4, len(row), 5):
-#                     exercise = ET.SubElement(exercises, "exercise")
-#                     ET.SubElement(exercise, "exercise_id").text = row[i+1]  # Pula o marcador "EXERCISE"
-#                     ET.SubElement(exercise, "sets_done").text = row[i+2]
-#                     ET.SubElement(exercise, "reps_done").text = row[i+3]
-#                     ET.SubElement(exercise, "weight_used").text = row[i+4]
-        
-#         indent(root)
-        
-#         tree = ET.ElementTree(root)
-#         tree.write("data_xml/executed_daily_training.xml", encoding='utf-8', xml_declaration=True)
-
-#         logger.info("executed_daily_training.xml created successfully")
-#         return FileResponse("data_xml/executed_daily_training.xml", media_type='application/xml', filename='executed_daily_training.xml')
-    
-#     except Exception as e:
-#         logger.error(f"Error creating XML file: {e}")
-#         raise HTTPException(status_code=500, detail="Internal server error")
-
-# @daily_training_router.get("/daily_training/hash", tags=["executed daily training"])
-# def get_hash_csv():
-#     try: 
-#         with open("data/executed_daily_training.csv", 'rb') as f:
-#             file_data = f.read()
-#             sha256_hash = hashlib.sha256(file_data).hexdigest()
-#             logger.info("SHA256 hash of executed_daily_training.csv generated successfully")
-#             return {"hash": str(sha256_hash)}
-#     except Exception as e:
-#         logger.error(f"An error occurred while generating the hash: {e}")
-#         raise HTTPException(status_code=500, detail=f"Error generating hash: {e}")
\ No newline at end of file
+@daily_training_router.get("/daily_training/download_xml")
+async def download_xml():
+    logger.info("Streaming executed daily trainings XML export")
+    return HashedExportResponse(export_format.xml, "application/xml", "executed_daily_training.xml")
+
+@daily_training_router.get("/daily_training/hash")
+async def get_hash(export_id: str):
+    # Hash calculado durante o envio da exportação identificada pelo cabeçalho X-Export-Id do download
+    try:
+        sha256_hash = export_digest(export_id)
+    except KeyError:
+        logger.warning("Export %s not found for hash lookup", export_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found or expired, download it again")
+    if sha256_hash is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The export is still streaming, request the hash after the download finishes")
+    logger.info("SHA256 hash of export %s retrieved successfully", export_id)
+    return {"hash": sha256_hash, "export_id": export_id}
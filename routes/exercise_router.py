@@ -1,103 +1,127 @@
-import math
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from sqlmodel import Session, func, select
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response, status
+from sqlmodel import select
 from dtos.exercise.top_executed_exercise_response import TopExecutedExerciseResponse
 from log.logger_config import get_logger
-from models.executed_exercise import ExecutedExercise
 from models.exercise import Exercise
+from models.executed_exercise import ExecutedExercise
+from models.popularity_counters import ExerciseExecutionCount
 from dtos.exercise.exercise_request import exercise_request
 from utils.level_exercise import level_exercise
-from db.database import engine
-from utils.pagination import PaginatedResponse, PaginationParams
+from db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.etag import entity_etag, list_etag, not_modified_response
+from utils.exercise_catalog import exercise_catalog
+from utils.pagination import PaginatedResponse, PaginationParams, paginate_list
+from utils.personal_records import delete_exercise_personal_records
+from utils.popularity_counters import delete_exercise_counter
+from utils.search import search, search_condition
+from utils.totals import count_total
+from utils.total_mode import total_mode
 
 logger = get_logger("exercise_logger", "log/exercise.log")
 
 exercise_router = APIRouter(tags=["Exercise"])
 
 @exercise_router.get("/exercise/get_by_id/{exercise_id}")
-def get_by_id(exercise_id: int):
-    with Session(engine) as session:
-        statament = select(Exercise).where(Exercise.id == exercise_id)
-        result = session.exec(statament).first()
-        if result is not None:
-            return result
-        else:
-            logger.warning(f"Exercise with ID {exercise_id} not found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
+async def get_by_id(exercise_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    result = await exercise_catalog.get(session, exercise_id)
+    if result is not None:
+        not_modified = not_modified_response(request, response, entity_etag(result))
+        if not_modified is not None:
+            return not_modified
+        return result
+    else:
+        logger.warning("Exercise with ID %s not found", exercise_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
 
 @exercise_router.get("/exercise/get_all")
-def get_all(pagination: PaginationParams = Depends()):
-    with Session(engine) as session:
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(Exercise).offset(offset).limit(pagination.per_page)
-        exercises = session.exec(statement).all()
-
-        if not exercises:
-            logger.warning("No exercises found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No exercises found")
-
-        total = session.exec(select(func.count(Exercise.id))).one()
-        logger.info(f"Successfully fetched {len(exercises)} exercises")
-        return PaginatedResponse(
-            items=exercises,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
+async def get_all(request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    # Paginação feita sobre o catálogo em memória, sem consultar o banco
+    all_exercises = await exercise_catalog.all(session)
+    exercises, next_cursor = paginate_list(all_exercises, pagination, Exercise.id)
+
+    if not exercises:
+        logger.warning("No exercises found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No exercises found")
+
+    total = None if pagination.total == total_mode.none else len(all_exercises)
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(exercises, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+    logger.info("Successfully fetched %s exercises", len(exercises))
+    return PaginatedResponse(
+        items=exercises,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
+
 
-   
 @exercise_router.get("/exercise/filter")
-def filter_exercises(pagination: PaginationParams = Depends(), target_muscle_group: str=None, equipment: str = None, level: level_exercise = None):      
-
-    with Session(engine) as session:
-        # Verificando condições
-        conditions = []
-        if target_muscle_group:
-            conditions.append(func.lower(Exercise.target_muscle_group) == target_muscle_group.lower())
-        if equipment:
-            conditions.append(func.lower(Exercise.equipment) == equipment.lower())
-        if level:
-            conditions.append(Exercise.level == level)
-        
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(Exercise).offset(offset).limit(pagination.per_page)
-
-        # Pegando o total de registros com tais condições
-        count_stmt = select(func.count(Exercise.id))
-        if conditions:
-            count_stmt = count_stmt.where(*conditions)
-        total = session.exec(count_stmt).one()
-
-        # Aplicando condições de filtro e executando
-        if conditions:
-            statement = statement.where(*conditions)
-        exercises = session.exec(statement).all()
-
-        if not exercises:
-            logger.warning("No exercises found matching the criteria")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No exercises found matching the criteria")
-
-        # Retornando com paginação
-        logger.info(f"Successfully fetched {len(exercises)} exercises")        
-        return PaginatedResponse(
-            items=exercises,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
-  
+async def filter_exercises(request: Request, response: Response, pagination: PaginationParams = Depends(), target_muscle_group: str=None, equipment: str = None, level: level_exercise = None, session: AsyncSession = Depends(get_session)):      
+
+    # Filtrando pelos índices do catálogo em memória (grupo muscular e equipamento sem diferenciar maiúsculas)
+    matching = await exercise_catalog.filter(session, target_muscle_group, equipment, level)
+
+    # Pegando o total de registros com tais condições
+    total = None if pagination.total == total_mode.none else len(matching)
+
+    exercises, next_cursor = paginate_list(matching, pagination, Exercise.id)
+
+    if not exercises:
+        logger.warning("No exercises found matching the criteria")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No exercises found matching the criteria")
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(exercises, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    # Retornando com paginação
+    logger.info("Successfully fetched %s exercises", len(exercises))        
+    return PaginatedResponse(
+        items=exercises,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
+
+@exercise_router.get("/exercise/search")
+async def search_exercises(q: str, request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    # Busca textual em nome, grupo muscular e equipamento, ordenada por relevância
+    exercises, next_cursor = await search(session, Exercise, q, pagination)
+
+    if not exercises:
+        logger.warning("No exercises found for search '%s'", q)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No exercises found matching the search")
+
+    total = await count_total(session, Exercise, [search_condition(session, Exercise, q)], pagination.total)
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(exercises, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+    logger.info("Successfully fetched %s exercises for search '%s'", len(exercises), q)
+    return PaginatedResponse(
+        items=exercises,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
+
 @exercise_router.get("/exercise/get_quantity")
-def get_quantity():
-    with Session(engine) as session:
-        quantity = session.exec(select(func.count(Exercise.id))).one()
-    logger.info(f"Successfully fetched the total number of users: {quantity}")
+async def get_quantity(approx: bool = False, session: AsyncSession = Depends(get_session)):
+    quantity = await count_total(session, Exercise, [], total_mode.approx if approx else total_mode.exact)
+    logger.info("Successfully fetched the total number of users: %s", quantity)
     return {"quantity": quantity}
 
 @exercise_router.post("/exercise/create")
-def create(exercise_request: exercise_request):
+async def create(exercise_request: exercise_request, session: AsyncSession = Depends(get_session)):
 
     new_exercise = Exercise(
             name=exercise_request.name,
@@ -110,76 +134,90 @@ def create(exercise_request: exercise_request):
             weight=exercise_request.weight
         )
     
-    with Session(engine) as session:
-        session.add(new_exercise)
-        session.commit()
-        session.refresh(new_exercise)
+    session.add(new_exercise)
+    await session.commit()
+    await session.refresh(new_exercise)
+    exercise_catalog.upsert(new_exercise)
 
-    logger.info(f"Exercise {new_exercise.name} created successfully with ID {new_exercise.id}")
+    logger.info("Exercise %s created successfully with ID %s", new_exercise.name, new_exercise.id)
     return {"message": "Exercise created successfully", "id": new_exercise.id}
 
 @exercise_router.put("/exercise/update/{exercise_id}")
-def update(exercise_id: int, exerciseDto: exercise_request):
-
-    with Session(engine) as session:
-        statement = select(Exercise).where(Exercise.id == exercise_id)
-        exercise = session.exec(statement).first()
-
-        if exercise is None:
-            logger.warning(f"Exercise with ID {exercise_id} not found for update")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
-
-        exercise.name = exerciseDto.name
-        exercise.target_muscle_group = exerciseDto.target_muscle_group
-        exercise.equipment = exerciseDto.equipment
-        exercise.level = level_exercise(exerciseDto.level)
-        exercise.url = exerciseDto.url
-        exercise.sets = exerciseDto.sets
-        exercise.reps = exerciseDto.reps
-        exercise.weight = exerciseDto.weight
-
-        session.commit()
-        session.refresh(exercise)
-    
-    logger.info(f"Exercise with ID {exercise_id} updated successfully")
+async def update(exercise_id: int, exerciseDto: exercise_request, session: AsyncSession = Depends(get_session)):
+
+    statement = select(Exercise).where(Exercise.id == exercise_id)
+    exercise = (await session.exec(statement)).first()
+
+    if exercise is None:
+        logger.warning("Exercise with ID %s not found for update", exercise_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
+
+    exercise.name = exerciseDto.name
+    exercise.target_muscle_group = exerciseDto.target_muscle_group
+    exercise.equipment = exerciseDto.equipment
+    exercise.level = level_exercise(exerciseDto.level)
+    exercise.url = exerciseDto.url
+    exercise.sets = exerciseDto.sets
+    exercise.reps = exerciseDto.reps
+    exercise.weight = exerciseDto.weight
+
+    await session.commit()
+    await session.refresh(exercise)
+    exercise_catalog.upsert(exercise)
+
+    logger.info("Exercise with ID %s updated successfully", exercise_id)
     return {"message": "Exercise updated successfully"}
 
 @exercise_router.delete("/exercise/delete/{exercise_id}")
-def delete_exercise(exercise_id: int):
-    with Session(engine) as session:
-        statement = select(Exercise).where(Exercise.id == exercise_id)
-        exercise = session.exec(statement).first()
-
-        if exercise is None:
-            logger.warning(f"Exercise with ID {exercise_id} not found for deletion")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
+async def delete_exercise(exercise_id: int, session: AsyncSession = Depends(get_session)):
+    statement = select(Exercise).where(Exercise.id == exercise_id)
+    exercise = (await session.exec(statement)).first()
+
+    if exercise is None:
+        logger.warning("Exercise with ID %s not found for deletion", exercise_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exercise not found")
+
+    # Os treinos executados guardam o histórico do exercício (e os recordes vêm deles): o exercício
+    # só pode ser excluído depois que os treinos que o usam forem excluídos
+    executed = (await session.exec(
+        select(ExecutedExercise.id).where(ExecutedExercise.id_exercise == exercise_id).limit(1)
+    )).first()
+    if executed is not None:
+        logger.warning("Exercise with ID %s has executed trainings and cannot be deleted", exercise_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Exercise with ID {exercise_id} is used by executed daily trainings. Delete them first."
+        )
 
-        session.delete(exercise)
-        session.commit()
+    await delete_exercise_counter(session, exercise_id)
+    await delete_exercise_personal_records(session, exercise_id)
+    await session.delete(exercise)
+    await session.commit()
+    exercise_catalog.remove(exercise_id)
 
-    logger.info(f"Exercise with ID {exercise_id} deleted successfully")
+    logger.info("Exercise with ID %s deleted successfully", exercise_id)
     return {"message": "Exercise deleted successfully"}
 
 @exercise_router.get("/exercise/get_top_executed_exercises")
-def get_top_executed_exercises(limit: int = 5):
-    with Session(engine) as session:
-        statement = (
-            select(Exercise, func.count(ExecutedExercise.id).label("execution_count"))
-            .join(ExecutedExercise, Exercise.id == ExecutedExercise.id_exercise) 
-            .group_by(Exercise.id, Exercise.name) # Agrupa pelo ID e nome do exercício para contar
-            .order_by(func.count(ExecutedExercise.id).desc()) # Ordena pela contagem em ordem decrescente
-            .limit(limit) # Limita ao número de top exercícios desejado
-        )
+async def get_top_executed_exercises(limit: int = 5, session: AsyncSession = Depends(get_session)):
+    # Leitura top-N pelo índice do contador mantido a cada treino criado, alterado ou excluído
+    statement = (
+        select(Exercise, ExerciseExecutionCount.execution_count)
+        .join(ExerciseExecutionCount, Exercise.id == ExerciseExecutionCount.exercise_id)
+        .where(ExerciseExecutionCount.execution_count > 0)
+        .order_by(ExerciseExecutionCount.execution_count.desc(), Exercise.id) # Ordena pela contagem em ordem decrescente
+        .limit(limit) # Limita ao número de top exercícios desejado
+    )
+
+    results: list[tuple[Exercise, int]] = (await session.exec(statement)).all()
+    if not results:
+        logger.warning("Not found executed exercises")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found executed exercises")
 
-        results: list[tuple[Exercise, int]] = session.exec(statement).all()
-        if not results:
-            logger.warning(f"Not found executed exercises")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found executed exercises")
 
+    response_list: list[TopExecutedExerciseResponse] = []
 
-        response_list: list[TopExecutedExerciseResponse] = []
-        
-        for ex, count in results:
-            response_list.append(TopExecutedExerciseResponse(exercise=ex, execution_count=count))
+    for ex, count in results:
+        response_list.append(TopExecutedExerciseResponse(exercise=ex, execution_count=count))
 
-        return response_list
+    return response_list
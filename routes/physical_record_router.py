@@ -1,76 +1,132 @@
-import math
-from datetime import datetime
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status
 from dtos.physical_record.physical_record_request import PhysicalRecordRequest
+from dtos.physical_record.physical_record_series_response import physical_record_series_point, physical_record_series_response
 from models.physical_record import PhysicalRecord
 from models.user import User
 from log.logger_config import get_logger
-from db.database import engine
-from sqlmodel import Session, func, select
-from utils.pagination import PaginationParams, PaginatedResponse
+from db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import func, select
+from utils.downsampling import lttb_indices
+from utils.etag import entity_etag, list_etag, not_modified_response
+from utils.latest_physical_record import refresh_latest_physical_record
+from utils.pagination import PaginationParams, PaginatedResponse, paginate
+from utils.physical_record_metric import physical_record_metric
+from utils.totals import count_total
+from utils.total_mode import total_mode
 
 logger = get_logger("physical_record_logger", "log/physical_record.log")
 
 physical_record_router = APIRouter(tags=["Physical Record"])
 
 @physical_record_router.get("/physical_record/get_by_id/{record_id}")
-def get_by_id(record_id: int):
-    with Session(engine) as session:
-        statement = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
-        result = session.exec(statement).first()
-        if result is None:
-            logger.warning(f"Physical record with ID {record_id} not found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
-        
-        logger.info(f"Physical record with ID {record_id} retrieved successfully")
-        return result
-          
-        
+async def get_by_id(record_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    statement = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
+    result = (await session.exec(statement)).first()
+    if result is None:
+        logger.warning("Physical record with ID %s not found", record_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
+
+    not_modified = not_modified_response(request, response, entity_etag(result))
+    if not_modified is not None:
+        return not_modified
+
+    logger.info("Physical record with ID %s retrieved successfully", record_id)
+    return result
+
+
 @physical_record_router.get("/physical_record/get_all/")
-def get_all(pagination: PaginationParams = Depends()):
-    with Session(engine) as session:
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(PhysicalRecord).offset(offset).limit(pagination.per_page)
-        result = session.exec(statement).all()
-        
-        if result is None:
-            logger.warning("No physical records found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No physical records found")
-           
-        total = session.exec(select(func.count(PhysicalRecord.id))).one()
-        logger.info(f"Retrieved {len(result)} physical records successfully")
-        return PaginatedResponse(
-            items=result,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
-    
+async def get_all(request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    result, next_cursor = await paginate(session, select(PhysicalRecord), pagination, PhysicalRecord.id)
+
+    if result is None:
+        logger.warning("No physical records found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No physical records found")
+
+    total = await count_total(session, PhysicalRecord, [], pagination.total)
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(result, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+    logger.info("Retrieved %s physical records successfully", len(result))
+    return PaginatedResponse(
+        items=result,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
+
 @physical_record_router.get("/physical_record/get_by_user_id/{user_id}")
-def get_by_user_id(user_id: int):
-    with Session(engine) as session:
-
-        statement = select(PhysicalRecord).where(PhysicalRecord.user_id == user_id)
-        result = session.exec(statement).all()
-        if result is None:
-            logger.warning(f"No physical records found for user ID {user_id}")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No physical records found for this user")
-           
-        logger.info(f"Physical records for user ID {user_id} retrieved successfully")
-        return result
-            
-        
+async def get_by_user_id(user_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+
+    statement = (
+        select(PhysicalRecord)
+        .where(PhysicalRecord.user_id == user_id)
+        .order_by(PhysicalRecord.recorded_at, PhysicalRecord.id)
+    )
+    result = (await session.exec(statement)).all()
+    if result is None:
+        logger.warning("No physical records found for user ID %s", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No physical records found for this user")
+
+    not_modified = not_modified_response(request, response, list_etag(result))
+    if not_modified is not None:
+        return not_modified
+
+    logger.info("Physical records for user ID %s retrieved successfully", user_id)
+    return result
+
+
+# Série de uma medida do usuário no intervalo pedido, reduzida no servidor para no máximo `points`
+# pontos (LTTB), para gráficos. Lê só as colunas usadas, pelo índice (user_id, recorded_at).
+@physical_record_router.get("/physical_record/series/{user_id}")
+async def get_series(
+    user_id: int,
+    metric: physical_record_metric = physical_record_metric.weight,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    points: int = Query(200, ge=3, le=5000, description="Maximum number of points returned"),
+    session: AsyncSession = Depends(get_session)
+):
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must be before end_date")
+
+    user = await session.get(User, user_id)
+    if user is None:
+        logger.warning("User with ID %s not found for physical record series", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    value_column = getattr(PhysicalRecord, metric.value)
+    statement = (
+        select(PhysicalRecord.id, PhysicalRecord.recorded_at, value_column)
+        .where(PhysicalRecord.user_id == user_id, value_column.is_not(None))
+        .order_by(PhysicalRecord.recorded_at, PhysicalRecord.id)
+    )
+    if start_date is not None:
+        statement = statement.where(PhysicalRecord.recorded_at >= start_date)
+    if end_date is not None:
+        statement = statement.where(PhysicalRecord.recorded_at <= end_date)
+    rows = (await session.exec(statement)).all()
+
+    # O eixo x é a data (em dias) e o y é o valor da medida
+    indices = lttb_indices([(recorded_at.toordinal(), value) for _, recorded_at, value in rows], points)
+    series = [physical_record_series_point(id=rows[i][0], recorded_at=rows[i][1], value=rows[i][2]) for i in indices]
+
+    logger.info("Physical record %s series for user ID %s: %s of %s points", metric.value, user_id, len(series), len(rows))
+    return physical_record_series_response(user_id=user_id, metric=metric.value, total_records=len(rows), points=series)
+
 @physical_record_router.get("/physical_record/get_quantity")
-def get_quantity():
-    with Session(engine) as session:
-        quantity = session.exec(select(func.count(PhysicalRecord.id))).one()
-        logger.info(f"Total physical records in the database: {quantity}")
-        return {"quantity": quantity}
+async def get_quantity(approx: bool = False, session: AsyncSession = Depends(get_session)):
+    quantity = await count_total(session, PhysicalRecord, [], total_mode.approx if approx else total_mode.exact)
+    logger.info("Total physical records in the database: %s", quantity)
+    return {"quantity": quantity}
 
 @physical_record_router.post("/physical_record/create")
-def create(physical_record: PhysicalRecordRequest):
+async def create(physical_record: PhysicalRecordRequest, session: AsyncSession = Depends(get_session)):
 
     record = PhysicalRecord(
         user_id=physical_record.user_id,
@@ -81,64 +137,68 @@ def create(physical_record: PhysicalRecordRequest):
         recorded_at=datetime.now()
     )
 
-    with Session(engine) as session:
-        # verificando se o usuário existe
-        user_statement = select(User).where(User.id == record.user_id)
-        user = session.exec(user_statement).first()
-        if user is None:
-            logger.warning(f"User with ID {record.user_id} not found for physical record creation")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-        session.add(record)
-        session.commit()
-        session.refresh(record)
-    
-    logger.info(f"Physical record created successfully with ID {record.id}")
+    # verificando se o usuário existe
+    user_statement = select(User).where(User.id == record.user_id)
+    user = (await session.exec(user_statement)).first()
+    if user is None:
+        logger.warning("User with ID %s not found for physical record creation", record.user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    session.add(record)
+    await refresh_latest_physical_record(session, record.user_id)
+    await session.commit()
+    await session.refresh(record)
+
+    logger.info("Physical record created successfully with ID %s", record.id)
     return {"message": "Physical record created successfully", "id": record.id}
 
 @physical_record_router.put("/physical_record/update/{record_id}")
-def update(record_id: int, physical_record: PhysicalRecordRequest):
-    with Session(engine) as session:
-        # verificando se o registro físico existe
-        statament = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
-        record = session.exec(statament).first()
-        if record is None:
-            logger.warning(f"Physical record with ID {record_id} not found for update")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
-        
-        # verificando se o usuário existe
-        user_statement = select(User).where(User.id == physical_record.user_id)
-        user = session.exec(user_statement).first()
-        if user is None:
-            logger.warning(f"User with ID {physical_record.user_id} not found for physical record creation")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-        # atualizando os campos do registro físico
-        record.user_id = physical_record.user_id
-        record.weight = physical_record.weight
-        record.height = physical_record.height
-        record.body_fat_percentage = physical_record.body_fat_percentage
-        record.muscle_mass_percentage = physical_record.muscle_mass_percentage
-        record.recorded_at = datetime.now()
-
-        session.commit()
-        session.refresh(record)
-
-    logger.info(f"Physical record with ID {record_id} updated successfully")
+async def update(record_id: int, physical_record: PhysicalRecordRequest, session: AsyncSession = Depends(get_session)):
+    # verificando se o registro físico existe
+    statament = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
+    record = (await session.exec(statament)).first()
+    if record is None:
+        logger.warning("Physical record with ID %s not found for update", record_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
+
+    # verificando se o usuário existe
+    user_statement = select(User).where(User.id == physical_record.user_id)
+    user = (await session.exec(user_statement)).first()
+    if user is None:
+        logger.warning("User with ID %s not found for physical record creation", physical_record.user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    # atualizando os campos do registro físico
+    old_user_id = record.user_id
+    record.user_id = physical_record.user_id
+    record.weight = physical_record.weight
+    record.height = physical_record.height
+    record.body_fat_percentage = physical_record.body_fat_percentage
+    record.muscle_mass_percentage = physical_record.muscle_mass_percentage
+    record.recorded_at = datetime.now()
+
+    # A data muda, então o registro mais recente do usuário (e do antigo dono, se mudou) é recalculado
+    await refresh_latest_physical_record(session, record.user_id)
+    if old_user_id != record.user_id:
+        await refresh_latest_physical_record(session, old_user_id)
+
+    await session.commit()
+    await session.refresh(record)
+
+    logger.info("Physical record with ID %s updated successfully", record_id)
     return {"message": "Physical record updated successfully", "id": record.id}
 
 @physical_record_router.delete("/physical_record/delete/{record_id}")
-def delete(record_id: int):
-    with Session(engine) as session:
-        statement = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
-        record = session.exec(statement).first()
-
-        if record is None:
-            logger.warning(f"Physical record with ID {record_id} not found for deletion")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
-
-        session.delete(record)
-        session.commit()
-        logger.info(f"Physical record with ID {record_id} deleted successfully")
-        return {"message": "Physical record deleted successfully", "id": record_id}
-        
\ No newline at end of file
+async def delete(record_id: int, session: AsyncSession = Depends(get_session)):
+    statement = select(PhysicalRecord).where(PhysicalRecord.id == record_id)
+    record = (await session.exec(statement)).first()
+
+    if record is None:
+        logger.warning("Physical record with ID %s not found for deletion", record_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Physical record not found")
+
+    await session.delete(record)
+    await refresh_latest_physical_record(session, record.user_id)
+    await session.commit()
+    logger.info("Physical record with ID %s deleted successfully", record_id)
+    return {"message": "Physical record deleted successfully", "id": record_id}
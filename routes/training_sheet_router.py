@@ -1,433 +1,378 @@
-import math
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from dtos.training_sheet.training_sheet_day_responde import TrainingSheetDayResponse
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response, status
+from dtos.training_sheet.training_sheet_bulk_import_response import TrainingSheetBulkImportCreated, TrainingSheetBulkImportError, TrainingSheetBulkImportResponse
+from dtos.training_sheet.training_sheet_day_request import TrainingSheetDayRequest
 from dtos.training_sheet.training_sheet_user_link_request import TrainingSheetUserLinkRequest
 from dtos.training_sheet.training_sheet_week_more_used_response import TrainingSheetWeekMoreUsedResponse
 from dtos.training_sheet.training_sheet_week_request import TrainingSheetWeekRequest
-from dtos.training_sheet.training_sheet_week_response import TrainingSheetWeekResponse
-from models.exercise import Exercise
 from models.models_links import TrainingSheetDayExerciseLink
+from models.popularity_counters import TrainingSheetUserCount
 from models.training_sheet_day import TrainingSheetDay
 from log.logger_config import get_logger
-from db.database import engine
-from sqlmodel import Session, and_, func, select
+from db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+from sqlmodel import and_, func, insert, select
+from sqlmodel import delete as sql_delete # "delete" já é o nome da rota de exclusão
 from models.training_sheet_week import TrainingSheetWeek
 from models.user import User
+from utils.etag import entity_etag, list_etag, not_modified_response
+from utils.exercise_catalog import exercise_catalog
 from utils.level_exercise import level_exercise
-from utils.pagination import PaginationParams, PaginatedResponse
+from utils.pagination import PaginationParams, PaginatedResponse, paginate
+from utils.popularity_counters import delete_training_sheet_counter, update_training_sheet_user_counts
+from utils.search import search, search_condition
+from utils.totals import count_total
+from utils.total_mode import total_mode
+from utils.training_sheet_assembler import build_training_sheet_week_responses
 from models.models_links import TrainingSheetWeekUserLink
 
 logger = get_logger("training_sheet_logger", "log/training_sheet.log")
 
+# Limite de fichas aceitas por chamada do bulk_import
+BULK_IMPORT_MAX_ITEMS = 1000
+
 training_sheet_router = APIRouter(tags=["Training Sheet"])
 
 @training_sheet_router.get("/training_sheet/get/{training_sheet_id}")
-def get(training_sheet_id: int):
-    with Session(engine) as session:
-        # Verifica se o TrainingSheetWeek existe e obtém o objeto
-        statement = select(TrainingSheetWeek).where(TrainingSheetWeek.id == training_sheet_id)
-        training_sheet_week = session.exec(statement).first()
-
-        if not training_sheet_week:
-            logger.warning(f"Training sheet with ID {training_sheet_id} not found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
-
-        # Obtendo os dias de treino associados
-        days_statement = select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_id)
-        training_sheet_days = session.exec(days_statement).all()
-
-        training_sheet_days_response = []
-
-        for day in training_sheet_days:
-            # Obtendo os exercícios associados a cada dia
-            links_statement = select(TrainingSheetDayExerciseLink.exercise_id).where(
-                TrainingSheetDayExerciseLink.training_sheet_day_id == day.id).order_by(TrainingSheetDayExerciseLink.order)
-            
-            exercise_ids = session.exec(links_statement).all()
-
-            # Criando a resposta para o dia de treino
-            training_sheet_day_response = TrainingSheetDayResponse(
-                focus_area=day.focus_area,
-                day_of_week=day.day_of_week,
-                exercises_ids=exercise_ids
-            )
-            training_sheet_days_response.append(training_sheet_day_response)
-
-        training_sheet_week_response = TrainingSheetWeekResponse(
-            id=training_sheet_week.id,
-            name=training_sheet_week.name,
-            description=training_sheet_week.description,
-            level=training_sheet_week.level,
-            training_sheet_days=training_sheet_days_response
-        )
+async def get(training_sheet_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    # Verifica se o TrainingSheetWeek existe e obtém o objeto
+    statement = select(TrainingSheetWeek).where(TrainingSheetWeek.id == training_sheet_id)
+    training_sheet_week = (await session.exec(statement)).first()
+
+    if not training_sheet_week:
+        logger.warning("Training sheet with ID %s not found", training_sheet_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
+
+    not_modified = not_modified_response(request, response, entity_etag(training_sheet_week))
+    if not_modified is not None:
+        return not_modified
+
+    # Montando a resposta com os dias e exercícios associados
+    training_sheet_week_response = (await build_training_sheet_week_responses(session, [training_sheet_week]))[0]
+
+    logger.info("Training sheet retrieved: %s - %s", training_sheet_week.id, training_sheet_week.name)
+    return training_sheet_week_response
+
 
-        logger.info(f"Training sheet retrieved: {training_sheet_week.id} - {training_sheet_week.name}")
-        return training_sheet_week_response
-     
-        
 @training_sheet_router.get("/training_sheet/get_all/")
-def get_all(pagination: PaginationParams = Depends()):
-    with Session(engine) as session:
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(TrainingSheetWeek).offset(offset).limit(pagination.per_page)
-
-        training_sheet_weeks = session.exec(statement).all()
-
-        if not training_sheet_weeks:
-            logger.warning("No training sheets found in the database")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No training sheets found")
-
-        training_sheet_weeks_response = []
-        for training_sheet_week in training_sheet_weeks:
-            # Obtendo os dias de treino associados
-            days_statement = select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_week.id)
-            training_sheet_days = session.exec(days_statement).all()
-
-            training_sheet_days_response = []
-
-            for day in training_sheet_days:
-                # Obtendo os exercícios associados a cada dia
-                links_statement = select(TrainingSheetDayExerciseLink.exercise_id).where(
-                    TrainingSheetDayExerciseLink.training_sheet_day_id == day.id).order_by(TrainingSheetDayExerciseLink.order)
-                
-                exercise_ids = session.exec(links_statement).all()
-
-                # Criando a resposta para o dia de treino
-                training_sheet_day_response = TrainingSheetDayResponse(
-                    focus_area=day.focus_area,
-                    day_of_week=day.day_of_week,
-                    exercises_ids=exercise_ids
-                )
-                training_sheet_days_response.append(training_sheet_day_response)
-
-            training_sheet_week_response = TrainingSheetWeekResponse(
-                id=training_sheet_week.id,
-                name=training_sheet_week.name,
-                description=training_sheet_week.description,
-                level=training_sheet_week.level,
-                training_sheet_days=training_sheet_days_response
-            )
-
-            training_sheet_weeks_response.append(training_sheet_week_response)
-
-        total = session.exec(select(func.count(TrainingSheetWeek.id))).one()
-        logger.info(f"Training sheet retrieved: {training_sheet_week.id} - {training_sheet_week.name}")
-        return PaginatedResponse(
-            items=training_sheet_weeks_response,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
+async def get_all(request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    training_sheet_weeks, next_cursor = await paginate(session, select(TrainingSheetWeek), pagination, TrainingSheetWeek.id)
+
+    if not training_sheet_weeks:
+        logger.warning("No training sheets found in the database")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No training sheets found")
+
+    total = await count_total(session, TrainingSheetWeek, [], pagination.total)
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(training_sheet_weeks, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    training_sheet_weeks_response = await build_training_sheet_week_responses(session, training_sheet_weeks)
+    logger.info("Successfully fetched %s training sheets", len(training_sheet_weeks_response))
+    return PaginatedResponse(
+        items=training_sheet_weeks_response,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
 
 @training_sheet_router.get("/training_sheet/filter/")
-def filter(level: level_exercise = None, keywords: str = None, pagination: PaginationParams = Depends()):
-    with Session(engine) as session:
-
-        conditions = []
-
-        if level:
-            conditions.append(TrainingSheetWeek.level == level)
-
-        if keywords:
-            search_keywords_lower = keywords.lower() # Converte as palavras-chave para minúsculas uma vez
-            conditions.append(
-                (func.lower(TrainingSheetWeek.name).contains(search_keywords_lower)) |
-                (func.lower(TrainingSheetWeek.description).contains(search_keywords_lower))
-            )
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(TrainingSheetWeek).offset(offset).limit(pagination.per_page)
-        
-        # Pegando o total de registros com tais condições
-        count_stmt = select(func.count(TrainingSheetWeek.id))
-        if conditions:
-            count_stmt = count_stmt.where(*conditions)
-        total = session.exec(count_stmt).one()
-
-        # Aplicando condições de filtro
-        if conditions:
-            statement = statement.where(*conditions)
-        training_sheet_weeks = session.exec(statement).all()
-
-        if not training_sheet_weeks:
-            logger.warning("No training sheets found in the database")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No training sheets found")
-
-        training_sheet_weeks_response = []
-        for training_sheet_week in training_sheet_weeks:
-            # Obtendo os dias de treino associados
-            days_statement = select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_week.id)
-            training_sheet_days = session.exec(days_statement).all()
-
-            training_sheet_days_response = []
-
-            for day in training_sheet_days:
-                # Obtendo os exercícios associados a cada dia
-                links_statement = select(TrainingSheetDayExerciseLink.exercise_id).where(
-                    TrainingSheetDayExerciseLink.training_sheet_day_id == day.id).order_by(TrainingSheetDayExerciseLink.order)
-                
-                exercise_ids = session.exec(links_statement).all()
-
-                # Criando a resposta para o dia de treino
-                training_sheet_day_response = TrainingSheetDayResponse(
-                    focus_area=day.focus_area,
-                    day_of_week=day.day_of_week,
-                    exercises_ids=exercise_ids
-                )
-                training_sheet_days_response.append(training_sheet_day_response)
-
-            training_sheet_week_response = TrainingSheetWeekResponse(
-                id=training_sheet_week.id,
-                name=training_sheet_week.name,
-                description=training_sheet_week.description,
-                level=training_sheet_week.level,
-                training_sheet_days=training_sheet_days_response
-            )
-
-            training_sheet_weeks_response.append(training_sheet_week_response)
-
-        logger.info(f"Training sheet retrieved: {training_sheet_week.id} - {training_sheet_week.name}")
-        return PaginatedResponse(
-            items=training_sheet_weeks_response,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )  
+async def filter(request: Request, response: Response, level: level_exercise = None, keywords: str = None, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    conditions = []
+
+    if level:
+        conditions.append(TrainingSheetWeek.level == level)
+
+    if keywords:
+        # Trecho de texto em qualquer parte do nome ou da descrição. A busca por palavras usando o índice
+        # de busca textual fica em /training_sheet/search.
+        search_keywords_lower = keywords.lower() # Converte as palavras-chave para minúsculas uma vez
+        conditions.append(
+            (func.lower(TrainingSheetWeek.name).contains(search_keywords_lower)) |
+            (func.lower(TrainingSheetWeek.description).contains(search_keywords_lower))
+        )
+
+    statement = select(TrainingSheetWeek)
+
+    # Pegando o total de registros com tais condições
+    total = await count_total(session, TrainingSheetWeek, conditions, pagination.total)
+
+    # Aplicando condições de filtro
+    if conditions:
+        statement = statement.where(*conditions)
+    training_sheet_weeks, next_cursor = await paginate(session, statement, pagination, TrainingSheetWeek.id)
+
+    if not training_sheet_weeks:
+        logger.warning("No training sheets found in the database")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No training sheets found")
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(training_sheet_weeks, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    training_sheet_weeks_response = await build_training_sheet_week_responses(session, training_sheet_weeks)
 
+    logger.info("Successfully fetched %s training sheets", len(training_sheet_weeks_response))
+    return PaginatedResponse(
+        items=training_sheet_weeks_response,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )  
+
+
+@training_sheet_router.get("/training_sheet/search")
+async def search_training_sheets(q: str, request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
+
+    # Busca textual em nome e descrição, ordenada por relevância
+    training_sheet_weeks, next_cursor = await search(session, TrainingSheetWeek, q, pagination)
+
+    if not training_sheet_weeks:
+        logger.warning("No training sheets found for search '%s'", q)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No training sheets found matching the search")
+
+    total = await count_total(session, TrainingSheetWeek, [search_condition(session, TrainingSheetWeek, q)], pagination.total)
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(training_sheet_weeks, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    training_sheet_weeks_response = await build_training_sheet_week_responses(session, training_sheet_weeks)
+    logger.info("Successfully fetched %s training sheets for search '%s'", len(training_sheet_weeks_response), q)
+    return PaginatedResponse(
+        items=training_sheet_weeks_response,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
 
 @training_sheet_router.get("/training_sheet/get_quantity")
-def get_quantity():
-    with Session(engine) as session:
-        quantity = session.exec(select(func.count(TrainingSheetWeek.id))).one()
-    logger.info(f"Successfully fetched the total number of Training Sheet: {quantity}")
+async def get_quantity(approx: bool = False, session: AsyncSession = Depends(get_session)):
+    quantity = await count_total(session, TrainingSheetWeek, [], total_mode.approx if approx else total_mode.exact)
+    logger.info("Successfully fetched the total number of Training Sheet: %s", quantity)
     return {"quantity": quantity}
     
 
+# Retorna os IDs de exercícios que não existem, consultando o catálogo em memória
+async def _missing_exercise_ids(session: AsyncSession, exercise_ids: set[int]) -> set[int]:
+    return await exercise_catalog.missing_ids(session, exercise_ids)
+
+def _exercise_ids(training_sheet_week_request: TrainingSheetWeekRequest) -> set[int]:
+    return {ex_id for day in training_sheet_week_request.training_sheet_days for ex_id in day.exercises_ids}
+
+def _new_training_sheet_days(training_sheet_week_request: TrainingSheetWeekRequest, **week_link) -> list[tuple[TrainingSheetDay, TrainingSheetDayRequest]]:
+    return [
+        (TrainingSheetDay(focus_area=day_request.focus_area, day_of_week=day_request.day_of_week, **week_link), day_request)
+        for day_request in training_sheet_week_request.training_sheet_days
+    ]
+
+# Monta o TrainingSheetWeek já com os dias, para que semana e dias sejam inseridos no mesmo flush
+def _new_training_sheet_week(training_sheet_week_request: TrainingSheetWeekRequest) -> tuple[TrainingSheetWeek, list[tuple[TrainingSheetDay, TrainingSheetDayRequest]]]:
+    days = _new_training_sheet_days(training_sheet_week_request)
+    trainingSheetWeek = TrainingSheetWeek(
+        name=training_sheet_week_request.name,
+        description=training_sheet_week_request.description,
+        level=training_sheet_week_request.level,
+        training_sheet_days=[day for day, _ in days]
+    )
+    return trainingSheetWeek, days
+
+# Insere os links entre exercícios e dias (já com IDs gerados pelo flush) com um único INSERT em lote
+async def _insert_day_exercise_links(session: AsyncSession, days: list[tuple[TrainingSheetDay, TrainingSheetDayRequest]]):
+    rows = [
+        {"training_sheet_day_id": day.id, "exercise_id": ex_id, "order": i+1}
+        for day, day_request in days
+        for i, ex_id in enumerate(day_request.exercises_ids)
+    ]
+    if rows:
+        await session.exec(insert(TrainingSheetDayExerciseLink), params=rows)
+
 @training_sheet_router.post("/training_sheet/create")
-def create(training_sheet_week_request: TrainingSheetWeekRequest):
-    with Session(engine) as session:
-
-        # Verificando se todos os exercise_ids existem
-        ids_exercises = []
-
-        for day in training_sheet_week_request.training_sheet_days:
-            for ex_id in day.exercises_ids:
-                ids_exercises.append(ex_id)
-
-        existing_ids = session.exec(select(Exercise.id).where(Exercise.id.in_(ids_exercises))).all()
-
-        not_found = set(ids_exercises) - set(existing_ids)
-        
-        if not_found:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Exercises not found with IDs: {list(not_found)}"
-            )
-        
-        # Recuperando os exercícios de todos os dias
-        exercises = session.exec(select(Exercise).where(Exercise.id.in_(existing_ids))).all()
-        
-        # Criando o TrainingSheetWeek
-        trainingSheetWeek = TrainingSheetWeek(
-            name=training_sheet_week_request.name,
-            description=training_sheet_week_request.description,
-            level=training_sheet_week_request.level,
+async def create(training_sheet_week_request: TrainingSheetWeekRequest, session: AsyncSession = Depends(get_session)):
+
+    # Verificando se todos os exercise_ids existem
+    not_found = await _missing_exercise_ids(session, _exercise_ids(training_sheet_week_request))
+    if not_found:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Exercises not found with IDs: {list(not_found)}"
         )
-        session.add(trainingSheetWeek)
-        session.commit()
-        session.refresh(trainingSheetWeek)
-
-        # Criando os TrainingSheetDays
-        for day_request in training_sheet_week_request.training_sheet_days:
-            trainingSheetDay = TrainingSheetDay(
-                focus_area=day_request.focus_area,
-                day_of_week=day_request.day_of_week,
-                training_sheet_week_id=trainingSheetWeek.id # Linka ao ID da semana
-            )
-            session.add(trainingSheetDay)
-            session.commit()
-            session.refresh(trainingSheetDay) # Garante que o ID do dia foi populado
-
-            # Criar os links entre exercicos e TrainingSheetDay
-            for i, ex_id in enumerate(day_request.exercises_ids):
-                link = TrainingSheetDayExerciseLink (
-                    training_sheet_day_id=trainingSheetDay.id,
-                    exercise_id=ex_id,
-                    order = i+1 
-                )
-                session.add(link)
-            
-            session.commit() # Commit para os links de cada dia
-            session.refresh(trainingSheetDay)
-
-        logger.info(f"Training sheet created: {trainingSheetWeek.id} - {trainingSheetWeek.name}")
-        return {"message": "Training sheet created successfully", "id": trainingSheetWeek.id}
+
+    # Semana e dias entram em um único flush; os links em um INSERT em lote; tudo em uma transação
+    trainingSheetWeek, days = _new_training_sheet_week(training_sheet_week_request)
+    session.add(trainingSheetWeek)
+    await session.flush()
+    await _insert_day_exercise_links(session, days)
+    await session.commit()
+
+    logger.info("Training sheet created: %s - %s", trainingSheetWeek.id, trainingSheetWeek.name)
+    return {"message": "Training sheet created successfully", "id": trainingSheetWeek.id}
+
+@training_sheet_router.post("/training_sheet/bulk_import")
+async def bulk_import(training_sheet_week_requests: list[TrainingSheetWeekRequest], session: AsyncSession = Depends(get_session)):
+    if len(training_sheet_week_requests) > BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_IMPORT_MAX_ITEMS} training sheets per request")
+
+    # Valida os exercícios de todas as fichas de uma só vez
+    all_exercise_ids = set().union(*(_exercise_ids(request) for request in training_sheet_week_requests))
+    not_found = await _missing_exercise_ids(session, all_exercise_ids)
+
+    errors: list[TrainingSheetBulkImportError] = []
+    valid: list[tuple[int, TrainingSheetWeek]] = []
+    all_days: list[tuple[TrainingSheetDay, TrainingSheetDayRequest]] = []
+    for index, request in enumerate(training_sheet_week_requests):
+        missing = _exercise_ids(request) & not_found
+        if missing:
+            errors.append(TrainingSheetBulkImportError(index=index, detail=f"Exercises not found with IDs: {sorted(missing)}"))
+            continue
+        trainingSheetWeek, days = _new_training_sheet_week(request)
+        valid.append((index, trainingSheetWeek))
+        all_days.extend(days)
+
+    # Todas as fichas válidas em uma transação: um flush para semanas e dias, um INSERT para os links
+    session.add_all([week for _, week in valid])
+    await session.flush()
+    await _insert_day_exercise_links(session, all_days)
+    await session.commit()
+
+    created = [TrainingSheetBulkImportCreated(index=index, id=week.id) for index, week in valid]
+    logger.info("Bulk import: %s training sheets created, %s rejected", len(created), len(errors))
+    return TrainingSheetBulkImportResponse(created=created, errors=errors)
     
 @training_sheet_router.post("/training_sheet/associate_user")
-def associate_user(user_id: int, training_sheet_week_id: int):
-    with Session(engine) as session:
-    
-        # verificando se user existe
-        user = session.get(User, user_id)
-        if not user:
-            logger.warning("User with id {request.user_id} not found in method associate_user."),
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"User with id {user_id} not found.")
-
-        # verificando se training sheet existe
-        training_sheet_week = session.get(TrainingSheetWeek, training_sheet_week_id)
-        if not training_sheet_week:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Traning sheet week with id {training_sheet_week_id} not found.")
-
-        # Verificar se a associação já existe
-        existing_link = session.exec(
-            select(TrainingSheetWeekUserLink)
-            .where(TrainingSheetWeekUserLink.user_id == user_id)
-            .where(TrainingSheetWeekUserLink.training_sheet_week_id == training_sheet_week_id)
-        ).first()
-
-        if existing_link:
-            logger.warning(f"Association between user_id {user_id} and training_sheet_week_id {training_sheet_week_id} already exists.")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"Association between user_id {user_id} and training_sheet_week_id {training_sheet_week_id} already exists."
-            )
-
-        # Criar a nova associação
-        new_link = TrainingSheetWeekUserLink(
-            user_id=user_id,
-            training_sheet_week_id=training_sheet_week_id
+async def associate_user(user_id: int, training_sheet_week_id: int, session: AsyncSession = Depends(get_session)):
+
+    # verificando se user existe
+    user = await session.get(User, user_id)
+    if not user:
+        logger.warning("User with id %s not found in method associate_user.", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"User with id {user_id} not found.")
+
+    # verificando se training sheet existe
+    training_sheet_week = await session.get(TrainingSheetWeek, training_sheet_week_id)
+    if not training_sheet_week:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Traning sheet week with id {training_sheet_week_id} not found.")
+
+    # Verificar se a associação já existe
+    existing_link = (await session.exec(
+        select(TrainingSheetWeekUserLink)
+        .where(TrainingSheetWeekUserLink.user_id == user_id)
+        .where(TrainingSheetWeekUserLink.training_sheet_week_id == training_sheet_week_id)
+    )).first()
+
+    if existing_link:
+        logger.warning("Association between user_id %s and training_sheet_week_id %s already exists.", user_id, training_sheet_week_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Association between user_id {user_id} and training_sheet_week_id {training_sheet_week_id} already exists."
         )
 
-        session.add(new_link)
-        session.commit()
-        session.refresh(new_link) 
+    # Criar a nova associação
+    new_link = TrainingSheetWeekUserLink(
+        user_id=user_id,
+        training_sheet_week_id=training_sheet_week_id
+    )
+
+    session.add(new_link)
+    await update_training_sheet_user_counts(session, added=[training_sheet_week_id])
+    await session.commit()
+    await session.refresh(new_link) 
 
-        return {"message": "Association successfully created!", "link_id": {"user_id": new_link.user_id, "training_sheet_week_id": new_link.training_sheet_week_id}}
+    return {"message": "Association successfully created!", "link_id": {"user_id": new_link.user_id, "training_sheet_week_id": new_link.training_sheet_week_id}}
 
 
 
 @training_sheet_router.put("/training_sheet/update/{training_sheet_id}", status_code=status.HTTP_200_OK) # Adicione o status_code
-def update(training_sheet_id: int, training_sheet_week_request: TrainingSheetWeekRequest,):
+async def update(training_sheet_id: int, training_sheet_week_request: TrainingSheetWeekRequest, session: AsyncSession = Depends(get_session)):
     
-    with Session(engine) as session:
-        # 1. Verifica se o TrainingSheetWeek existe
-        training_sheet_week = session.get(TrainingSheetWeek, training_sheet_id)
-        if not training_sheet_week:
-            logger.warning(f"Training sheet with ID {training_sheet_id} not found for update")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
-
-        # 2. Atualiza os campos principais do TrainingSheetWeek
-        training_sheet_week.name = training_sheet_week_request.name
-        training_sheet_week.description = training_sheet_week_request.description
-        training_sheet_week.level = training_sheet_week_request.level
-
-        # 3. Deleta os dias de treino associados (automaticamente remove os links devido à relação de cascata)
-        existing_day = session.exec(select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_id)).all()
-        for day in existing_day:
-            session.delete(day)
-
-        session.commit()  # Commit para deletar os dias antigos
-        
-   
-        # Criando os TrainingSheetDays
-        for day_request in training_sheet_week_request.training_sheet_days:
-            trainingSheetDay = TrainingSheetDay(
-                focus_area=day_request.focus_area,
-                day_of_week=day_request.day_of_week,
-                training_sheet_week_id=training_sheet_week.id # Linka ao ID da semana
-            )
-            session.add(trainingSheetDay)
-            session.commit()
-            session.refresh(trainingSheetDay) # Garante que o ID do dia foi populado
-
-            # Criar os links entre exercicos e TrainingSheetDay
-            for i, ex_id in enumerate(day_request.exercises_ids):
-                link = TrainingSheetDayExerciseLink (
-                    training_sheet_day_id=trainingSheetDay.id,
-                    exercise_id=ex_id,
-                    order = i+1 
-                )
-                session.add(link)
-            
-            session.commit() # Commit para os links de cada dia
-            session.refresh(trainingSheetDay)
-
-        logger.info(f"Training sheet with ID {training_sheet_id} updated successfully")
-        return {"message": "Training sheet updated successfully", "id": training_sheet_week.id}
+    # 1. Verifica se o TrainingSheetWeek existe
+    training_sheet_week = await session.get(TrainingSheetWeek, training_sheet_id)
+    if not training_sheet_week:
+        logger.warning("Training sheet with ID %s not found for update", training_sheet_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
+
+    # 2. Atualiza os campos principais do TrainingSheetWeek
+    training_sheet_week.name = training_sheet_week_request.name
+    training_sheet_week.description = training_sheet_week_request.description
+    training_sheet_week.level = training_sheet_week_request.level
+    # Os dias e exercícios ficam em outras tabelas: força o UPDATE da ficha para incrementar a versão (e o ETag)
+    flag_modified(training_sheet_week, "name")
+
+    # 3. Verificando se todos os exercise_ids existem
+    not_found = await _missing_exercise_ids(session, _exercise_ids(training_sheet_week_request))
+    if not_found:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Exercises not found with IDs: {list(not_found)}"
+        )
+
+    # 4. Deleta os links e os dias de treino antigos com um DELETE para cada tabela
+    old_days = select(TrainingSheetDay.id).where(TrainingSheetDay.training_sheet_week_id == training_sheet_id)
+    await session.exec(sql_delete(TrainingSheetDayExerciseLink).where(TrainingSheetDayExerciseLink.training_sheet_day_id.in_(old_days)))
+    await session.exec(sql_delete(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_id))
+
+    # 5. Cria os novos dias e links, confirmando tudo em um único commit
+    days = _new_training_sheet_days(training_sheet_week_request, training_sheet_week_id=training_sheet_week.id)
+    session.add_all([day for day, _ in days])
+    await session.flush()
+    await _insert_day_exercise_links(session, days)
+    await session.commit()
+
+    logger.info("Training sheet with ID %s updated successfully", training_sheet_id)
+    return {"message": "Training sheet updated successfully", "id": training_sheet_week.id}
 
 
 @training_sheet_router.delete("/training_sheet/delete/{training_sheet_id}")
-def delete(training_sheet_id: int):
-    with Session(engine) as session:
-
-        # Verifica se o TrainingSheetWeek existe e obtém o objeto
-        statement = select(TrainingSheetWeek).where(TrainingSheetWeek.id == training_sheet_id)
-        training_sheet_week = session.exec(statement).first()
-
-        if not training_sheet_week:
-            logger.warning(f"Training sheet with ID {training_sheet_id} not found for deletion")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
-        
-        # Deleta os dias de treino associados (automaticamente remove os links devido à relação de cascata)
-        session.delete(training_sheet_week)
-        session.commit()
-
-        logger.info(f"Training sheet with ID {training_sheet_id} deleted successfully")
-        return {"message": "Training sheet deleted successfully"}
-    
-@training_sheet_router.get("/training_sheet/get_more_used_training_sheets/")
-def get_more_used(limit: int = 5):
-    with Session(engine) as session:
-        statement = (
-            select(TrainingSheetWeek, func.count(TrainingSheetWeekUserLink.user_id).label("count"))
-             .join(TrainingSheetWeekUserLink, TrainingSheetWeekUserLink.training_sheet_week_id == TrainingSheetWeek.id) 
-             .group_by(TrainingSheetWeek.id)
-             .order_by(func.count(TrainingSheetWeekUserLink.user_id).desc())
-             .limit(limit) 
-        )
+async def delete(training_sheet_id: int, session: AsyncSession = Depends(get_session)):
 
-        training_sheet_weeks: list[tuple[TrainingSheetWeek, int]] = session.exec(statement).all()
-
-        if not training_sheet_weeks:
-            logger.warning("Not found used training sheets")
-            raise HTTPException(status_code=404, detail="Not found used training sheets")
-
-        training_sheet_weeks_response = []
-        for training_sheet_week, count in training_sheet_weeks:
-            # Obtendo os dias de treino associados
-            days_statement = select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id == training_sheet_week.id)
-            training_sheet_days = session.exec(days_statement).all()
-
-            training_sheet_days_response = []
-
-            for day in training_sheet_days:
-                # Obtendo os exercícios associados a cada dia
-                links_statement = select(TrainingSheetDayExerciseLink.exercise_id).where(
-                    TrainingSheetDayExerciseLink.training_sheet_day_id == day.id).order_by(TrainingSheetDayExerciseLink.order)
-                
-                exercise_ids = session.exec(links_statement).all()
-
-                # Criando a resposta para o dia de treino
-                training_sheet_day_response = TrainingSheetDayResponse(
-                    focus_area=day.focus_area,
-                    day_of_week=day.day_of_week,
-                    exercises_ids=exercise_ids
-                )
-                training_sheet_days_response.append(training_sheet_day_response)
-
-            training_sheet_week_response = TrainingSheetWeekResponse(
-                id=training_sheet_week.id,
-                name=training_sheet_week.name,
-                description=training_sheet_week.description,
-                level=training_sheet_week.level,
-                training_sheet_days=training_sheet_days_response
-            )
-
-            training_sheet_weeks_response.append(TrainingSheetWeekMoreUsedResponse(training_sheet_week_response=training_sheet_week_response, count=count))
-
-        logger.info(f"More used training sheets returned")
-        return training_sheet_weeks_response
+    # Verifica se o TrainingSheetWeek existe e obtém o objeto
+    statement = select(TrainingSheetWeek).where(TrainingSheetWeek.id == training_sheet_id)
+    training_sheet_week = (await session.exec(statement)).first()
+
+    if not training_sheet_week:
+        logger.warning("Training sheet with ID %s not found for deletion", training_sheet_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Training sheet not found")
+
+    # Deleta os dias de treino associados (automaticamente remove os links devido à relação de cascata)
+    await delete_training_sheet_counter(session, training_sheet_id)
+    await session.delete(training_sheet_week)
+    await session.commit()
+
+    logger.info("Training sheet with ID %s deleted successfully", training_sheet_id)
+    return {"message": "Training sheet deleted successfully"}
+
+@training_sheet_router.get("/training_sheet/get_more_used_training_sheets/")
+async def get_more_used(limit: int = 5, session: AsyncSession = Depends(get_session)):
+    # Leitura top-N pelo índice do contador mantido a cada associação de usuário
+    statement = (
+        select(TrainingSheetWeek, TrainingSheetUserCount.user_count)
+         .join(TrainingSheetUserCount, TrainingSheetUserCount.training_sheet_week_id == TrainingSheetWeek.id)
+         .where(TrainingSheetUserCount.user_count > 0)
+         .order_by(TrainingSheetUserCount.user_count.desc(), TrainingSheetWeek.id)
+         .limit(limit)
+    )
+
+    training_sheet_weeks: list[tuple[TrainingSheetWeek, int]] = (await session.exec(statement)).all()
+
+    if not training_sheet_weeks:
+        logger.warning("Not found used training sheets")
+        raise HTTPException(status_code=404, detail="Not found used training sheets")
+
+    weeks_response = await build_training_sheet_week_responses(session, [week for week, _ in training_sheet_weeks])
+
+    training_sheet_weeks_response = []
+    for training_sheet_week_response, (_, count) in zip(weeks_response, training_sheet_weeks):
+        training_sheet_weeks_response.append(TrainingSheetWeekMoreUsedResponse(training_sheet_week_response=training_sheet_week_response, count=count))
+
+    logger.info("More used training sheets returned")
+    return training_sheet_weeks_response
 
@@ -1,172 +1,262 @@
-import math
 from datetime import date, datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from dtos.user.user_request import user_request
+from dtos.user.personal_record_response import personal_record_response
+from dtos.user.user_progress_response import user_progress_period, user_progress_response
 from dtos.user.user_with_matching_pr_response import UserWithMatchingPhysicalRecord
+from models.models_links import TrainingSheetWeekUserLink
+from models.personal_record import PersonalRecord
 from models.physical_record import PhysicalRecord
+from models.training_volume_rollup import TrainingVolumeRollup
 from models.user import User
 from log.logger_config import get_logger
-from db.database import engine
-from sqlmodel import Session, func, select
-from utils.pagination import PaginationParams, PaginatedResponse
+from db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import func, select
+from utils.etag import entity_etag, list_etag, not_modified_response
+from utils.pagination import PaginationParams, PaginatedResponse, paginate
+from utils.exercise_catalog import exercise_catalog
+from utils.personal_records import delete_user_personal_records
+from utils.popularity_counters import update_training_sheet_user_counts
+from utils.progress_period import progress_period
+from utils.training_volume_rollups import delete_user_training_volume_rollups, period_start
+from utils.totals import count_total
+from utils.total_mode import total_mode
 
 logger = get_logger("user_logger", "log/user.log")
 
 user_router = APIRouter(tags=["Users"])
 
 @user_router.get("/user/get_by_id/{user_id}")
-def get_by_id(user_id: int):
-    with Session(engine) as session:
-        statement = select(User).where(User.id == user_id)
-        result = session.exec(statement).first()
-        if result is not None:
-            logger.info(f"User with ID {user_id} retrieved successfully")
-            return result
-        else:
-            logger.warning(f"User with ID {user_id} not found")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+async def get_by_id(user_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    statement = select(User).where(User.id == user_id)
+    result = (await session.exec(statement)).first()
+    if result is not None:
+        not_modified = not_modified_response(request, response, entity_etag(result))
+        if not_modified is not None:
+            return not_modified
+        logger.info("User with ID %s retrieved successfully", user_id)
+        return result
+    else:
+        logger.warning("User with ID %s not found", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
 @user_router.get("/user/get_all")
-def get_all(pagination: PaginationParams = Depends()):
+async def get_all(request: Request, response: Response, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
     
-    with Session(engine) as session:
-        # desvio para a página atual
-        offset = (pagination.page-1) * pagination.per_page 
-        
-        # Consulta paginada
-        statement = select(User).offset(offset).limit(pagination.per_page)
-        results = session.exec(statement).all()
-        
-        if not results:
-            logger.warning("No users found in the database")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No users found"
-            )
-        
-        # Contagem do total de usuários
-        total = session.exec(select(func.count(User.id))).one()
-        logger.info(f"Successfully fetched {len(results)} users (page {pagination.page})")
-        
-        return PaginatedResponse(
-            items=results,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
+    # Consulta paginada
+    results, next_cursor = await paginate(session, select(User), pagination, User.id)
+
+    if not results:
+        logger.warning("No users found in the database")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No users found"
         )
 
+    # Contagem do total de usuários
+    total = await count_total(session, User, [], pagination.total)
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(results, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+    logger.info("Successfully fetched %s users (page %s)", len(results), pagination.page)
+
+    return PaginatedResponse(
+        items=results,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
+
 @user_router.get("/user/filter")
-def filter_users(name: str = None, objective: str = None, date_registration: str = None, pagination: PaginationParams = Depends()):
+async def filter_users(request: Request, response: Response, name: str = None, objective: str = None, date_registration: str = None, pagination: PaginationParams = Depends(), session: AsyncSession = Depends(get_session)):
     # validando data
     if date_registration:
         try:
             datetime.strptime(date_registration, '%Y-%m-%d').date()
         except ValueError:
-            logger.error(f"Invalid date format: {date_registration}")
+            logger.error("Invalid date format: %s", date_registration)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Formato de data inválido. Use YYYY-MM-DD"
             )
      
-    with Session(engine) as session:
-        # Construindo condições de filtro
-        conditions = []
-        if name:
-            conditions.append(func.lower(User.name) == name.lower())
-        if objective:
-            conditions.append(func.lower(User.objective) == objective.lower())
-        if date_registration:
-            conditions.append(User.registration_date == date.fromisoformat(date_registration))
-
-        offset = (pagination.page-1) * pagination.per_page 
-        statement = select(User).offset(offset).limit(pagination.per_page)
-        
-        # Pegando o total de registros com tais condições
-        count_stmt = select(func.count(User.id))
-        if conditions:
-            count_stmt = count_stmt.where(*conditions)
-        total = session.exec(count_stmt).one()
-
-        # Aplicando condições de filtro
-        if conditions:
-            statement = statement.where(*conditions)
-        users = session.exec(statement).all()
-
-        if not users:
-            logger.warning("No users found with the given criteria")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No users found with the given criteria")
-        
-        # Retornando com paginação
-        logger.info(f"Successfully filtered {len(users)} users")
-        return PaginatedResponse(
-            items=users,
-            total=total,
-            page=pagination.page,
-            per_page=pagination.per_page,
-            total_pages= math.ceil((total) / pagination.per_page)
-        )
+    # Construindo condições de filtro
+    conditions = []
+    if name:
+        conditions.append(func.lower(User.name) == name.lower())
+    if objective:
+        conditions.append(func.lower(User.objective) == objective.lower())
+    if date_registration:
+        conditions.append(User.registration_date == date.fromisoformat(date_registration))
+
+    statement = select(User)
+
+    # Pegando o total de registros com tais condições
+    total = await count_total(session, User, conditions, pagination.total)
+
+    # Aplicando condições de filtro
+    if conditions:
+        statement = statement.where(*conditions)
+    users, next_cursor = await paginate(session, statement, pagination, User.id)
+
+    if not users:
+        logger.warning("No users found with the given criteria")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No users found with the given criteria")
+
+    # Se o cliente já tem esta página (mesmo ETag), responde 304 sem montar o corpo
+    not_modified = not_modified_response(request, response, list_etag(users, total, pagination.page, pagination.per_page, next_cursor))
+    if not_modified is not None:
+        return not_modified
+
+    # Retornando com paginação
+    logger.info("Successfully filtered %s users", len(users))
+    return PaginatedResponse(
+        items=users,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
 
 @user_router.get("/user/get_quantity")
-def get_quantity():
-    with Session(engine) as session:
-        quantity = session.exec(select(func.count(User.id))).one()
-    logger.info(f"Successfully fetched the total number of users: {quantity}")
+async def get_quantity(approx: bool = False, session: AsyncSession = Depends(get_session)):
+    quantity = await count_total(session, User, [], total_mode.approx if approx else total_mode.exact)
+    logger.info("Successfully fetched the total number of users: %s", quantity)
     return {"quantity": quantity}
     
 @user_router.post("/user/create")
-def create(userDto: user_request):
+async def create(userDto: user_request, session: AsyncSession = Depends(get_session)):
     newUser = User( 
         name = userDto.name, 
         objective = userDto.objective, 
         registration_date = date.today()
     ) 
-    with Session(engine) as session:
-        session.add(newUser)
-        session.commit()
-        session.refresh(newUser)
-    
-    logger.info(f"User {newUser.name} created successfully with ID {newUser.id}")
+    session.add(newUser)
+    await session.commit()
+    await session.refresh(newUser)
+
+    logger.info("User %s created successfully with ID %s", newUser.name, newUser.id)
     return {"message": "User created successfully", "id": newUser.id}
 
 @user_router.put("/user/update/{user_id}")
-def update(user_id: int, userDto: user_request):
-    with Session(engine) as session:
-        statament = select(User).where(User.id == user_id)
-        user = session.exec(statament).first()
-
-        if user is None:
-            logger.warning(f"User with ID {user_id} not found for update")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        
-        user.name = userDto.name
-        user.objective = userDto.objective
-
-        session.commit()
-        session.refresh(user)
-
-    logger.info(f"User with ID {user_id} updated successfully")
+async def update(user_id: int, userDto: user_request, session: AsyncSession = Depends(get_session)):
+    statament = select(User).where(User.id == user_id)
+    user = (await session.exec(statament)).first()
+
+    if user is None:
+        logger.warning("User with ID %s not found for update", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    user.name = userDto.name
+    user.objective = userDto.objective
+
+    await session.commit()
+    await session.refresh(user)
+
+    logger.info("User with ID %s updated successfully", user_id)
     return {"message": "User updated successfully"}
 
 @user_router.delete("/user/delete/{user_id}")
-def delete(user_id: int):
-    with Session(engine) as session:
-        statement = select(User).where(User.id == user_id)
-        user = session.exec(statement).first()
+async def delete(user_id: int, session: AsyncSession = Depends(get_session)):
+    statement = select(User).where(User.id == user_id)
+    user = (await session.exec(statement)).first()
 
-        if user is None:
-            logger.warning(f"User with ID {user_id} not found for deletion")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if user is None:
+        logger.warning("User with ID %s not found for deletion", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        session.delete(user)
-        session.commit()
+    # As associações do usuário com fichas são removidas junto, então saem dos contadores de popularidade
+    training_sheet_week_ids = (await session.exec(
+        select(TrainingSheetWeekUserLink.training_sheet_week_id).where(TrainingSheetWeekUserLink.user_id == user_id)
+    )).all()
+    await update_training_sheet_user_counts(session, removed=training_sheet_week_ids)
+    await delete_user_training_volume_rollups(session, user_id)
+    await delete_user_personal_records(session, user_id)
 
-    logger.info(f"User with ID {user_id} deleted successfully")
+    await session.delete(user)
+    await session.commit()
+
+    logger.info("User with ID %s deleted successfully", user_id)
     return {"message": "User deleted successfully"}
 
+# Volume, quantidade de treinos e duração por semana ou mês, lidos da tabela de totais
+# (TrainingVolumeRollup) mantida pelas rotas de treino executado
+@user_router.get("/user/{user_id}/progress")
+async def get_progress(
+    user_id: int,
+    period: progress_period = progress_period.week,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    user = await session.get(User, user_id)
+    if user is None:
+        logger.warning("User with ID %s not found for progress", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    statement = select(TrainingVolumeRollup).where(
+        TrainingVolumeRollup.user_id == user_id,
+        TrainingVolumeRollup.period == period.value,
+    )
+    # O período que contém start_date entra inteiro no resultado
+    if start_date is not None:
+        statement = statement.where(TrainingVolumeRollup.period_start >= period_start(period, start_date))
+    if end_date is not None:
+        statement = statement.where(TrainingVolumeRollup.period_start <= end_date)
+    rollups = (await session.exec(statement.order_by(TrainingVolumeRollup.period_start))).all()
+
+    logger.info("Successfully fetched %s %s progress periods for user %s", len(rollups), period.value, user_id)
+    return user_progress_response(
+        user_id=user_id,
+        period=period.value,
+        periods=[
+            user_progress_period(
+                period_start=rollup.period_start,
+                volume=round(rollup.volume, 2),
+                session_count=rollup.session_count,
+                total_duration=rollup.total_duration
+            ) for rollup in rollups
+        ]
+    )
+
+# Recordes pessoais (maior peso e maior 1RM estimado) por exercício, mantidos pelas rotas de treino executado
+@user_router.get("/user/{user_id}/personal_records")
+async def get_personal_records(user_id: int, exercise_id: Optional[int] = None, session: AsyncSession = Depends(get_session)):
+    user = await session.get(User, user_id)
+    if user is None:
+        logger.warning("User with ID %s not found for personal records", user_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    statement = select(PersonalRecord).where(PersonalRecord.user_id == user_id)
+    if exercise_id is not None:
+        statement = statement.where(PersonalRecord.exercise_id == exercise_id)
+    records = (await session.exec(statement.order_by(PersonalRecord.exercise_id))).all()
+
+    # Os nomes dos exercícios vêm do catálogo em memória. Os IDs fora do catálogo são conferidos no banco
+    # de uma vez só; depois disso get() responde só com o catálogo. Um recorde que aponte para um exercício
+    # que não existe mais (ex.: excluído direto no banco, sem passar pela rota) fica sem nome.
+    missing = await exercise_catalog.missing_ids(session, {record.exercise_id for record in records})
+    response_list: list[personal_record_response] = []
+    for record in records:
+        exercise = None if record.exercise_id in missing else await exercise_catalog.get(session, record.exercise_id)
+        response_list.append(personal_record_response(
+            exercise_id=record.exercise_id,
+            exercise_name=exercise.name if exercise is not None else None,
+            best_weight=record.best_weight,
+            best_weight_date=record.best_weight_date,
+            best_estimated_1rm=record.best_estimated_1rm,
+            best_estimated_1rm_date=record.best_estimated_1rm_date
+        ))
+
+    logger.info("Successfully fetched %s personal records for user %s", len(response_list), user_id)
+    return response_list
+
 @user_router.get("/user/get_by_pr_criteria")
-def get_by_pr_criteria(
+async def get_by_pr_criteria(
     min_weight: Optional[float] = None,
     max_weight: Optional[float] = None,
     min_body_fat_percentage: Optional[float] = None, 
@@ -176,54 +266,70 @@ def get_by_pr_criteria(
     min_muscle_mass_percentage: Optional[float] = None, 
     max_muscle_mass_percentage: Optional[float] = None, 
     start_recorded_at: Optional[date] = None,       
-    end_recorded_at: Optional[date] = None          
+    end_recorded_at: Optional[date] = None,
+    latest_only: bool = Query(False, description="Filter only each user's latest physical record (current measurements)"),
+    pagination: PaginationParams = Depends(),
+    session: AsyncSession = Depends(get_session)
 ):
-    with Session(engine) as session:
-        statement = (
-            select(User, PhysicalRecord)
-            .join(PhysicalRecord)
-        )
+    # Com latest_only o join usa o ponteiro User.latest_physical_record_id: uma linha por usuário,
+    # sem medições antigas. Sem ele, cada registro físico do usuário que atende aos filtros é uma linha.
+    if latest_only:
+        conditions = [PhysicalRecord.id == User.latest_physical_record_id]
+        key_columns = (User.id,)
+    else:
+        conditions = [PhysicalRecord.user_id == User.id]
+        key_columns = (User.id, PhysicalRecord.id)
+
+    # Filtros de peso
+    if min_weight is not None:
+        conditions.append(PhysicalRecord.weight >= min_weight)
+    if max_weight is not None:
+        conditions.append(PhysicalRecord.weight <= max_weight)
+
+    # Filtros para body_fat_percentage
+    if min_body_fat_percentage is not None:
+        conditions.append(PhysicalRecord.body_fat_percentage >= min_body_fat_percentage)
+    if max_body_fat_percentage is not None:
+        conditions.append(PhysicalRecord.body_fat_percentage <= max_body_fat_percentage)
+
+    # Filtros para height
+    if min_height is not None:
+        conditions.append(PhysicalRecord.height >= min_height)
+    if max_height is not None:
+        conditions.append(PhysicalRecord.height <= max_height)
+
+    # Filtros para muscle_mass_percentage
+    if min_muscle_mass_percentage is not None:
+        conditions.append(PhysicalRecord.muscle_mass_percentage >= min_muscle_mass_percentage)
+    if max_muscle_mass_percentage is not None:
+        conditions.append(PhysicalRecord.muscle_mass_percentage <= max_muscle_mass_percentage)
+
+    # Filtros para intervalo de datas
+    if start_recorded_at is not None:
+        conditions.append(PhysicalRecord.recorded_at >= start_recorded_at)
+    if end_recorded_at is not None:
+        conditions.append(PhysicalRecord.recorded_at <= end_recorded_at)
+
+    #Executa a consulta paginada
+    results, next_cursor = await paginate(session, select(User, PhysicalRecord).where(*conditions), pagination, *key_columns)
+
+    if not results:
+        logger.warning("Not found user with this criteria")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Users not found with this criteria")
+
+    # Total de pares (usuário, registro físico); a condição do join liga as duas tabelas na contagem
+    total = await count_total(session, PhysicalRecord, conditions, pagination.total)
+
+    # Retorna o user + pr
+    response_list: list[UserWithMatchingPhysicalRecord] = []
+    for user_obj, pr_obj in results:
+        response_list.append(UserWithMatchingPhysicalRecord(user=user_obj, physical_record=pr_obj))
 
-        # Filtros de peso
-        if min_weight is not None:
-            statement = statement.where(PhysicalRecord.weight >= min_weight)
-        if max_weight is not None:
-            statement = statement.where(PhysicalRecord.weight <= max_weight)
-
-        # Filtros para body_fat_percentage
-        if min_body_fat_percentage is not None:
-            statement = statement.where(PhysicalRecord.body_fat_percentage >= min_body_fat_percentage)
-        if max_body_fat_percentage is not None:
-            statement = statement.where(PhysicalRecord.body_fat_percentage <= max_body_fat_percentage)
-
-        # Filtros para height
-        if min_height is not None:
-            statement = statement.where(PhysicalRecord.height >= min_height)
-        if max_height is not None:
-            statement = statement.where(PhysicalRecord.height <= max_height)
-
-        # Filtros para muscle_mass_percentage
-        if min_muscle_mass_percentage is not None:
-            statement = statement.where(PhysicalRecord.muscle_mass_percentage >= min_muscle_mass_percentage)
-        if max_muscle_mass_percentage is not None:
-            statement = statement.where(PhysicalRecord.muscle_mass_percentage <= max_muscle_mass_percentage)
-
-        # Filtros para intervalo de datas
-        if start_recorded_at is not None:
-            statement = statement.where(PhysicalRecord.recorded_at >= start_recorded_at)
-        if end_recorded_at is not None:
-            statement = statement.where(PhysicalRecord.recorded_at <= end_recorded_at)
-
-        #Executa a consulta
-        results: list[tuple[User, PhysicalRecord]] = session.exec(statement).all()
-
-        if not results:
-            logger.warning(f"Not found user with this criteria")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Users not found with this criteria")
-
-        # Retorna o user + pr
-        response_list: list[UserWithMatchingPhysicalRecord] = []
-        for user_obj, pr_obj in results:
-            response_list.append(UserWithMatchingPhysicalRecord(user=user_obj, physical_record=pr_obj))
-
-        return response_list
\ No newline at end of file
+    logger.info("Successfully fetched %s users matching the physical record criteria", len(response_list))
+    return PaginatedResponse(
+        items=response_list,
+        total=total,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        next_cursor=next_cursor
+    )
@@ -0,0 +1,24 @@
+"""Recalcula os recordes pessoais por usuário e exercício (PersonalRecord).
+
+Os recordes são mantidos pelas rotas de treino executado na mesma transação das escritas; este
+comando os recalcula a partir de ExecutedExercise e ExecutedDailyTraining. A migração que cria a
+tabela já a preenche com o histórico; use-o quando houver escritas feitas fora da API.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m scripts.backfill_personal_records
+"""
+import asyncio
+
+from db.database import async_session, engine
+from utils.personal_records import rebuild_personal_records
+
+async def main():
+    async with async_session() as session:
+        rows = await rebuild_personal_records(session)
+        await session.commit()
+    await engine.dispose()
+
+    print(f"Personal records rebuilt: {rows} rows")
+
+if __name__ == "__main__":
+    asyncio.run(main())
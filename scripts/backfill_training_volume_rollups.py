@@ -0,0 +1,24 @@
+"""Recalcula os totais de volume por usuário e período (TrainingVolumeRollup).
+
+Os totais são mantidos pelas rotas de treino executado na mesma transação das escritas; este
+comando os recalcula a partir de ExecutedDailyTraining e ExecutedExercise. A migração que cria a
+tabela já a preenche com o histórico; use-o quando houver escritas feitas fora da API.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m scripts.backfill_training_volume_rollups
+"""
+import asyncio
+
+from db.database import async_session, engine
+from utils.training_volume_rollups import rebuild_training_volume_rollups
+
+async def main():
+    async with async_session() as session:
+        rows = await rebuild_training_volume_rollups(session)
+        await session.commit()
+    await engine.dispose()
+
+    print(f"Training volume rollups rebuilt: {rows} rows")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""Verifica o tempo de inicialização a frio de um worker (importação de main + startup).
+
+Mede, em processos novos, a importação da aplicação e o evento de startup na configuração
+usada no autoscaling (LAZY_ROUTERS=true e DB_SCHEMA_STARTUP=check_revision), contra um SQLite
+temporário. Falha (exit code 1) se a mediana passar de COLD_START_BUDGET_MS ou se algum router
+for importado antes da primeira requisição. Mostra também os módulos que mais pesam na
+importação (python -X importtime), para investigar regressões.
+
+A mesma medição roda nos testes (tests/test_cold_start.py, marcado como slow).
+
+Uso:
+    python -m scripts.check_cold_start
+    COLD_START_BUDGET_MS=800 python -m scripts.check_cold_start
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "1200"))
+COLD_START_RUNS = int(os.getenv("COLD_START_RUNS", "5"))
+TOP_MODULES = 15
+# Revisão fictícia gravada em alembic_version e informada em SCHEMA_HEAD_REVISION: a verificação
+# do schema roda sem depender do alembic nem do cache da head
+CHECK_REVISION = "cold_start_check"
+# Os processos filhos importam main a partir da raiz do projeto, de onde quer que a medição seja chamada
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Executado em cada processo novo: importa a aplicação e roda o startup, medindo cada etapa
+_CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+    await main.engine.dispose()
+
+asyncio.run(startup())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (time.perf_counter() - imported) * 1000,
+    "routers": sorted(name for name in sys.modules if name.startswith("routes.")),
+}))
+"""
+
+def _prepare_database(database_url: str):
+    # db.database precisa de DATABASE_URL na importação (o engine da aplicação não é usado aqui).
+    # Nos testes ela já aponta para o banco de testes e não é trocada.
+    os.environ.setdefault("DATABASE_URL", database_url)
+    from sqlalchemy import create_engine, text
+    from sqlmodel import SQLModel
+    import db.database  # noqa: F401 (registra todos os modelos no metadata)
+
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"), {"revision": CHECK_REVISION})
+    engine.dispose()
+
+def _top_modules(env: dict) -> list[tuple[int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], env=env, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    # O importtime lista os módulos filhos antes do pai, com um nível de recuo a mais: os filhos
+    # diretos de main são os de segundo nível logo antes da linha de main
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or not line.split("|")[1].strip().isdigit():
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                break
+            modules = []
+        elif depth == 1:
+            modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:TOP_MODULES]
+
+# Mede a inicialização em COLD_START_RUNS processos novos. Retorna as medianas (import_ms, startup_ms,
+# total_ms), os routers importados antes da primeira requisição e, com top_modules=True, os módulos
+# que mais pesam na importação de main.
+def measure_cold_start(top_modules: bool = False) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'cold_start.db')}"
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "LAZY_ROUTERS": "true",
+            "DB_SCHEMA_STARTUP": "check_revision",
+            "SCHEMA_HEAD_REVISION": CHECK_REVISION,
+        }
+        _prepare_database(database_url)
+
+        runs = []
+        for _ in range(COLD_START_RUNS):
+            result = subprocess.run([sys.executable, "-c", _CHILD], env=env, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        slowest_modules = _top_modules(env) if top_modules else []
+
+    return {
+        "import_ms": statistics.median(run["import_ms"] for run in runs),
+        "startup_ms": statistics.median(run["startup_ms"] for run in runs),
+        "total_ms": statistics.median(run["import_ms"] + run["startup_ms"] for run in runs),
+        "eager_routers": sorted({name for run in runs for name in run["routers"]}),
+        "top_modules": slowest_modules,
+    }
+
+def main() -> int:
+    measurement = measure_cold_start(top_modules=True)
+    total_ms = measurement["total_ms"]
+
+    print("Slowest imports of main (cumulative):")
+    for microseconds, name in measurement["top_modules"]:
+        print(f"  {microseconds / 1000:>8.1f} ms  {name}")
+    print(
+        f"\nImport {measurement['import_ms']:.0f} ms + startup {measurement['startup_ms']:.0f} ms = {total_ms:.0f} ms "
+        f"(median of {COLD_START_RUNS}, budget {COLD_START_BUDGET_MS:.0f} ms)"
+    )
+
+    failures = 0
+    eager_routers = measurement["eager_routers"]
+    if eager_routers:
+        print(f"[FAIL] Routers imported before the first request: {', '.join(eager_routers)}")
+        failures += 1
+    if total_ms > COLD_START_BUDGET_MS:
+        print(f"[FAIL] Cold start over budget by {total_ms - COLD_START_BUDGET_MS:.0f} ms")
+        failures += 1
+
+    if failures:
+        return 1
+    print("Cold start within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
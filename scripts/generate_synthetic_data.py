@@ -0,0 +1,348 @@
+"""Gera dados sintéticos realistas de treino e os grava em massa no banco de DATABASE_URL.
+
+Cria usuários, catálogo de exercícios, fichas de treino (semanas, dias e exercícios) com as
+associações de usuários, treinos executados com seus exercícios e históricos de registros
+físicos. Depois preenche as tabelas derivadas (totais de volume, recordes pessoais, contadores
+de popularidade e o ponteiro para o registro físico mais recente), como os backfills fariam.
+
+A atividade segue uma lei de potência (poucos usuários concentram a maior parte dos treinos,
+e os exercícios e fichas mais populares concentram o uso) e tem sazonalidade anual (pico em
+janeiro) e semanal (menos treinos no fim de semana). As cargas progridem ao longo do histórico.
+
+Uso:
+    DATABASE_URL=sqlite:///dev.db python -m scripts.generate_synthetic_data
+    DATABASE_URL=postgresql://... python -m scripts.generate_synthetic_data --users 50000 --trainings 2000000
+    python -m scripts.generate_synthetic_data --help
+
+O banco deve estar vazio (as tabelas que não existirem são criadas). As linhas são gravadas em
+lotes de --chunk-rows, com COPY no PostgreSQL e INSERT em lote nos demais bancos.
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from bisect import bisect_left
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.database import async_session, create_db_and_tables, engine
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from models.exercise import Exercise
+from models.models_links import TrainingSheetDayExerciseLink, TrainingSheetWeekUserLink
+from models.physical_record import PhysicalRecord
+from models.training_sheet_day import TrainingSheetDay
+from models.training_sheet_week import TrainingSheetWeek
+from models.user import User
+from utils.bulk_insert import insert_rows, reset_id_sequence
+from utils.day_week import day_week
+from utils.latest_physical_record import rebuild_latest_physical_records
+from utils.level_exercise import level_exercise
+from utils.personal_records import rebuild_personal_records
+from utils.popularity_counters import reconcile_counters
+from utils.training_volume_rollups import rebuild_training_volume_rollups
+
+# Exercícios do catálogo por grupo muscular; o nome combina equipamento e movimento
+MOVEMENTS = {
+    "Chest": ["Bench Press", "Incline Press", "Fly", "Push-up", "Dip"],
+    "Back": ["Row", "Pull-up", "Lat Pulldown", "Deadlift", "Pullover"],
+    "Legs": ["Squat", "Lunge", "Leg Press", "Leg Extension", "Leg Curl"],
+    "Shoulders": ["Overhead Press", "Lateral Raise", "Front Raise", "Rear Delt Fly", "Upright Row"],
+    "Arms": ["Biceps Curl", "Hammer Curl", "Triceps Extension", "Skull Crusher", "Kickback"],
+    "Core": ["Crunch", "Plank", "Russian Twist", "Leg Raise", "Woodchopper"],
+    "Glutes": ["Hip Thrust", "Glute Bridge", "Kickback", "Step-up", "Abduction"],
+    "Calves": ["Calf Raise", "Seated Calf Raise", "Donkey Calf Raise", "Jump Rope", "Tibialis Raise"],
+}
+EQUIPMENTS = ["Barbell", "Dumbbell", "Machine", "Cable", "Bodyweight", "Kettlebell"]
+# Carga inicial típica por equipamento (kg), ajustada pela força de cada usuário
+BASE_WEIGHTS = {"Barbell": 50.0, "Dumbbell": 16.0, "Machine": 40.0, "Cable": 25.0, "Bodyweight": 0.0, "Kettlebell": 16.0}
+OBJECTIVES = ["Hypertrophy", "Weight loss", "Strength", "Endurance", "Mobility"]
+OBJECTIVE_WEIGHTS = [35, 30, 20, 10, 5]
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabriela", "Hugo", "Isabela", "João",
+               "Karina", "Lucas", "Mariana", "Nicolas", "Olivia", "Pedro", "Rafaela", "Samuel", "Tatiana", "Vitor"]
+SHEET_STYLES = ["Full Body", "Upper/Lower", "Push/Pull/Legs", "Strength", "Hypertrophy", "Conditioning", "Powerbuilding"]
+
+# Deslocamento do ranking na lei de potência (Zipf-Mandelbrot), para que os usuários mais ativos
+# não concentrem uma fração irreal dos treinos
+ACTIVITY_RANK_OFFSET = 10
+SEASONALITY_PEAK_DAY = 15  # Dia do ano com mais treinos (resoluções de ano novo)
+WEEKDAY_ACTIVITY = [1.0, 1.0, 0.95, 0.95, 0.85, 0.6, 0.45]  # Segunda a domingo
+FAVORITE_EXERCISES = (6, 14)  # Faixa de exercícios na rotina de cada usuário
+
+class SyntheticDataConfig(NamedTuple):
+    users: int = 1000
+    exercises: int = 200
+    training_sheets: int = 100
+    trainings: int = 25000
+    exercises_per_training: tuple[int, int] = (3, 6)
+    physical_records_per_user: int = 6  # Média; cada usuário tem entre 1 e o dobro disso
+    history_days: int = 730
+    end_date: date = date(2024, 12, 31)
+    activity_alpha: float = 0.8  # Expoente da lei de potência da atividade dos usuários (0 = uniforme)
+    popularity_alpha: float = 1.0  # Expoente da lei de potência da popularidade de exercícios e fichas
+    seasonality: float = 0.3  # Amplitude da variação anual da atividade (0 a 1)
+    sheet_adoption: float = 0.6  # Fração dos usuários associados a uma ficha
+    seed: int = 42
+    chunk_rows: int = 10000
+
+# Pesos acumulados de uma lei de potência sobre n itens, com a posição no ranking embaralhada
+def _power_law_cum_weights(rng: random.Random, n: int, alpha: float, offset: int = 0) -> list[float]:
+    weights = [(rank + 1 + offset) ** -alpha for rank in range(n)]
+    rng.shuffle(weights)
+    return list(accumulate(weights))
+
+def _pick(rng: random.Random, cum_weights: list[float]) -> int:
+    # Índice sorteado proporcionalmente aos pesos (equivalente a rng.choices, sem criar listas)
+    return bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+def _day_cum_weights(config: SyntheticDataConfig, start: date) -> list[float]:
+    weights = []
+    for offset in range(config.history_days):
+        day = start + timedelta(days=offset)
+        season = 1 + config.seasonality * math.cos(2 * math.pi * (day.timetuple().tm_yday - SEASONALITY_PEAK_DAY) / 365.25)
+        weights.append(season * WEEKDAY_ACTIVITY[day.weekday()])
+    return list(accumulate(weights))
+
+def _round_weight(weight: float) -> float:
+    return round(weight / 2.5) * 2.5
+
+async def _insert_chunked(session: AsyncSession, model, rows, chunk_rows: int) -> int:
+    total, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            await insert_rows(session, model, chunk)
+            total += len(chunk)
+            chunk = []
+    await insert_rows(session, model, chunk)
+    return total + len(chunk)
+
+def _exercise_rows(rng: random.Random, config: SyntheticDataConfig, catalog: list[tuple[str, str]]):
+    levels = list(level_exercise)
+    seen: dict[str, int] = {}
+    for exercise_id in range(1, config.exercises + 1):
+        muscle_group, equipment = catalog[exercise_id - 1]
+        name = f"{equipment} {rng.choice(MOVEMENTS[muscle_group])}"
+        seen[name] = seen.get(name, 0) + 1
+        yield {
+            "id": exercise_id,
+            "name": name if seen[name] == 1 else f"{name} {seen[name]}",
+            "target_muscle_group": muscle_group,
+            "equipment": equipment,
+            "level": rng.choice(levels).value,
+            "url": "https://www.youtube.com/",
+            "sets": rng.choice([3, 4, 5]),
+            "reps": rng.choice([6, 8, 10, 12, 15]),
+            "weight": BASE_WEIGHTS[equipment],
+            "version": 1,
+        }
+
+def _user_rows(rng: random.Random, config: SyntheticDataConfig, start: date):
+    for user_id in range(1, config.users + 1):
+        yield {
+            "id": user_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {user_id}",
+            "objective": rng.choices(OBJECTIVES, OBJECTIVE_WEIGHTS)[0],
+            # Cadastro até um ano antes do início do histórico de treinos
+            "registration_date": start - timedelta(days=rng.randrange(365)),
+            "latest_physical_record_id": None,
+            "version": 1,
+        }
+
+# Histórico de cada usuário: medições espaçadas ao longo do período, com o peso variando aos poucos
+def _physical_record_rows(rng: random.Random, config: SyntheticDataConfig, start: date):
+    record_id = 0
+    for user_id in range(1, config.users + 1):
+        count = rng.randint(1, max(1, 2 * config.physical_records_per_user - 1))
+        interval = max(1, config.history_days // count)
+        weight = rng.uniform(55, 110)
+        height = round(rng.uniform(1.55, 1.95), 2)
+        body_fat = rng.uniform(10, 35)
+        for n in range(count):
+            record_id += 1
+            weight = max(45.0, weight + rng.gauss(-0.3, 1.5))
+            body_fat = min(45.0, max(5.0, body_fat + rng.gauss(-0.2, 0.8)))
+            yield {
+                "id": record_id,
+                "user_id": user_id,
+                "weight": round(weight, 1),
+                "height": height,
+                "body_fat_percentage": round(body_fat, 1),
+                "muscle_mass_percentage": round(rng.uniform(30, 45), 1),
+                "recorded_at": start + timedelta(days=n * interval + rng.randrange(interval)),
+                "version": 1,
+            }
+
+# Fichas com 3 a 5 dias, cada dia com 4 a 6 exercícios; as fichas também seguem a lei de potência
+async def _insert_training_sheets(session: AsyncSession, rng: random.Random, config: SyntheticDataConfig, exercise_cum_weights: list[float]) -> dict[str, int]:
+    days = list(day_week)
+    levels = list(level_exercise)
+    weeks, sheet_days, day_links = [], [], []
+    for week_id in range(1, config.training_sheets + 1):
+        style = rng.choice(SHEET_STYLES)
+        objective = rng.choice(OBJECTIVES)
+        weeks.append({
+            "id": week_id,
+            "name": f"{style} {week_id}",
+            "description": f"{style} program focused on {objective.lower()}",
+            "level": rng.choice(levels).value,
+            "version": 1,
+        })
+        for day_of_week in sorted(rng.sample(days, rng.randint(3, 5)), key=days.index):
+            day_id = len(sheet_days) + 1
+            muscle_groups = rng.sample(list(MOVEMENTS), 2)
+            sheet_days.append({"id": day_id, "training_sheet_week_id": week_id, "day_of_week": day_of_week.value, "focus_area": " & ".join(muscle_groups)})
+            exercise_ids = set()
+            while len(exercise_ids) < min(rng.randint(4, 6), config.exercises):
+                exercise_ids.add(_pick(rng, exercise_cum_weights) + 1)
+            day_links.extend({"training_sheet_day_id": day_id, "exercise_id": exercise_id, "order": order} for order, exercise_id in enumerate(exercise_ids))
+
+    sheet_cum_weights = _power_law_cum_weights(rng, config.training_sheets, config.popularity_alpha)
+    user_links = (
+        {"training_sheet_week_id": _pick(rng, sheet_cum_weights) + 1, "user_id": user_id}
+        for user_id in range(1, config.users + 1)
+        if rng.random() < config.sheet_adoption
+    )
+
+    return {
+        "training_sheet_weeks": await _insert_chunked(session, TrainingSheetWeek, weeks, config.chunk_rows),
+        "training_sheet_days": await _insert_chunked(session, TrainingSheetDay, sheet_days, config.chunk_rows),
+        "training_sheet_day_exercises": await _insert_chunked(session, TrainingSheetDayExerciseLink, day_links, config.chunk_rows),
+        "training_sheet_users": await _insert_chunked(session, TrainingSheetWeekUserLink, user_links, config.chunk_rows),
+    }
+
+# Treinos executados: o usuário de cada treino é sorteado pela lei de potência da atividade e a data
+# pela sazonalidade. Cada usuário treina a partir de uma rotina de exercícios favoritos, com cargas
+# proporcionais à sua força que progridem ao longo do histórico.
+async def _insert_trainings(session: AsyncSession, rng: random.Random, config: SyntheticDataConfig, start: date,
+                            catalog: list[tuple[str, str]], exercise_cum_weights: list[float]) -> dict[str, int]:
+    user_cum_weights = _power_law_cum_weights(rng, config.users, config.activity_alpha, ACTIVITY_RANK_OFFSET)
+    day_cum_weights = _day_cum_weights(config, start)
+    strength = [rng.uniform(0.6, 1.6) for _ in range(config.users)]
+    favorites = []
+    for _ in range(config.users):
+        routine = set()
+        while len(routine) < min(rng.randint(*FAVORITE_EXERCISES), config.exercises):
+            routine.add(_pick(rng, exercise_cum_weights) + 1)
+        favorites.append(sorted(routine))
+
+    trainings, executed = [], []
+    training_count = executed_count = 0
+    for training_id in range(1, config.trainings + 1):
+        user_index = _pick(rng, user_cum_weights)
+        day_offset = _pick(rng, day_cum_weights)
+        progress = 1 + 0.3 * day_offset / config.history_days
+        trainings.append({
+            "id": training_id,
+            "user_id": user_index + 1,
+            "training_date": start + timedelta(days=day_offset),
+            "total_duration": rng.randint(30, 100),
+            "notes": None,
+            "content_hash": None,
+            "version": 1,
+        })
+        routine = favorites[user_index]
+        for exercise_id in rng.sample(routine, min(rng.randint(*config.exercises_per_training), len(routine))):
+            base_weight = BASE_WEIGHTS[catalog[exercise_id - 1][1]]
+            executed.append({
+                "daily_training_id": training_id,
+                "id_exercise": exercise_id,
+                "sets_done": rng.choice([3, 3, 4, 5]),
+                "reps_done": rng.randint(5, 15),
+                "weight_used": _round_weight(base_weight * strength[user_index] * progress * rng.uniform(0.9, 1.1)),
+            })
+
+        if len(trainings) >= config.chunk_rows:
+            # Os exercícios do lote referenciam os treinos, então os treinos são gravados antes
+            training_count += await _insert_chunked(session, ExecutedDailyTraining, trainings, config.chunk_rows)
+            executed_count += await _insert_chunked(session, ExecutedExercise, executed, config.chunk_rows)
+            trainings, executed = [], []
+
+    training_count += await _insert_chunked(session, ExecutedDailyTraining, trainings, config.chunk_rows)
+    executed_count += await _insert_chunked(session, ExecutedExercise, executed, config.chunk_rows)
+    return {"executed_daily_trainings": training_count, "executed_exercises": executed_count}
+
+# Grava os dados sintéticos e preenche as tabelas derivadas. As tabelas devem estar vazias (os IDs
+# são atribuídos a partir de 1). Retorna a quantidade de linhas por tabela. Quem chama é responsável pelo commit.
+async def generate(session: AsyncSession, config: SyntheticDataConfig) -> dict[str, int]:
+    rng = random.Random(config.seed)
+    start = config.end_date - timedelta(days=config.history_days - 1)
+    catalog = [(rng.choice(list(MOVEMENTS)), rng.choice(EQUIPMENTS)) for _ in range(config.exercises)]
+    exercise_cum_weights = _power_law_cum_weights(rng, config.exercises, config.popularity_alpha)
+
+    counts = {
+        "users": await _insert_chunked(session, User, _user_rows(rng, config, start), config.chunk_rows),
+        "exercises": await _insert_chunked(session, Exercise, _exercise_rows(rng, config, catalog), config.chunk_rows),
+        "physical_records": await _insert_chunked(session, PhysicalRecord, _physical_record_rows(rng, config, start), config.chunk_rows),
+    }
+    counts.update(await _insert_training_sheets(session, rng, config, exercise_cum_weights))
+    counts.update(await _insert_trainings(session, rng, config, start, catalog, exercise_cum_weights))
+
+    for model in (User, Exercise, PhysicalRecord, TrainingSheetWeek, TrainingSheetDay, ExecutedDailyTraining):
+        await reset_id_sequence(session, model)
+
+    await rebuild_latest_physical_records(session)
+    await rebuild_training_volume_rollups(session)
+    await rebuild_personal_records(session)
+    await reconcile_counters(session)
+    return counts
+
+def _parse_args() -> SyntheticDataConfig:
+    defaults = SyntheticDataConfig()
+    parser = argparse.ArgumentParser(description="Generate realistic synthetic workout data and bulk load it into DATABASE_URL.")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--exercises", type=int, default=defaults.exercises, help="Exercises in the catalog")
+    parser.add_argument("--training-sheets", type=int, default=defaults.training_sheets)
+    parser.add_argument("--trainings", type=int, default=defaults.trainings, help="Executed daily trainings")
+    parser.add_argument("--exercises-per-training", type=int, nargs=2, metavar=("MIN", "MAX"), default=defaults.exercises_per_training)
+    parser.add_argument("--physical-records-per-user", type=int, default=defaults.physical_records_per_user, help="Average physical records per user")
+    parser.add_argument("--history-days", type=int, default=defaults.history_days)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=defaults.end_date, help="Last day of the history (YYYY-MM-DD)")
+    parser.add_argument("--activity-alpha", type=float, default=defaults.activity_alpha, help="Power-law exponent of user activity (0 = uniform)")
+    parser.add_argument("--popularity-alpha", type=float, default=defaults.popularity_alpha, help="Power-law exponent of exercise and training sheet popularity")
+    parser.add_argument("--seasonality", type=float, default=defaults.seasonality, help="Amplitude of the yearly activity cycle (0 to 1)")
+    parser.add_argument("--sheet-adoption", type=float, default=defaults.sheet_adoption, help="Fraction of users associated with a training sheet")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--chunk-rows", type=int, default=defaults.chunk_rows, help="Rows per bulk insert")
+    args = parser.parse_args()
+
+    if min(args.users, args.exercises, args.training_sheets, args.history_days) < 1 or args.trainings < 0:
+        parser.error("--users, --exercises, --training-sheets and --history-days must be positive")
+    if not 1 <= args.exercises_per_training[0] <= args.exercises_per_training[1]:
+        parser.error("--exercises-per-training must be 1 <= MIN <= MAX")
+
+    return SyntheticDataConfig(
+        users=args.users, exercises=args.exercises, training_sheets=args.training_sheets, trainings=args.trainings,
+        exercises_per_training=tuple(args.exercises_per_training), physical_records_per_user=args.physical_records_per_user,
+        history_days=args.history_days, end_date=args.end_date, activity_alpha=args.activity_alpha,
+        popularity_alpha=args.popularity_alpha, seasonality=args.seasonality, sheet_adoption=args.sheet_adoption,
+        seed=args.seed, chunk_rows=args.chunk_rows,
+    )
+
+async def main(config: SyntheticDataConfig) -> int:
+    await create_db_and_tables()
+    try:
+        async with async_session() as session:
+            if (await session.exec(select(func.count()).select_from(User))).one():
+                print("The database already has users; run the generator against an empty database")
+                return 1
+
+            start = time.perf_counter()
+            counts = await generate(session, config)
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+    for table, rows in counts.items():
+        print(f"{table}: {rows}")
+    print(f"Generated in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(_parse_args())))
@@ -0,0 +1,289 @@
+"""Teste de carga local com cenários concorrentes e relatório de percentis por rota.
+
+Usuários virtuais (--concurrency) executam, durante --duration segundos, cenários sorteados
+conforme o mix configurado:
+    log_workout          registra um treino executado e abre o progresso do usuário
+    browse_history       navega pelo histórico de treinos de um usuário (até 3 páginas) e abre um treino
+    open_training_sheet  lista as fichas e abre uma delas
+    filter_exercises     filtra exercícios por grupo muscular e faz uma busca textual
+Ao final mostra, por rota, a vazão, a latência p50/p95/p99 e as taxas de erro (4xx e 5xx/falhas).
+
+Uso:
+    python -m scripts.load_test                                    # sobe a aplicação com uvicorn
+    python -m scripts.load_test --concurrency 50 --duration 60 --workers 4
+    python -m scripts.load_test --mix log_workout=1,browse_history=5 --output load.json
+    python -m scripts.load_test --base-url http://localhost:8000   # aplicação já em execução
+    python -m scripts.load_test --in-process                       # sem uvicorn, pelo ASGITransport
+
+Sem --base-url a aplicação é iniciada com uvicorn usando DATABASE_URL; se DATABASE_URL não estiver
+definida, um SQLite temporário é populado com o gerador de dados sintéticos (--users, --trainings).
+No modo --in-process a aplicação roda no mesmo event loop dos usuários virtuais: serve para validar
+os cenários, mas os números não representam um servidor real.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import httpx
+
+from scripts.benchmark_endpoints import percentile
+
+DEFAULT_MIX = "log_workout=2,browse_history=4,open_training_sheet=2,filter_exercises=2"
+MUSCLE_GROUPS = ["Chest", "Back", "Legs", "Shoulders", "Arms", "Core", "Glutes", "Calves"]
+SEARCH_TERMS = ["press", "curl", "squat", "row", "raise"]
+REQUEST_TIMEOUT = 30.0
+STARTUP_TIMEOUT = 60.0
+
+# Latências (segundos) e status das requisições, agrupados pelo nome da rota
+class _Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.client_errors: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        self.scenarios: dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if response is None or response.status_code >= 500:
+            self.failures[name] = self.failures.get(name, 0) + 1
+            return None
+        if response.status_code >= 400:
+            # 404 de filtros sem resultado também entra aqui: é resposta válida da API, mas fica visível no relatório
+            self.client_errors[name] = self.client_errors.get(name, 0) + 1
+        return response
+
+def _items(response: Optional[httpx.Response]) -> list:
+    if response is None or response.status_code != 200:
+        return []
+    body = response.json()
+    return body.get("items", []) if isinstance(body, dict) else body
+
+# Quantidades usadas para sortear IDs existentes (os IDs começam em 1)
+class _Sizes:
+    def __init__(self, users: int, exercises: int, training_sheets: int):
+        self.users = max(1, users)
+        self.exercises = max(1, exercises)
+        self.training_sheets = max(1, training_sheets)
+
+async def _log_workout(client, rng: random.Random, sizes: _Sizes, recorder: _Recorder):
+    user_id = rng.randint(1, sizes.users)
+    training = {
+        "user_id": user_id,
+        "training_date": str(date.today() - timedelta(days=rng.randrange(30))),
+        "total_duration": rng.randint(30, 90),
+        "exercises": [
+            {"id_exercise": exercise_id, "sets_done": rng.randint(3, 5), "reps_done": rng.randint(5, 15), "weight_used": float(rng.randrange(10, 120, 5))}
+            for exercise_id in rng.sample(range(1, sizes.exercises + 1), min(4, sizes.exercises))
+        ],
+    }
+    await recorder.request(client, "POST /daily_training/create", "POST", "/daily_training/create", json=training)
+    await recorder.request(client, "GET /user/{user_id}/progress", "GET", f"/user/{user_id}/progress")
+
+async def _browse_history(client, rng: random.Random, sizes: _Sizes, recorder: _Recorder):
+    user_id = rng.randint(1, sizes.users)
+    params = {"user_id": user_id}
+    trainings = []
+    for _ in range(3):
+        response = await recorder.request(client, "GET /edaily_trainingxercise/filter", "GET", "/edaily_trainingxercise/filter", params=params)
+        trainings.extend(_items(response))
+        next_cursor = response.json().get("next_cursor") if response is not None and response.status_code == 200 else None
+        if not next_cursor:
+            break
+        params = {"user_id": user_id, "after": next_cursor}
+    if trainings:
+        training_id = rng.choice(trainings)["id"]
+        await recorder.request(client, "GET /daily_training/get_by_id/{user_id}", "GET", "/daily_training/get_by_id/0", params={"training_id": training_id})
+
+async def _open_training_sheet(client, rng: random.Random, sizes: _Sizes, recorder: _Recorder):
+    page = rng.randint(1, max(1, min(10, sizes.training_sheets // 10)))
+    sheets = _items(await recorder.request(client, "GET /training_sheet/get_all/", "GET", "/training_sheet/get_all/", params={"page": page}))
+    sheet_id = rng.choice(sheets)["id"] if sheets else rng.randint(1, sizes.training_sheets)
+    await recorder.request(client, "GET /training_sheet/get/{training_sheet_id}", "GET", f"/training_sheet/get/{sheet_id}")
+
+async def _filter_exercises(client, rng: random.Random, sizes: _Sizes, recorder: _Recorder):
+    await recorder.request(client, "GET /exercise/filter", "GET", "/exercise/filter", params={"target_muscle_group": rng.choice(MUSCLE_GROUPS)})
+    await recorder.request(client, "GET /exercise/search", "GET", "/exercise/search", params={"q": rng.choice(SEARCH_TERMS)})
+
+SCENARIOS = {
+    "log_workout": _log_workout,
+    "browse_history": _browse_history,
+    "open_training_sheet": _open_training_sheet,
+    "filter_exercises": _filter_exercises,
+}
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for entry in mix.split(","):
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (available: {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("The mix must have at least one scenario with positive weight")
+    return weights
+
+async def _sizes(client: httpx.AsyncClient) -> _Sizes:
+    quantities = []
+    for path in ("/user/get_quantity", "/exercise/get_quantity", "/training_sheet/get_quantity"):
+        response = await client.get(path)
+        response.raise_for_status()
+        quantities.append(response.json()["quantity"])
+    return _Sizes(*quantities)
+
+async def _virtual_user(client, seed: int, mix: dict[str, float], sizes: _Sizes, recorder: _Recorder, deadline: float):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        recorder.scenarios[name] = recorder.scenarios.get(name, 0) + 1
+        await SCENARIOS[name](client, rng, sizes, recorder)
+
+async def _run(client: httpx.AsyncClient, mix: dict[str, float], concurrency: int, duration: float, seed: int) -> tuple[_Recorder, float]:
+    sizes = await _sizes(client)
+    recorder = _Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_virtual_user(client, seed + n, mix, sizes, recorder, deadline) for n in range(concurrency)))
+    return recorder, time.perf_counter() - start
+
+async def _run_in_process(mix: dict[str, float], concurrency: int, duration: float, seed: int) -> tuple[_Recorder, float]:
+    import main
+
+    # O ASGITransport não dispara os eventos de startup/shutdown; o lifespan do router os executa
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=REQUEST_TIMEOUT) as client:
+            return await _run(client, mix, concurrency, duration, seed)
+
+async def _run_http(base_url: str, mix: dict[str, float], concurrency: int, duration: float, seed: int) -> tuple[_Recorder, float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        return await _run(client, mix, concurrency, duration, seed)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_until_ready(base_url: str, server: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health/db_pool", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"The app did not start within {STARTUP_TIMEOUT:.0f}s")
+
+def _report(recorder: _Recorder, elapsed: float, concurrency: int, mix: dict[str, float]) -> dict:
+    endpoints = []
+    for name, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        endpoints.append({
+            "endpoint": name,
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "client_error_rate": round(recorder.client_errors.get(name, 0) / len(latencies), 4),
+            "error_rate": round(recorder.failures.get(name, 0) / len(latencies), 4),
+        })
+
+    all_latencies = sorted(latency for latencies in recorder.latencies.values() for latency in latencies)
+    total = len(all_latencies)
+    return {
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "mix": mix,
+        "scenarios": recorder.scenarios,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(all_latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(all_latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 3),
+        "error_rate": round(sum(recorder.failures.values()) / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+def _print_report(report: dict):
+    print(f"\n{report['requests']} requests in {report['duration_seconds']}s with {report['concurrency']} virtual users "
+          f"({report['throughput_rps']} req/s, errors {report['error_rate']:.2%})")
+    print(f"Scenarios: {', '.join(f'{name}={count}' for name, count in sorted(report['scenarios'].items()))}\n")
+    print(f"{'endpoint':<44} {'req':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'4xx':>7} {'errors':>7}")
+    for endpoint in report["endpoints"]:
+        print(
+            f"{endpoint['endpoint']:<44} {endpoint['requests']:>7} {endpoint['throughput_rps']:>8.1f} "
+            f"{endpoint['p50_ms']:>9.2f} {endpoint['p95_ms']:>9.2f} {endpoint['p99_ms']:>9.2f} "
+            f"{endpoint['client_error_rate']:>7.2%} {endpoint['error_rate']:>7.2%}"
+        )
+    print(f"{'total':<44} {report['requests']:>7} {report['throughput_rps']:>8.1f} {report['p50_ms']:>9.2f} {report['p95_ms']:>9.2f} {report['p99_ms']:>9.2f}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run mixed load scenarios against a locally started app.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users running scenarios in parallel")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--base-url", help="Use an app that is already running instead of starting one")
+    parser.add_argument("--in-process", action="store_true", help="Call the app through httpx.ASGITransport (no server)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when the app is started by this tool")
+    parser.add_argument("--users", type=int, default=1000, help="Users generated when DATABASE_URL is not set")
+    parser.add_argument("--trainings", type=int, default=25000, help="Trainings generated when DATABASE_URL is not set")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also save the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        mix = _parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.base_url and not os.getenv("DATABASE_URL"):
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load_test.db')}"
+            print(f"Generating {args.users} users and {args.trainings} trainings in a temporary SQLite database", flush=True)
+            subprocess.run([sys.executable, "-m", "scripts.generate_synthetic_data", "--users", str(args.users), "--trainings", str(args.trainings)], check=True)
+
+        if args.in_process:
+            recorder, elapsed = asyncio.run(_run_in_process(mix, args.concurrency, args.duration, args.seed))
+        elif args.base_url:
+            recorder, elapsed = asyncio.run(_run_http(args.base_url.rstrip("/"), mix, args.concurrency, args.duration, args.seed))
+        else:
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"])
+            try:
+                _wait_until_ready(base_url, server)
+                recorder, elapsed = asyncio.run(_run_http(base_url, mix, args.concurrency, args.duration, args.seed))
+            finally:
+                server.terminate()
+                server.wait()
+
+    report = _report(recorder, elapsed, args.concurrency, mix)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nReport saved to {args.output}")
+    return 1 if report["error_rate"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""Recalcula os contadores de popularidade (ExerciseExecutionCount e TrainingSheetUserCount).
+
+Os contadores são mantidos pelas rotas na mesma transação das escritas; este job corrige
+desvios causados por escritas feitas fora da API (imports manuais, correções direto no banco).
+Pode ser agendado (ex.: cron diário).
+
+Uso:
+    DATABASE_URL=postgresql://... python -m scripts.reconcile_popularity_counters
+"""
+import asyncio
+
+from db.database import async_session, engine
+from utils.popularity_counters import reconcile_counters
+
+async def main():
+    async with async_session() as session:
+        repaired = await reconcile_counters(session)
+        await session.commit()
+    await engine.dispose()
+
+    print(f"Exercise counters repaired: {repaired['exercises']}")
+    print(f"Training sheet counters repaired: {repaired['training_sheets']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
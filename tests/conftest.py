@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# Os testes usam um banco próprio: TEST_DATABASE_URL (ex.: um PostgreSQL descartável) ou um SQLite
+# temporário. Precisa ser definido antes de importar a aplicação, que cria o engine na importação.
+_tmp_dir = tempfile.TemporaryDirectory()
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_tmp_dir.name, 'test.db')}"
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+# Conta os comandos SQL executados pelo engine da aplicação dentro do bloco
+class _StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+@pytest.fixture
+def count_statements():
+    from db.database import engine
+
+    counters = []
+
+    def start() -> _StatementCounter:
+        counter = _StatementCounter()
+        event.listen(engine.sync_engine, "before_cursor_execute", counter)
+        counters.append(counter)
+        return counter
+
+    yield start
+    for counter in counters:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
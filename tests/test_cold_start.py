@@ -0,0 +1,12 @@
+import pytest
+
+from scripts.check_cold_start import COLD_START_BUDGET_MS, measure_cold_start
+
+# Inicialização a frio de um worker na configuração do autoscaling (ver scripts/check_cold_start.py).
+# Sobe processos novos, por isso fica de fora com -m "not slow".
+@pytest.mark.slow
+def test_cold_start_within_budget():
+    measurement = measure_cold_start()
+
+    assert measurement["eager_routers"] == []
+    assert measurement["total_ms"] <= COLD_START_BUDGET_MS, f"{measurement['total_ms']:.0f} ms"
@@ -0,0 +1,28 @@
+import re
+
+def _metric(text: str, name: str, route: str, method: str) -> float:
+    match = re.search(rf'^{name}{{method="{method}",route="{re.escape(route)}"}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+# Linhas alteradas vêm do rowcount dos comandos de escrita; leituras não entram na contagem
+def test_rows_affected_counts_only_writes(client):
+    before = client.get("/metrics").text
+    response = client.post("/user/create", json={"name": "Metrics user", "objective": "Endurance"})
+    assert response.status_code == 200, response.text
+    assert client.get(f"/user/get_by_id/{response.json()['id']}").status_code == 200
+    after = client.get("/metrics").text
+
+    name = "http_request_db_rows_affected_total"
+    assert _metric(after, name, "/user/create", "POST") - _metric(before, name, "/user/create", "POST") == 1
+    assert _metric(after, name, "/user/get_by_id/{user_id}", "GET") == 0
+
+# As listagens contam as linhas retornadas pelas consultas
+def test_rows_returned_by_listing(client):
+    response = client.post("/user/create", json={"name": "Metrics listing user", "objective": "Mobility"})
+    assert response.status_code == 200, response.text
+    before = client.get("/metrics").text
+    assert client.get("/user/get_all", params={"total": "none"}).status_code == 200
+    after = client.get("/metrics").text
+
+    name = "http_request_db_rows_total"
+    assert _metric(after, name, "/user/get_all", "GET") - _metric(before, name, "/user/get_all", "GET") > 0
@@ -0,0 +1,39 @@
+def _create_exercise(client, name: str) -> int:
+    response = client.post("/exercise/create", json={
+        "name": name, "target_muscle_group": "Legs", "equipment": "Barbell",
+        "level": "Beginner", "url": "https://www.youtube.com/", "sets": 3, "reps": 5, "weight": 60.0,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def _records(client, user_id: int) -> list[tuple]:
+    response = client.get(f"/user/{user_id}/personal_records")
+    assert response.status_code == 200, response.text
+    return [(record["exercise_id"], record["exercise_name"]) for record in response.json()]
+
+# Um exercício com treinos executados não pode ser excluído; depois de excluídos os treinos, a exclusão
+# remove os recordes dele e a listagem continua funcionando para o usuário
+def test_personal_records_after_exercise_deletion(client):
+    user = client.post("/user/create", json={"name": "Personal record user", "objective": "Strength"})
+    assert user.status_code == 200, user.text
+    user_id = user.json()["id"]
+    kept_id = _create_exercise(client, "Personal record squat")
+    deleted_id = _create_exercise(client, "Personal record deadlift")
+
+    kept = client.post("/daily_training/create", json={
+        "user_id": user_id, "training_date": "2026-01-05", "total_duration": 45,
+        "exercises": [{"id_exercise": kept_id, "sets_done": 3, "reps_done": 5, "weight_used": 100.0}],
+    })
+    assert kept.status_code == 200, kept.text
+    removed = client.post("/daily_training/create", json={
+        "user_id": user_id, "training_date": "2026-01-06", "total_duration": 30,
+        "exercises": [{"id_exercise": deleted_id, "sets_done": 3, "reps_done": 5, "weight_used": 140.0}],
+    })
+    assert removed.status_code == 200, removed.text
+
+    assert client.delete(f"/exercise/delete/{deleted_id}").status_code == 409
+    assert _records(client, user_id) == [(kept_id, "Personal record squat"), (deleted_id, "Personal record deadlift")]
+
+    assert client.delete(f"/daily_training/delete/{removed.json()['id']}").status_code == 200
+    assert client.delete(f"/exercise/delete/{deleted_id}").status_code == 200
+    assert _records(client, user_id) == [(kept_id, "Personal record squat")]
@@ -0,0 +1,205 @@
+import json
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert, text
+from sqlmodel import SQLModel, func, select
+
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from models.exercise import Exercise
+from models.models_links import TrainingSheetDayExerciseLink, TrainingSheetWeekUserLink
+from models.physical_record import PhysicalRecord
+from models.training_sheet_day import TrainingSheetDay
+from models.training_sheet_week import TrainingSheetWeek
+from models.training_volume_rollup import TrainingVolumeRollup
+from models.user import User
+from utils.day_week import day_week
+from utils.level_exercise import level_exercise
+
+# Planos de execução das consultas de filtro e join mais usadas pela API: com um volume moderado de
+# dados e ANALYZE, nenhuma delas pode fazer varredura sequencial da tabela em vez de usar um índice.
+# Pega regressões quando um índice é removido ou uma consulta deixa de aproveitá-lo. No PostgreSQL
+# (TEST_DATABASE_URL) as tabelas são criadas em um schema próprio, removido no final.
+
+SEED_USERS = int(os.getenv("PLAN_CHECK_USERS", "2000"))
+SEED_EXERCISES = int(os.getenv("PLAN_CHECK_EXERCISES", "500"))
+SEED_TRAININGS_PER_USER = int(os.getenv("PLAN_CHECK_TRAININGS_PER_USER", "5"))
+SEED_EXERCISES_PER_TRAINING = 4
+SEED_WEEKS = 300
+CHECK_SCHEMA = "query_plan_check"
+
+MUSCLE_GROUPS = ["Chest", "Back", "Legs", "Shoulders", "Arms", "Core", "Glutes", "Calves"]
+EQUIPMENTS = ["Barbell", "Dumbbell", "Machine", "Cable", "Bodyweight", "Kettlebell"]
+OBJECTIVES = ["Hypertrophy", "Weight loss", "Strength", "Endurance", "Mobility"]
+
+# Consultas verificadas: (descrição, tabela que não pode ser varrida, statement)
+def _checked_queries():
+    ids = list(range(1, 51))
+    return [
+        ("user filter by name", "user",
+         select(User).where(func.lower(User.name) == "user 42")),
+        ("user filter by objective", "user",
+         select(User).where(func.lower(User.objective) == "strength")),
+        ("exercise filter by target muscle group", "exercise",
+         select(Exercise).where(func.lower(Exercise.target_muscle_group) == "chest")),
+        ("exercise filter by equipment", "exercise",
+         select(Exercise).where(func.lower(Exercise.equipment) == "barbell")),
+        ("daily training filter by user", "executeddailytraining",
+         select(ExecutedDailyTraining).where(ExecutedDailyTraining.user_id == 42)),
+        ("daily training filter by user and date", "executeddailytraining",
+         select(ExecutedDailyTraining).where(
+             ExecutedDailyTraining.user_id == 42,
+             ExecutedDailyTraining.training_date >= date(2024, 1, 1),
+         )),
+        ("executed exercises by daily training", "executedexercise",
+         select(ExecutedExercise).where(ExecutedExercise.daily_training_id.in_(ids))),
+        ("executed exercises by exercise", "executedexercise",
+         select(ExecutedExercise).where(ExecutedExercise.id_exercise == 42)),
+        ("physical records by user", "physicalrecord",
+         select(PhysicalRecord).where(PhysicalRecord.user_id == 42)),
+        ("latest physical record of a user", "physicalrecord",
+         select(PhysicalRecord.id).where(PhysicalRecord.user_id == 42)
+         .order_by(PhysicalRecord.recorded_at.desc(), PhysicalRecord.id.desc()).limit(1)),
+        ("physical record series by user and date range", "physicalrecord",
+         select(PhysicalRecord.id, PhysicalRecord.recorded_at, PhysicalRecord.weight)
+         .where(PhysicalRecord.user_id == 42, PhysicalRecord.recorded_at >= date(2023, 1, 1))
+         .order_by(PhysicalRecord.recorded_at, PhysicalRecord.id)),
+        ("users by latest physical record", "physicalrecord",
+         select(User, PhysicalRecord).where(PhysicalRecord.id == User.latest_physical_record_id, PhysicalRecord.weight >= 80.0)),
+        ("training sheet days by week", "trainingsheetday",
+         select(TrainingSheetDay).where(TrainingSheetDay.training_sheet_week_id.in_(ids))),
+        ("training sheet day exercises by day", "trainingsheetdayexerciselink",
+         select(TrainingSheetDayExerciseLink).where(TrainingSheetDayExerciseLink.training_sheet_day_id.in_(ids))),
+        ("training sheets by user", "trainingsheetweekuserlink",
+         select(TrainingSheetWeekUserLink).where(TrainingSheetWeekUserLink.training_sheet_week_id.in_(ids))),
+        ("user progress by period", "trainingvolumerollup",
+         select(TrainingVolumeRollup).where(
+             TrainingVolumeRollup.user_id == 42,
+             TrainingVolumeRollup.period == "week",
+             TrainingVolumeRollup.period_start >= date(2024, 1, 1),
+         ).order_by(TrainingVolumeRollup.period_start)),
+    ]
+
+def _seed(conn):
+    rng = random.Random(42)
+    start = date(2023, 1, 1)
+
+    conn.execute(insert(User), [
+        {"id": i, "name": f"User {i}", "objective": rng.choice(OBJECTIVES),
+         "registration_date": start + timedelta(days=i % 365)}
+        for i in range(1, SEED_USERS + 1)
+    ])
+    conn.execute(insert(Exercise), [
+        {"id": i, "name": f"Exercise {i}", "target_muscle_group": rng.choice(MUSCLE_GROUPS),
+         "equipment": rng.choice(EQUIPMENTS), "level": rng.choice(list(level_exercise)),
+         "url": "https://www.youtube.com/", "sets": 3, "reps": 10, "weight": 20.0}
+        for i in range(1, SEED_EXERCISES + 1)
+    ])
+    conn.execute(insert(PhysicalRecord), [
+        {"user_id": user_id, "weight": 80.0, "height": 1.8, "recorded_at": start + timedelta(days=30 * n)}
+        for user_id in range(1, SEED_USERS + 1) for n in range(3)
+    ])
+
+    trainings, executed = [], []
+    training_id = 0
+    for user_id in range(1, SEED_USERS + 1):
+        for n in range(SEED_TRAININGS_PER_USER):
+            training_id += 1
+            trainings.append({"id": training_id, "user_id": user_id, "total_duration": 60,
+                              "training_date": start + timedelta(days=rng.randrange(730))})
+            executed.extend(
+                {"daily_training_id": training_id, "id_exercise": rng.randint(1, SEED_EXERCISES),
+                 "sets_done": 3, "reps_done": 10, "weight_used": 20.0}
+                for _ in range(SEED_EXERCISES_PER_TRAINING)
+            )
+    conn.execute(insert(ExecutedDailyTraining), trainings)
+    conn.execute(insert(ExecutedExercise), executed)
+
+    days = list(day_week)
+    conn.execute(insert(TrainingSheetWeek), [
+        {"id": i, "name": f"Sheet {i}", "level": rng.choice(list(level_exercise))}
+        for i in range(1, SEED_WEEKS + 1)
+    ])
+    conn.execute(insert(TrainingSheetDay), [
+        {"id": (week_id - 1) * 3 + n + 1, "training_sheet_week_id": week_id, "day_of_week": days[n]}
+        for week_id in range(1, SEED_WEEKS + 1) for n in range(3)
+    ])
+    conn.execute(insert(TrainingSheetDayExerciseLink), [
+        {"training_sheet_day_id": day_id, "exercise_id": exercise_id, "order": order}
+        for day_id in range(1, SEED_WEEKS * 3 + 1)
+        for order, exercise_id in enumerate(rng.sample(range(1, SEED_EXERCISES + 1), 4))
+    ])
+    conn.execute(insert(TrainingSheetWeekUserLink), [
+        {"training_sheet_week_id": rng.randint(1, SEED_WEEKS), "user_id": user_id}
+        for user_id in range(1, SEED_USERS + 1)
+    ])
+
+def _seq_scans_postgres(conn, statement, table):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    found, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == table:
+            found.append(f"Seq Scan on {table}")
+        nodes.extend(node.get("Plans", []))
+    return found
+
+def _seq_scans_sqlite(conn, statement, table):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    # "SCAN <tabela>" sem "USING ... INDEX" é leitura da tabela inteira
+    return [
+        row[-1] for row in rows
+        if row[-1].startswith(f"SCAN {table}") and "INDEX" not in row[-1]
+    ]
+
+@pytest.fixture(scope="module")
+def plan_connection(tmp_path_factory):
+    database_url = os.environ["DATABASE_URL"]
+    is_postgres = database_url.split("+")[0].split(":")[0] in ("postgresql", "postgres")
+
+    if is_postgres:
+        engine = create_engine(database_url)
+        # Isola as tabelas do teste do schema da aplicação
+        @event.listens_for(engine, "connect")
+        def _use_check_schema(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET search_path TO {CHECK_SCHEMA}")
+            cursor.close()
+
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {CHECK_SCHEMA}"))
+    else:
+        engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('query_plans') / 'query_plans.db'}")
+
+    try:
+        SQLModel.metadata.create_all(engine)
+        with engine.begin() as conn:
+            _seed(conn)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        with engine.connect() as conn:
+            if is_postgres:
+                # Com poucos dados o planner pode preferir Seq Scan mesmo havendo índice;
+                # desligar o seq scan deixa a checagem depender só da existência do índice.
+                conn.execute(text("SET enable_seqscan = off"))
+            yield conn
+    finally:
+        if is_postgres:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE"))
+        engine.dispose()
+
+@pytest.mark.parametrize("description, table, statement", _checked_queries(), ids=[query[0] for query in _checked_queries()])
+def test_query_uses_index(plan_connection, description, table, statement):
+    seq_scans = _seq_scans_postgres if plan_connection.dialect.name == "postgresql" else _seq_scans_sqlite
+    assert seq_scans(plan_connection, statement, table) == []
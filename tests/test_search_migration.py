@@ -0,0 +1,60 @@
+import ast
+import os
+import tempfile
+
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel
+
+MIGRATION = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions", "5d8b2f6c1e90_add_full_text_search.py")
+
+# Lê os snapshots de DDL da migração sem importá-la (a migração depende do contexto do alembic)
+def _migration_ddl() -> dict[str, dict[str, list[str]]]:
+    with open(MIGRATION, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    return {
+        node.targets[0].id: ast.literal_eval(node.value)
+        for node in tree.body
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id.endswith("_DDL")
+    }
+
+def _sqlite_schema(database_url: str) -> list[tuple]:
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name")).all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+# O snapshot da migração precisa gerar os mesmos objetos de busca que o create_all (utils/search.py).
+# Se a busca mudar, a mudança vai em uma migração nova e este teste aponta a diferença.
+def test_sqlite_snapshot_matches_create_all():
+    import db.database  # noqa: F401 (registra todos os modelos e índices de busca no metadata)
+
+    sqlite_ddl = _migration_ddl()["SQLITE_DDL"]
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_url = f"sqlite:///{os.path.join(tmp, 'create_all.db')}"
+        migrated_url = f"sqlite:///{os.path.join(tmp, 'migrated.db')}"
+        for url in (expected_url, migrated_url):
+            engine = create_engine(url)
+            SQLModel.metadata.create_all(engine)
+            engine.dispose()
+
+        # Remove os objetos de busca criados pelo create_all e aplica os da migração no lugar
+        engine = create_engine(migrated_url)
+        with engine.begin() as conn:
+            for table_name, statements in sqlite_ddl.items():
+                for suffix in ("ai", "ad", "au"):
+                    conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table_name}_fts_{suffix}")
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table_name}_fts")
+                for statement in statements:
+                    conn.exec_driver_sql(statement)
+        engine.dispose()
+
+        assert _sqlite_schema(migrated_url) == _sqlite_schema(expected_url)
+
+def test_postgresql_snapshot_matches_search_ddl():
+    import db.database  # noqa: F401
+    from utils.search import _postgres_ddl, _search_indexes
+
+    assert _migration_ddl()["POSTGRESQL_DDL"] == {
+        table_name: _postgres_ddl(table_name, columns) for table_name, columns in _search_indexes.items()
+    }
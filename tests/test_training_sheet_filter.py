@@ -0,0 +1,13 @@
+# O filtro por palavras-chave casa trechos em qualquer parte do nome ou da descrição, sem diferenciar
+# maiúsculas (a busca por palavras inteiras fica em /training_sheet/search)
+def test_filter_keywords_match_substrings(client):
+    response = client.post("/training_sheet/bulk_import", json=[{
+        "name": "Filter Strength sheet", "description": "Heavy compound lifts", "level": "Beginner",
+        "training_sheet_days": [{"focus_area": "Full body", "day_of_week": "Monday", "exercises_ids": []}],
+    }])
+    assert response.status_code == 200, response.text
+
+    for keywords in ("ength", "STRENGTH", "compound"):
+        response = client.get("/training_sheet/filter/", params={"keywords": keywords, "per_page": 100})
+        assert response.status_code == 200, response.text
+        assert "Filter Strength sheet" in [sheet["name"] for sheet in response.json()["items"]], keywords
@@ -0,0 +1,40 @@
+import pytest
+
+SHEETS = 100
+
+@pytest.fixture(scope="module")
+def training_sheets(client):
+    exercise_ids = []
+    for n in range(3):
+        response = client.post("/exercise/create", json={
+            "name": f"Query count exercise {n}", "target_muscle_group": "Chest", "equipment": "Barbell",
+            "level": "Beginner", "url": "https://www.youtube.com/", "sets": 3, "reps": 10, "weight": 20.0,
+        })
+        assert response.status_code == 200, response.text
+        exercise_ids.append(response.json()["id"])
+
+    sheets = [
+        {
+            "name": f"Query count sheet {n}", "description": "Fixed query count", "level": "Beginner",
+            "training_sheet_days": [
+                {"focus_area": "Upper", "day_of_week": "Monday", "exercises_ids": exercise_ids},
+                {"focus_area": "Lower", "day_of_week": "Thursday", "exercises_ids": exercise_ids[:2]},
+            ],
+        }
+        for n in range(SHEETS)
+    ]
+    response = client.post("/training_sheet/bulk_import", json=sheets)
+    assert response.status_code == 200, response.text
+    assert len(response.json()["created"]) == SHEETS
+
+def _get_all_statements(client, count_statements, per_page: int) -> int:
+    counter = count_statements()
+    # total=none: a contagem do total fica em cache e mudaria o número de comandos entre as chamadas
+    response = client.get("/training_sheet/get_all/", params={"per_page": per_page, "total": "none"})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == per_page
+    return counter.count
+
+# A montagem das fichas (dias e exercícios) usa um número fixo de consultas, qualquer que seja o tamanho da página
+def test_get_all_query_count_does_not_grow_with_page_size(client, count_statements, training_sheets):
+    assert _get_all_statements(client, count_statements, 1) == _get_all_statements(client, count_statements, SHEETS)
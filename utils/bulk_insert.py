@@ -0,0 +1,31 @@
+from typing import Optional
+from sqlalchemy import func, text
+from sqlmodel import insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Grava as linhas com o COPY do PostgreSQL, pela conexão asyncpg da própria transação da sessão
+async def _copy_records(session: AsyncSession, table_name: str, columns: list[str], rows: list[dict]):
+    raw_connection = await (await session.connection()).get_raw_connection()
+    records = [tuple(row[column] for column in columns) for row in rows]
+    await raw_connection.driver_connection.copy_records_to_table(table_name, records=records, columns=columns)
+
+# Inserção em massa: COPY no PostgreSQL e INSERT com executemany nos demais bancos. O COPY não
+# aplica os defaults do Python (ex.: version), então as linhas devem trazer todas as colunas
+# gravadas. Quem chama é responsável pelo commit.
+async def insert_rows(session: AsyncSession, model, rows: list[dict], columns: Optional[list[str]] = None):
+    if not rows:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        await _copy_records(session, model.__tablename__, columns or list(rows[0]), rows)
+    else:
+        await session.exec(insert(model), params=rows)
+
+# Depois de gravar IDs explícitos, avança a sequência do PostgreSQL para o maior ID da tabela,
+# senão os próximos INSERTs sem ID colidem com as linhas gravadas
+async def reset_id_sequence(session: AsyncSession, model):
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    max_id = (await session.exec(select(func.max(model.id)))).first()
+    if max_id is not None:
+        await session.exec(text("SELECT setval(pg_get_serial_sequence(:table_name, 'id'), :max_id)"),
+                           params={"table_name": f'"{model.__tablename__}"', "max_id": max_id})
@@ -0,0 +1,41 @@
+from collections import defaultdict
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dtos.executed_daily_training.executed_daily_training_response import executed_daily_training_response
+from dtos.executed_daily_training.executed_exercise_dto import executed_exercise_dto
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+
+# Monta os executed_daily_training_response de uma página de treinos com uma única consulta
+# para os exercícios executados de todos os treinos, agrupados em memória.
+async def build_daily_training_responses(session: AsyncSession, daily_trainings: list[ExecutedDailyTraining]) -> list[executed_daily_training_response]:
+    if not daily_trainings:
+        return []
+
+    training_ids = [t.id for t in daily_trainings]
+
+    # Carrega os exercícios de todos os treinos da página de uma vez
+    exercises_statement = (
+        select(ExecutedExercise)
+        .where(ExecutedExercise.daily_training_id.in_(training_ids))
+        .order_by(ExecutedExercise.daily_training_id, ExecutedExercise.id)
+    )
+    exercises_by_training: dict[int, list[executed_exercise_dto]] = defaultdict(list)
+    for ex in (await session.exec(exercises_statement)).all():
+        exercises_by_training[ex.daily_training_id].append(executed_exercise_dto(
+            id_exercise=ex.id_exercise,
+            sets_done=ex.sets_done,
+            reps_done=ex.reps_done,
+            weight_used=ex.weight_used
+        ))
+
+    return [
+        executed_daily_training_response(
+            id=t.id,
+            user_id=t.user_id,
+            training_date=t.training_date,
+            total_duration=t.total_duration,
+            notes=t.notes,
+            exercises=exercises_by_training[t.id]
+        ) for t in daily_trainings
+    ]
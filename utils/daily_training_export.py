@@ -0,0 +1,228 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+import uuid
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from db.database import async_session
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from utils.export_format import export_format
+
+# Exportação dos treinos executados em streaming: as linhas vêm do banco em lotes por um cursor
+# do lado do servidor e cada lote é convertido e enviado antes do próximo ser lido, então o uso
+# de memória não cresce com o tamanho da exportação.
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000")) # Linhas lidas do cursor por vez
+EXPORT_FLUSH_BYTES = 64 * 1024 # Tamanho aproximado de cada pedaço enviado ao cliente
+
+CSV_FILENAME = "executed_daily_training.csv"
+CSV_HEADER = ["id", "user_id", "training_date", "total_duration", "exercises"]
+
+# Percorre os treinos com seus exercícios, agrupando as linhas do join (ordenadas por treino)
+async def _iter_trainings() -> AsyncIterator[tuple[tuple, list[tuple]]]:
+    statement = (
+        select(
+            ExecutedDailyTraining.id,
+            ExecutedDailyTraining.user_id,
+            ExecutedDailyTraining.training_date,
+            ExecutedDailyTraining.total_duration,
+            ExecutedExercise.id_exercise,
+            ExecutedExercise.sets_done,
+            ExecutedExercise.reps_done,
+            ExecutedExercise.weight_used,
+        )
+        .outerjoin(ExecutedExercise, ExecutedExercise.daily_training_id == ExecutedDailyTraining.id)
+        .order_by(ExecutedDailyTraining.id, ExecutedExercise.id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+    # Sessão própria: o streaming continua depois que a rota já retornou a resposta
+    async with async_session() as session:
+        result = await session.stream(statement)
+
+        current, exercises = None, []
+        async for partition in result.partitions():
+            for row in partition:
+                training = tuple(row[:4])
+                if current is None or training[0] != current[0]:
+                    if current is not None:
+                        yield current, exercises
+                    current, exercises = training, []
+                if row[4] is not None:
+                    exercises.append(tuple(row[4:]))
+        if current is not None:
+            yield current, exercises
+
+# Uma linha por treino: os campos do treino seguidos de "EXERCISE", id, séries, repetições e peso de cada exercício
+async def csv_chunks(hasher=None) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    async for training, exercises in _iter_trainings():
+        row = list(training)
+        for exercise in exercises:
+            row.extend(["EXERCISE", *exercise])
+        writer.writerow(row)
+
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            chunk = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+
+    chunk = buffer.getvalue().encode("utf-8")
+    if hasher is not None:
+        hasher.update(chunk)
+    yield chunk
+
+def _training_element(training: tuple, exercises: list[tuple]) -> ET.Element:
+    element = ET.Element("training")
+    ET.SubElement(element, "id").text = str(training[0])
+    ET.SubElement(element, "user_id").text = str(training[1])
+    ET.SubElement(element, "training_date").text = str(training[2])
+    ET.SubElement(element, "total_duration").text = str(training[3])
+
+    exercises_element = ET.SubElement(element, "exercises")
+    for exercise in exercises:
+        exercise_element = ET.SubElement(exercises_element, "exercise")
+        ET.SubElement(exercise_element, "exercise_id").text = str(exercise[0])
+        ET.SubElement(exercise_element, "sets_done").text = str(exercise[1])
+        ET.SubElement(exercise_element, "reps_done").text = str(exercise[2])
+        ET.SubElement(exercise_element, "weight_used").text = str(exercise[3])
+    return element
+
+# O documento é escrito um <training> por vez, sem montar a árvore inteira em memória
+async def xml_chunks(hasher=None) -> AsyncIterator[bytes]:
+    parts = ["<?xml version='1.0' encoding='utf-8'?>\n<executed_daily_trainings>\n"]
+    size = len(parts[0])
+
+    async for training, exercises in _iter_trainings():
+        element = _training_element(training, exercises)
+        ET.indent(element, level=1)
+        part = "  " + ET.tostring(element, encoding="unicode") + "\n"
+        parts.append(part)
+        size += len(part)
+
+        if size >= EXPORT_FLUSH_BYTES:
+            chunk = "".join(parts).encode("utf-8")
+            parts, size = [], 0
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+
+    parts.append("</executed_daily_trainings>\n")
+    chunk = "".join(parts).encode("utf-8")
+    if hasher is not None:
+        hasher.update(chunk)
+    yield chunk
+
+# Destino "somente escrita" para o zipfile: guarda o que foi escrito até ser repassado ao cliente.
+# Sem tell/seek, o zipfile grava os tamanhos em data descriptors e não precisa voltar no arquivo.
+class _ZipStream:
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+# CSV compactado em streaming. O SHA-256 do CSV vai no próprio zip, em um arquivo .sha256 gravado no final.
+async def zip_chunks() -> AsyncIterator[bytes]:
+    stream = _ZipStream()
+    hasher = hashlib.sha256()
+
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        with zip_file.open(CSV_FILENAME, "w", force_zip64=True) as entry:
+            async for chunk in csv_chunks(hasher):
+                entry.write(chunk)
+                data = stream.drain()
+                if data:
+                    yield data
+        zip_file.writestr(f"{CSV_FILENAME}.sha256", f"{hasher.hexdigest()}  {CSV_FILENAME}\n")
+
+    yield stream.drain()
+
+EXPORT_CHUNKS = {export_format.csv: csv_chunks, export_format.xml: xml_chunks}
+
+# SHA-256 das exportações CSV e XML já enviadas, pelo id da exportação (cabeçalho X-Export-Id), para que
+# /daily_training/hash devolva o hash exato do que o cliente baixou sem gerar a exportação de novo.
+# Fica na memória do processo e guarda só as EXPORT_DIGESTS_MAX mais recentes.
+EXPORT_DIGESTS_MAX = int(os.getenv("EXPORT_DIGESTS_MAX", "1000"))
+
+_export_digests: "OrderedDict[str, Optional[str]]" = OrderedDict()  # None enquanto a exportação está em andamento
+_export_digests_lock = threading.Lock()
+
+def _start_export() -> str:
+    export_id = uuid.uuid4().hex
+    with _export_digests_lock:
+        _export_digests[export_id] = None
+        while len(_export_digests) > EXPORT_DIGESTS_MAX:
+            _export_digests.popitem(last=False)
+    return export_id
+
+def _finish_export(export_id: str, digest: Optional[str]):
+    with _export_digests_lock:
+        if digest is None:
+            # Exportação interrompida (cliente desconectou ou erro): não há hash para consultar
+            _export_digests.pop(export_id, None)
+        else:
+            _export_digests[export_id] = digest
+
+# Hash de uma exportação: KeyError se o id não existe (ou já saiu da memória), None se ainda está em andamento
+def export_digest(export_id: str) -> Optional[str]:
+    with _export_digests_lock:
+        return _export_digests[export_id]
+
+# Resposta em streaming que calcula o SHA-256 enquanto envia os dados. O hash vai no trailer
+# X-Content-SHA256 quando o servidor ASGI suporta trailers (extensão http.response.trailers) e
+# fica guardado pelo id da exportação, enviado no cabeçalho X-Export-Id.
+class HashedExportResponse(StreamingResponse):
+    def __init__(self, format: export_format, media_type: str, filename: str):
+        self.export_id = _start_export()
+        self.hasher = hashlib.sha256()
+        self._send_trailers = False
+        super().__init__(
+            EXPORT_CHUNKS[format](self.hasher),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Export-Id": self.export_id,
+            },
+        )
+
+    async def __call__(self, scope, receive, send):
+        self._send_trailers = "http.response.trailers" in scope.get("extensions", {})
+        if self._send_trailers:
+            self.headers["Trailer"] = "X-Content-SHA256"
+        await super().__call__(scope, receive, send)
+
+    async def stream_response(self, send):
+        digest = None
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers, "trailers": self._send_trailers})
+            async for chunk in self.body_iterator:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            digest = self.hasher.hexdigest()
+            if self._send_trailers:
+                await send({"type": "http.response.trailers", "headers": [(b"x-content-sha256", digest.encode("ascii"))], "more_trailers": False})
+        finally:
+            _finish_export(self.export_id, digest)
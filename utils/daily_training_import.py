@@ -0,0 +1,210 @@
+import codecs
+import csv
+import hashlib
+import json
+import os
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dtos.executed_daily_training.executed_daily_training_request import executed_daily_training_request
+from dtos.executed_daily_training.import_csv_response import import_csv_error, import_csv_response
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from models.user import User
+from utils.bulk_insert import insert_rows
+from utils.exercise_catalog import exercise_catalog
+from utils.personal_records import Execution, update_personal_records
+from utils.popularity_counters import update_exercise_execution_counts
+from utils.totals import invalidate_counts
+from utils.training_volume_rollups import training_contribution, update_training_volume_rollups
+
+# Importação de treinos executados a partir de um CSV no mesmo layout da exportação
+# (ver utils/daily_training_export.py). O arquivo é lido do corpo da requisição em pedaços e
+# gravado em lotes de IMPORT_CHUNK_ROWS linhas, cada lote em uma transação, então o uso de
+# memória não cresce com o tamanho do arquivo.
+
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000")) # Treinos gravados por transação
+IMPORT_MAX_REPORTED_ERRORS = 100 # Linhas rejeitadas devolvidas na resposta (o total vai em error_count)
+
+_TRAINING_COLUMNS = ["user_id", "training_date", "total_duration", "notes", "content_hash", "version"]
+_EXERCISE_COLUMNS = ["daily_training_id", "id_exercise", "sets_done", "reps_done", "weight_used"]
+
+# Linhas completas do corpo da requisição, decodificadas incrementalmente (um caractere UTF-8
+# pode vir dividido entre dois pedaços). Campos entre aspas com quebra de linha não são suportados,
+# o que não ocorre no layout da exportação.
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+# Converte uma linha do CSV: id, user_id, training_date, total_duration e, para cada exercício,
+# "EXERCISE", id do exercício, séries, repetições e peso. O id de origem é ignorado.
+def _parse_row(row: list[str]) -> executed_daily_training_request:
+    if len(row) < 4:
+        raise ValueError("Expected at least the columns id, user_id, training_date and total_duration")
+
+    exercise_fields = row[4:]
+    if len(exercise_fields) % 5 != 0:
+        raise ValueError("Each exercise must have the columns EXERCISE, id_exercise, sets_done, reps_done and weight_used")
+
+    exercises = []
+    for start in range(0, len(exercise_fields), 5):
+        marker, id_exercise, sets_done, reps_done, weight_used = exercise_fields[start:start + 5]
+        if marker != "EXERCISE":
+            raise ValueError(f"Expected EXERCISE marker, found '{marker}'")
+        exercises.append({"id_exercise": id_exercise, "sets_done": sets_done, "reps_done": reps_done, "weight_used": weight_used})
+
+    return executed_daily_training_request(user_id=row[1], training_date=row[2], total_duration=row[3], exercises=exercises)
+
+# Hash do conteúdo do treino: o mesmo treino importado de novo gera o mesmo hash e é ignorado
+def content_hash(training: executed_daily_training_request) -> str:
+    content = [
+        training.user_id,
+        training.training_date.isoformat(),
+        training.total_duration,
+        [[ex.id_exercise, ex.sets_done, ex.reps_done, ex.weight_used] for ex in training.exercises],
+    ]
+    return hashlib.sha256(json.dumps(content, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class _ImportState:
+    def __init__(self, existing_users: set[int]):
+        self.existing_users = existing_users
+        self.imported = 0
+        self.imported_exercises = 0
+        self.skipped_duplicates = 0
+        self.error_count = 0
+        self.errors: list[import_csv_error] = []
+
+    def reject(self, line: int, detail: str):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(import_csv_error(line=line, detail=detail))
+
+async def _import_chunk(session: AsyncSession, chunk: list[tuple[int, executed_daily_training_request]], state: _ImportState):
+    missing_exercises = await exercise_catalog.missing_ids(session, {ex.id_exercise for _, training in chunk for ex in training.exercises})
+
+    # Valida os IDs e descarta treinos repetidos dentro do próprio lote
+    valid: dict[str, executed_daily_training_request] = {}
+    for line, training in chunk:
+        if training.user_id not in state.existing_users:
+            state.reject(line, f"User with ID {training.user_id} not found")
+            continue
+        not_found = {ex.id_exercise for ex in training.exercises} & missing_exercises
+        if not_found:
+            state.reject(line, f"Exercises not found with IDs: {sorted(not_found)}")
+            continue
+        training_hash = content_hash(training)
+        if training_hash in valid:
+            state.skipped_duplicates += 1
+            continue
+        valid[training_hash] = training
+
+    # Descarta os treinos que já foram importados antes
+    if valid:
+        existing_hashes = set((await session.exec(
+            select(ExecutedDailyTraining.content_hash).where(ExecutedDailyTraining.content_hash.in_(valid))
+        )).all())
+        state.skipped_duplicates += len(existing_hashes)
+        for training_hash in existing_hashes:
+            del valid[training_hash]
+    if not valid:
+        return
+
+    training_rows = [
+        {
+            "user_id": training.user_id,
+            "training_date": training.training_date,
+            "total_duration": training.total_duration,
+            "notes": None,
+            "content_hash": training_hash,
+            "version": 1,
+        }
+        for training_hash, training in valid.items()
+    ]
+    await insert_rows(session, ExecutedDailyTraining, training_rows, _TRAINING_COLUMNS)
+
+    # Os IDs gerados são recuperados pelo hash, com uma consulta para o lote inteiro
+    ids_by_hash = dict((await session.exec(
+        select(ExecutedDailyTraining.content_hash, ExecutedDailyTraining.id).where(ExecutedDailyTraining.content_hash.in_(valid))
+    )).all())
+
+    exercise_rows = [
+        {
+            "daily_training_id": ids_by_hash[training_hash],
+            "id_exercise": ex.id_exercise,
+            "sets_done": ex.sets_done,
+            "reps_done": ex.reps_done,
+            "weight_used": ex.weight_used,
+        }
+        for training_hash, training in valid.items()
+        for ex in training.exercises
+    ]
+    await insert_rows(session, ExecutedExercise, exercise_rows, _EXERCISE_COLUMNS)
+    await update_exercise_execution_counts(session, added=[row["id_exercise"] for row in exercise_rows])
+    await update_training_volume_rollups(session, added=[
+        training_contribution(training.user_id, training.training_date, training.total_duration, training.exercises)
+        for training in valid.values()
+    ])
+    await update_personal_records(session, [
+        Execution(training.user_id, ex.id_exercise, ex.weight_used, ex.reps_done, training.training_date)
+        for training in valid.values()
+        for ex in training.exercises
+    ])
+    await session.commit()
+
+    # O COPY não passa pelos eventos do ORM que invalidam as contagens em cache
+    invalidate_counts(ExecutedDailyTraining.__tablename__)
+    invalidate_counts(ExecutedExercise.__tablename__)
+
+    state.imported += len(training_rows)
+    state.imported_exercises += len(exercise_rows)
+
+# Importa o CSV recebido em pedaços. Linhas inválidas são rejeitadas e informadas na resposta,
+# sem interromper a importação. Os lotes já gravados permanecem se a importação falhar no meio;
+# como os treinos importados são identificados pelo hash, basta reenviar o arquivo.
+async def import_csv(session: AsyncSession, chunks: AsyncIterator[bytes]) -> import_csv_response:
+    # Os usuários são carregados uma vez; os exercícios são validados pelo catálogo em memória
+    state = _ImportState(set((await session.exec(select(User.id))).all()))
+
+    chunk: list[tuple[int, executed_daily_training_request]] = []
+    line_number = 0
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+        if line_number == 1 and row[0].strip() == "id":
+            continue # Cabeçalho
+
+        try:
+            chunk.append((line_number, _parse_row(row)))
+        except ValidationError as exc:
+            state.reject(line_number, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()))
+            continue
+        except ValueError as exc:
+            state.reject(line_number, str(exc))
+            continue
+
+        if len(chunk) >= IMPORT_CHUNK_ROWS:
+            await _import_chunk(session, chunk, state)
+            chunk = []
+
+    if chunk:
+        await _import_chunk(session, chunk, state)
+
+    return import_csv_response(
+        imported=state.imported,
+        imported_exercises=state.imported_exercises,
+        skipped_duplicates=state.skipped_duplicates,
+        error_count=state.error_count,
+        errors=sorted(state.errors, key=lambda error: error.line),
+    )
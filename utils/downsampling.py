@@ -0,0 +1,42 @@
+# Redução de séries temporais para gráficos pelo algoritmo LTTB (Largest-Triangle-Three-Buckets):
+# mantém o primeiro e o último ponto e, de cada balde intermediário, o ponto que forma o maior
+# triângulo com o ponto escolhido no balde anterior e a média do balde seguinte. Preserva picos
+# e vales, ao contrário de uma média ou de pegar um ponto a cada N.
+
+# points: lista de (x, y) ordenada por x. Retorna os índices dos pontos mantidos, em ordem.
+def lttb_indices(points: list[tuple[float, float]], threshold: int) -> list[int]:
+    size = len(points)
+    if threshold >= size or threshold < 3:
+        return list(range(size))
+
+    selected = [0]
+    bucket_size = (size - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Média do balde seguinte (no último balde, o último ponto)
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, size)
+        if next_start >= next_end:
+            next_start, next_end = size - 1, size
+        next_count = next_end - next_start
+        average_x = sum(points[i][0] for i in range(next_start, next_end)) / next_count
+        average_y = sum(points[i][1] for i in range(next_start, next_end)) / next_count
+
+        previous_x, previous_y = points[previous]
+        best_area, best_index = -1.0, start
+        for i in range(start, end):
+            x, y = points[i]
+            # Dobro da área do triângulo (o fator 1/2 não muda a comparação)
+            area = abs((previous_x - average_x) * (y - previous_y) - (previous_x - x) * (average_y - previous_y))
+            if area > best_area:
+                best_area, best_index = area, i
+
+        selected.append(best_index)
+        previous = best_index
+
+    selected.append(size - 1)
+    return selected
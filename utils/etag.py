@@ -0,0 +1,35 @@
+import hashlib
+import json
+from typing import Optional
+from fastapi import Request, Response, status
+
+# ETags fracos (W/"...") derivados do id e da versão das linhas retornadas. Se nenhuma linha mudou,
+# o ETag é o mesmo e o cliente pode revalidar com If-None-Match, recebendo 304 sem o corpo.
+
+def weak_etag(*parts) -> str:
+    raw = json.dumps(parts, default=str, separators=(",", ":")).encode("utf-8")
+    return f'W/"{hashlib.sha256(raw).hexdigest()[:32]}"'
+
+def entity_etag(entity) -> str:
+    return weak_etag(entity.__tablename__, entity.id, entity.version)
+
+# Para listas o ETag também inclui os dados da página (total, cursor), que mudam com inclusões e exclusões
+def list_etag(entities: list, *page_info) -> str:
+    return weak_etag([(entity.__tablename__, entity.id, entity.version) for entity in entities], *page_info)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca: ignora o prefixo W/ dos dois lados
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+# Define o ETag da resposta e, se o cliente já tem essa versão, devolve a resposta 304 que a rota
+# deve retornar no lugar do corpo (antes de montar e serializar a resposta). Caso contrário, None.
+def not_modified_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    response.headers["ETag"] = etag
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.exercise import Exercise
+from utils.level_exercise import level_exercise
+
+# Tempo máximo entre recargas completas. As rotas de exercício atualizam o catálogo a cada escrita,
+# mas só no processo atual, então o TTL limita o quanto outro worker pode ficar desatualizado.
+EXERCISE_CATALOG_TTL = float(os.getenv("EXERCISE_CATALOG_TTL", "60"))
+
+# Catálogo de exercícios em memória, indexado por id, grupo muscular, equipamento e nível.
+# A tabela é pequena e quase só lida, então filtros, paginação e validação de IDs não precisam do banco.
+# version é incrementado a cada carga ou alteração do catálogo.
+class ExerciseCatalog:
+    def __init__(self):
+        self.version = 0
+        self._by_id: dict[int, Exercise] = {}
+        self._by_muscle_group: dict[str, set[int]] = defaultdict(set)
+        self._by_equipment: dict[str, set[int]] = defaultdict(set)
+        self._by_level: dict[level_exercise, set[int]] = defaultdict(set)
+        self._expires_at: Optional[float] = None
+        self._load_lock = asyncio.Lock()
+
+    def _index(self, exercise: Exercise):
+        self._by_id[exercise.id] = exercise
+        self._by_muscle_group[exercise.target_muscle_group.lower()].add(exercise.id)
+        if exercise.equipment:
+            self._by_equipment[exercise.equipment.lower()].add(exercise.id)
+        self._by_level[exercise.level].add(exercise.id)
+
+    def _unindex(self, exercise_id: int):
+        exercise = self._by_id.pop(exercise_id, None)
+        if exercise is None:
+            return
+        self._by_muscle_group[exercise.target_muscle_group.lower()].discard(exercise_id)
+        if exercise.equipment:
+            self._by_equipment[exercise.equipment.lower()].discard(exercise_id)
+        self._by_level[exercise.level].discard(exercise_id)
+
+    # Cópia desvinculada da sessão, para que o catálogo não dependa do ciclo de vida da requisição
+    @staticmethod
+    def _snapshot(exercise: Exercise) -> Exercise:
+        return Exercise(**exercise.model_dump())
+
+    async def load(self, session: AsyncSession):
+        exercises = (await session.exec(select(Exercise))).all()
+
+        self._by_id = {}
+        self._by_muscle_group = defaultdict(set)
+        self._by_equipment = defaultdict(set)
+        self._by_level = defaultdict(set)
+        for exercise in exercises:
+            self._index(self._snapshot(exercise))
+
+        self._expires_at = time.monotonic() + EXERCISE_CATALOG_TTL
+        self.version += 1
+
+    # Carrega o catálogo se ainda não foi carregado ou se o TTL expirou
+    async def ensure_loaded(self, session: AsyncSession):
+        if self._expires_at is not None and self._expires_at > time.monotonic():
+            return
+        async with self._load_lock:
+            if self._expires_at is None or self._expires_at <= time.monotonic():
+                await self.load(session)
+
+    # Atualiza o catálogo depois que a criação/alteração do exercício foi confirmada no banco
+    def upsert(self, exercise: Exercise):
+        self._unindex(exercise.id)
+        self._index(self._snapshot(exercise))
+        self.version += 1
+
+    def remove(self, exercise_id: int):
+        self._unindex(exercise_id)
+        self.version += 1
+
+    async def get(self, session: AsyncSession, exercise_id: int) -> Optional[Exercise]:
+        await self.ensure_loaded(session)
+        if exercise_id not in self._by_id:
+            # Confere no banco (e adiciona ao catálogo) antes de responder que não existe
+            await self.missing_ids(session, [exercise_id])
+        return self._by_id.get(exercise_id)
+
+    async def all(self, session: AsyncSession) -> list[Exercise]:
+        await self.ensure_loaded(session)
+        return list(self._by_id.values())
+
+    async def filter(self, session: AsyncSession, target_muscle_group: str = None, equipment: str = None, level: level_exercise = None) -> list[Exercise]:
+        await self.ensure_loaded(session)
+
+        # Interseção dos índices de cada critério informado, comparando sem diferenciar maiúsculas
+        candidate_sets = []
+        if target_muscle_group:
+            candidate_sets.append(self._by_muscle_group.get(target_muscle_group.lower(), set()))
+        if equipment:
+            candidate_sets.append(self._by_equipment.get(equipment.lower(), set()))
+        if level:
+            candidate_sets.append(self._by_level.get(level, set()))
+
+        if not candidate_sets:
+            return list(self._by_id.values())
+        ids = set.intersection(*candidate_sets)
+        return [self._by_id[exercise_id] for exercise_id in ids]
+
+    # IDs que não existem. O que não estiver no catálogo é conferido no banco antes de ser
+    # considerado inexistente, pois pode ter sido criado por outro worker depois da última carga.
+    async def missing_ids(self, session: AsyncSession, exercise_ids: Iterable[int]) -> set[int]:
+        await self.ensure_loaded(session)
+        missing = {exercise_id for exercise_id in exercise_ids if exercise_id not in self._by_id}
+        if not missing:
+            return set()
+
+        found = (await session.exec(select(Exercise).where(Exercise.id.in_(missing)))).all()
+        for exercise in found:
+            self.upsert(exercise)
+        return missing - {exercise.id for exercise in found}
+
+exercise_catalog = ExerciseCatalog()
@@ -0,0 +1,5 @@
+from enum import Enum
+
+class export_format(Enum):
+    csv = 'csv'
+    xml = 'xml'
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.physical_record import PhysicalRecord
+from models.user import User
+
+# Ponteiro User.latest_physical_record_id para o registro físico mais recente do usuário (maior
+# recorded_at e, no mesmo dia, o de maior id). É mantido com UPDATE direto, sem carregar o usuário
+# pelo ORM: a versão do usuário (e o ETag) não muda e gravações simultâneas de registros físicos do
+# mesmo usuário não disputam a linha do usuário além do próprio UPDATE.
+def _latest_physical_record_id():
+    return (
+        select(PhysicalRecord.id)
+        .where(PhysicalRecord.user_id == User.id)
+        .order_by(PhysicalRecord.recorded_at.desc(), PhysicalRecord.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+# Deve ser chamado depois de criar, alterar ou excluir registros físicos do usuário; quem chama é
+# responsável pelo commit.
+async def refresh_latest_physical_record(session: AsyncSession, user_id: int):
+    await session.exec(
+        update(User)
+        .where(User.id == user_id)
+        .values(latest_physical_record_id=_latest_physical_record_id())
+        .execution_options(synchronize_session=False)
+    )
+
+# Preenche o ponteiro de todos os usuários com um único UPDATE (backfill, dados gravados fora da API).
+# Quem chama é responsável pelo commit.
+async def rebuild_latest_physical_records(session: AsyncSession):
+    await session.exec(update(User).values(latest_physical_record_id=_latest_physical_record_id()))
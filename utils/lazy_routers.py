@@ -0,0 +1,37 @@
+import importlib
+import threading
+from fastapi import FastAPI
+
+# Carregamento dos routers sob demanda: o módulo de cada router (com seus DTOs, dependências e a
+# criação dos modelos de validação de cada rota) só é importado na primeira requisição a um caminho
+# que ele atende, o que encurta a inicialização de um worker novo. A documentação (/docs,
+# /openapi.json) carrega todos, para que o schema gerado fique completo.
+
+_DOCS_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+class LazyRouters:
+    def __init__(self, app: FastAPI, routers: dict[str, tuple[str, str]]):
+        self.app = app
+        self.routers = routers  # Prefixo do caminho -> (módulo, nome do router)
+        self._loaded: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def _load(self, router: tuple[str, str]):
+        with self._lock:
+            if router in self._loaded:
+                return
+            module_name, attribute = router
+            self.app.include_router(getattr(importlib.import_module(module_name), attribute))
+            self._loaded.add(router)
+
+    def load_all(self):
+        for router in self.routers.values():
+            self._load(router)
+
+    def load_for_path(self, path: str):
+        if path.startswith(_DOCS_PATHS):
+            self.load_all()
+            return
+        for prefix, router in self.routers.items():
+            if router not in self._loaded and (path == prefix or path.startswith(prefix + "/")):
+                self._load(router)
@@ -0,0 +1,146 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+# Métricas por rota no formato texto do Prometheus (GET /metrics), sem dependências externas:
+# latência das requisições e, para cada requisição, quantos comandos SQL foram executados,
+# quanto tempo passaram no banco, quantas linhas as consultas retornaram e quantas linhas foram
+# alteradas (INSERT, UPDATE, DELETE). Um aumento na
+# quantidade de comandos por requisição de uma rota costuma indicar consultas N+1.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Contadores de banco da requisição em andamento (None fora de uma requisição)
+_request_db_stats: ContextVar[Optional[dict]] = ContextVar("request_db_stats", default=None)
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # O último é o +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: dict[tuple, int] = {}  # (method, route, status) -> requisições
+        self._latency: dict[tuple, _Histogram] = {}  # (method, route) -> segundos
+        self._statements: dict[tuple, _Histogram] = {}  # (method, route) -> comandos SQL por requisição
+        self._db_seconds: dict[tuple, float] = {}
+        self._db_rows: dict[tuple, int] = {}  # Linhas retornadas pelas consultas
+        self._db_rows_affected: dict[tuple, int] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, db_stats: dict):
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, str(status))] = self._requests.get((method, route, str(status)), 0) + 1
+            self._latency.setdefault(key, _Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self._statements.setdefault(key, _Histogram(STATEMENT_BUCKETS)).observe(db_stats["statements"])
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + db_stats["seconds"]
+            self._db_rows[key] = self._db_rows.get(key, 0) + db_stats["rows"]
+            self._db_rows_affected[key] = self._db_rows_affected.get(key, 0) + db_stats["rows_affected"]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            _render_counter(lines, "http_requests_total", "Requests per route and status code.", ("method", "route", "status"), self._requests)
+            _render_histogram(lines, "http_request_duration_seconds", "Request latency per route.", self._latency)
+            _render_histogram(lines, "http_request_db_statements", "SQL statements executed per request.", self._statements)
+            _render_counter(lines, "http_request_db_seconds_total", "Time spent executing SQL per route.", ("method", "route"), self._db_seconds)
+            _render_counter(lines, "http_request_db_rows_total", "Rows returned by ORM queries per route.", ("method", "route"), self._db_rows)
+            _render_counter(lines, "http_request_db_rows_affected_total", "Rows inserted, updated or deleted by SQL per route.", ("method", "route"), self._db_rows_affected)
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+def _render_counter(lines: list, name: str, help_text: str, label_names: tuple, values: dict):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+
+def _render_histogram(lines: list, name: str, help_text: str, histograms: dict):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    label_names = ("method", "route")
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            bucket_labels = _labels(label_names, labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        bucket_labels = _labels(label_names, labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{bucket_labels} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {histogram.count}")
+
+metrics_registry = MetricsRegistry()
+
+# Inicia a contagem de banco da requisição atual e devolve o dicionário que os eventos do engine preenchem
+def start_request_db_stats() -> dict:
+    stats = {"statements": 0, "seconds": 0.0, "rows": 0, "rows_affected": 0}
+    _request_db_stats.set(stats)
+    return stats
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_query_start"].pop()
+    stats = _request_db_stats.get()
+    if stats is None:
+        return
+
+    stats["statements"] += 1
+    stats["seconds"] += time.perf_counter() - started
+    # Linhas alteradas: o rowcount do DB-API é definido para INSERT/UPDATE/DELETE em todos os drivers.
+    # As linhas retornadas pelos SELECT são contadas no resultado, por _count_returned_rows.
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        stats["rows_affected"] += cursor.rowcount
+
+# Linhas retornadas pelas consultas feitas pelas sessões do ORM. Sem streaming o resultado já é
+# lido inteiro do banco na execução, então congelá-lo para contar as linhas não custa uma leitura a
+# mais; quem executou recebe uma cópia equivalente do resultado. Consultas em streaming (yield_per,
+# como nas exportações) não são contadas, para não carregar tudo em memória.
+def _count_returned_rows(orm_execute_state):
+    stats = _request_db_stats.get()
+    if stats is None or not orm_execute_state.is_select:
+        return None
+    options = orm_execute_state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None
+
+    frozen = orm_execute_state.invoke_statement().freeze()
+    stats["rows"] += len(frozen.data)
+    return frozen()
+
+# Registra os eventos que medem cada comando SQL executado pelo engine
+def instrument_engine(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(OrmSession, "do_orm_execute", _count_returned_rows):
+        event.listen(OrmSession, "do_orm_execute", _count_returned_rows)
+
+# Template da rota que atendeu a requisição (ex.: /user/get_by_id/{user_id}), para não criar uma
+# série por ID. Requisições que não casaram com nenhuma rota ficam agrupadas.
+def route_template(request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -1,22 +1,112 @@
+import base64
+import json
+from datetime import date, datetime
 from typing import Generic, TypeVar, List, Optional
-from pydantic import BaseModel
-from fastapi import Query
+from pydantic import BaseModel, model_validator
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.total_mode import total_mode
 
-T = TypeVar('T') 
+T = TypeVar('T')
 
 class PaginationParams(BaseModel):
     page: int = Query(1, ge=1, description="Number of the page")
     per_page: int = Query(10, ge=1, le=100, description="Number of items per page")
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page (keyset mode, ignores page)")
+    total: total_mode = Query(total_mode.exact, description="How to compute the total: exact (cached count), approx (planner estimate) or none")
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T] # List of items in the current page
-    total: int # Total number of items across all pages
+    total: Optional[int] # Total number of items across all pages, None when total=none
     page: int # Current page number
     per_page: int # Number of items per page
-    total_pages: int # Total number of pages
+    total_pages: Optional[int] = None # Total number of pages, derived from total
+    next_cursor: Optional[str] = None # Cursor for the next page, None when this is the last one
+    has_more: bool = False # Whether there is a next page, derived from next_cursor
 
-    @property
-    def total_pages(self) -> int:
-        if self.per_page == 0:
-            return 0
-        return (self.total + self.per_page - 1) // self.per_page
\ No newline at end of file
+    @model_validator(mode="after")
+    def _derive_page_info(self):
+        if self.total_pages is None and self.total is not None and self.per_page > 0:
+            self.total_pages = (self.total + self.per_page - 1) // self.per_page
+        self.has_more = self.next_cursor is not None
+        return self
+
+def encode_cursor(values: list) -> str:
+    # Datas não são serializáveis em JSON, então vão como string ISO
+    serializable = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(serializable, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, key_columns: tuple) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(key_columns):
+            raise ValueError("cursor does not match the sort key")
+
+        # Converte de volta as datas de acordo com o tipo da coluna
+        decoded = []
+        for column, value in zip(key_columns, values):
+            python_type = column.type.python_type
+            if value is not None and python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+# Valor de uma coluna de ordenação no item. Em consultas com mais de uma entidade
+# (ex.: select(User, PhysicalRecord)) o item é uma linha e o valor vem da entidade da tabela da coluna.
+def _key_value(item, column):
+    if hasattr(item, "_fields") and not hasattr(item, column.key):
+        for element in item:
+            if getattr(element, "__table__", None) is column.table:
+                return getattr(element, column.key)
+    return getattr(item, column.key)
+
+# Executa a consulta paginada. Sem cursor usa OFFSET (modo antigo, por página); com cursor (after)
+# usa keyset, filtrando pelas colunas de ordenação a partir do último item da página anterior.
+# A última coluna de key_columns deve ser única (normalmente a chave primária).
+async def paginate(session: AsyncSession, statement, pagination: PaginationParams, *key_columns) -> tuple[list, Optional[str]]:
+    statement = statement.order_by(*key_columns)
+
+    if pagination.after:
+        values = decode_cursor(pagination.after, key_columns)
+        if len(key_columns) == 1:
+            statement = statement.where(key_columns[0] > values[0])
+        else:
+            statement = statement.where(tuple_(*key_columns) > tuple_(*values))
+    else:
+        statement = statement.offset((pagination.page-1) * pagination.per_page)
+
+    # Busca um item a mais só para saber se existe uma próxima página
+    items = list((await session.exec(statement.limit(pagination.per_page + 1))).all())
+
+    next_cursor = None
+    if len(items) > pagination.per_page:
+        items = items[:pagination.per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([_key_value(last, column) for column in key_columns])
+
+    return items, next_cursor
+
+# Mesma paginação de paginate, aplicada a uma lista já carregada em memória (ex.: catálogos em cache)
+def paginate_list(items: list, pagination: PaginationParams, *key_columns) -> tuple[list, Optional[str]]:
+    def sort_key(item):
+        return tuple(getattr(item, column.key) for column in key_columns)
+
+    items = sorted(items, key=sort_key)
+
+    if pagination.after:
+        values = tuple(decode_cursor(pagination.after, key_columns))
+        items = [item for item in items if sort_key(item) > values]
+    else:
+        items = items[(pagination.page-1) * pagination.per_page:]
+
+    page_items = items[:pagination.per_page]
+    next_cursor = None
+    if len(items) > pagination.per_page:
+        next_cursor = encode_cursor(list(sort_key(page_items[-1])))
+
+    return page_items, next_cursor
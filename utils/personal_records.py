@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, NamedTuple
+from sqlalchemy import and_, case, or_, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dtos.executed_daily_training.new_personal_record import new_personal_record
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from models.personal_record import PersonalRecord
+
+REBUILD_CHUNK_ROWS = 5000
+
+# Um exercício executado, com o usuário e a data do treino a que pertence
+class Execution(NamedTuple):
+    user_id: int
+    exercise_id: int
+    weight_used: float
+    reps_done: int
+    training_date: date
+
+# 1RM estimado pela fórmula de Epley (com uma repetição, o próprio peso)
+def estimated_1rm(weight: float, reps: int) -> float:
+    if reps <= 1:
+        return round(weight, 2)
+    return round(weight * (1 + reps / 30), 2)
+
+# Um valor supera o recorde se for maior, ou igual e alcançado antes (o recorde guarda a primeira vez)
+def _beats(value: float, value_date: date, best: float, best_date: date) -> bool:
+    return value > best or (value == best and value_date < best_date)
+
+# Melhores valores por (usuário, exercício): [peso, data, 1RM estimado, data].
+# Com bests informado, as execuções são comparadas com os valores já acumulados nele.
+def _bests(executions: Iterable[Execution], bests: dict[tuple[int, int], list] = None) -> dict[tuple[int, int], list]:
+    bests = {} if bests is None else bests
+    for execution in executions:
+        one_rm = estimated_1rm(execution.weight_used, execution.reps_done)
+        best = bests.get((execution.user_id, execution.exercise_id))
+        if best is None:
+            bests[(execution.user_id, execution.exercise_id)] = [execution.weight_used, execution.training_date, one_rm, execution.training_date]
+            continue
+        if _beats(execution.weight_used, execution.training_date, best[0], best[1]):
+            best[0:2] = [execution.weight_used, execution.training_date]
+        if _beats(one_rm, execution.training_date, best[2], best[3]):
+            best[2:4] = [one_rm, execution.training_date]
+    return bests
+
+def _rows(bests: dict[tuple[int, int], list]) -> list[dict]:
+    return [
+        {
+            "user_id": user_id,
+            "exercise_id": exercise_id,
+            "best_weight": weight,
+            "best_weight_date": weight_date,
+            "best_estimated_1rm": one_rm,
+            "best_estimated_1rm_date": one_rm_date,
+        }
+        for (user_id, exercise_id), (weight, weight_date, one_rm, one_rm_date) in bests.items()
+    ]
+
+# Soma execuções novas aos recordes com um único INSERT ... ON CONFLICT DO UPDATE em lote; a comparação
+# com o recorde atual é feita pelo banco, então escritas concorrentes não perdem recordes.
+# Retorna os recordes batidos por essas execuções. Quem chama é responsável pelo commit.
+async def update_personal_records(session: AsyncSession, executions: Iterable[Execution]) -> list[new_personal_record]:
+    bests = _bests(executions)
+    if not bests:
+        return []
+
+    # Recordes atuais, só para informar quais foram batidos
+    current = {}
+    for user_id in {user_id for user_id, _ in bests}:
+        exercise_ids = [exercise_id for key_user_id, exercise_id in bests if key_user_id == user_id]
+        records = (await session.exec(select(
+            PersonalRecord.exercise_id, PersonalRecord.best_weight, PersonalRecord.best_weight_date,
+            PersonalRecord.best_estimated_1rm, PersonalRecord.best_estimated_1rm_date,
+        ).where(PersonalRecord.user_id == user_id, PersonalRecord.exercise_id.in_(exercise_ids)))).all()
+        current.update({(user_id, record[0]): list(record[1:]) for record in records})
+
+    new_records: list[new_personal_record] = []
+    for key, (weight, weight_date, one_rm, one_rm_date) in bests.items():
+        record = current.get(key)
+        if record is None or _beats(weight, weight_date, record[0], record[1]):
+            new_records.append(new_personal_record(exercise_id=key[1], record="weight", value=weight, previous_value=None if record is None else record[0]))
+        if record is None or _beats(one_rm, one_rm_date, record[2], record[3]):
+            new_records.append(new_personal_record(exercise_id=key[1], record="estimated_1rm", value=one_rm, previous_value=None if record is None else record[2]))
+
+    dialect = session.get_bind().dialect.name
+    upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    statement = upsert(PersonalRecord)
+    excluded = statement.excluded
+    weight_wins = or_(
+        excluded.best_weight > PersonalRecord.best_weight,
+        and_(excluded.best_weight == PersonalRecord.best_weight, excluded.best_weight_date < PersonalRecord.best_weight_date),
+    )
+    one_rm_wins = or_(
+        excluded.best_estimated_1rm > PersonalRecord.best_estimated_1rm,
+        and_(excluded.best_estimated_1rm == PersonalRecord.best_estimated_1rm, excluded.best_estimated_1rm_date < PersonalRecord.best_estimated_1rm_date),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "exercise_id"],
+        set_={
+            "best_weight": case((weight_wins, excluded.best_weight), else_=PersonalRecord.best_weight),
+            "best_weight_date": case((weight_wins, excluded.best_weight_date), else_=PersonalRecord.best_weight_date),
+            "best_estimated_1rm": case((one_rm_wins, excluded.best_estimated_1rm), else_=PersonalRecord.best_estimated_1rm),
+            "best_estimated_1rm_date": case((one_rm_wins, excluded.best_estimated_1rm_date), else_=PersonalRecord.best_estimated_1rm_date),
+        },
+    )
+    await session.exec(statement, params=_rows(bests))
+    return new_records
+
+def _executions_statement():
+    return (
+        select(
+            ExecutedDailyTraining.user_id,
+            ExecutedExercise.id_exercise,
+            ExecutedExercise.weight_used,
+            ExecutedExercise.reps_done,
+            ExecutedDailyTraining.training_date,
+        )
+        .join(ExecutedDailyTraining, ExecutedExercise.daily_training_id == ExecutedDailyTraining.id)
+    )
+
+# Recalcula os recordes de (usuário, exercício) a partir do histórico, depois que execuções foram
+# removidas ou alteradas (um recorde removido não pode ser desfeito por comparação).
+# Quem chama é responsável pelo commit.
+async def recompute_personal_records(session: AsyncSession, keys: Iterable[tuple[int, int]]):
+    exercise_ids_by_user: dict[int, set[int]] = defaultdict(set)
+    for user_id, exercise_id in keys:
+        exercise_ids_by_user[user_id].add(exercise_id)
+
+    for user_id, exercise_ids in exercise_ids_by_user.items():
+        rows = (await session.exec(_executions_statement().where(
+            ExecutedDailyTraining.user_id == user_id, ExecutedExercise.id_exercise.in_(exercise_ids)
+        ))).all()
+
+        await session.exec(delete(PersonalRecord).where(
+            PersonalRecord.user_id == user_id, PersonalRecord.exercise_id.in_(exercise_ids)
+        ))
+        # Exercícios sem nenhuma execução restante ficam sem recorde
+        records = _rows(_bests(Execution(*row) for row in rows))
+        if records:
+            await session.exec(insert(PersonalRecord), params=records)
+
+async def delete_user_personal_records(session: AsyncSession, user_id: int):
+    await session.exec(delete(PersonalRecord).where(PersonalRecord.user_id == user_id))
+
+async def delete_exercise_personal_records(session: AsyncSession, exercise_id: int):
+    await session.exec(delete(PersonalRecord).where(PersonalRecord.exercise_id == exercise_id))
+
+# Recalcula todos os recordes a partir de ExecutedExercise (backfill). As execuções são lidas em lotes.
+# Retorna a quantidade de recordes gravados. Quem chama é responsável pelo commit.
+async def rebuild_personal_records(session: AsyncSession) -> int:
+    if session.get_bind().dialect.name == "postgresql":
+        # Escritas concorrentes esperam o commit e então comparam suas execuções com os recordes recalculados
+        await session.exec(text(f"LOCK TABLE {PersonalRecord.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+    await session.exec(delete(PersonalRecord))
+
+    bests: dict[tuple[int, int], list] = {}
+    result = await session.stream(_executions_statement().execution_options(yield_per=REBUILD_CHUNK_ROWS))
+    async for partition in result.partitions():
+        _bests((Execution(*row) for row in partition), bests)
+
+    rows = _rows(bests)
+    for start in range(0, len(rows), REBUILD_CHUNK_ROWS):
+        await session.exec(insert(PersonalRecord), params=rows[start:start + REBUILD_CHUNK_ROWS])
+    return len(rows)
@@ -0,0 +1,7 @@
+from enum import Enum
+
+class physical_record_metric(Enum):
+    weight = 'weight'
+    height = 'height'
+    body_fat_percentage = 'body_fat_percentage'
+    muscle_mass_percentage = 'muscle_mass_percentage'
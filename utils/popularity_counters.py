@@ -0,0 +1,75 @@
+from collections import Counter
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.executed_exercise import ExecutedExercise
+from models.models_links import TrainingSheetWeekUserLink
+from models.popularity_counters import ExerciseExecutionCount, TrainingSheetUserCount
+
+# Soma deltas aos contadores com um único INSERT ... ON CONFLICT DO UPDATE em lote.
+# O incremento é feito pelo banco (count = count + delta), então escritas concorrentes não se perdem.
+async def _add_deltas(session: AsyncSession, model, key_column: str, count_column: str, deltas: Counter):
+    rows = [{key_column: key, count_column: delta} for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    dialect = session.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    statement = insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=[key_column],
+        set_={count_column: getattr(model, count_column) + statement.excluded[count_column]},
+    )
+    await session.exec(statement, params=rows)
+
+# Atualiza o contador de execuções. added/removed são os id_exercise dos ExecutedExercise inseridos/removidos.
+async def update_exercise_execution_counts(session: AsyncSession, added: Iterable[int] = (), removed: Iterable[int] = ()):
+    deltas = Counter(added)
+    deltas.subtract(Counter(removed))
+    await _add_deltas(session, ExerciseExecutionCount, "exercise_id", "execution_count", deltas)
+
+# Atualiza o contador de usuários. added/removed são os training_sheet_week_id das associações criadas/removidas.
+async def update_training_sheet_user_counts(session: AsyncSession, added: Iterable[int] = (), removed: Iterable[int] = ()):
+    deltas = Counter(added)
+    deltas.subtract(Counter(removed))
+    await _add_deltas(session, TrainingSheetUserCount, "training_sheet_week_id", "user_count", deltas)
+
+async def _reconcile(session: AsyncSession, model, key_column: str, count_column: str, actual_statement) -> int:
+    actual = dict((await session.exec(actual_statement)).all())
+    stored = dict((await session.exec(select(getattr(model, key_column), getattr(model, count_column)))).all())
+
+    # Só os contadores divergentes são corrigidos
+    deltas = Counter({key: count - stored.get(key, 0) for key, count in actual.items()})
+    orphans = [key for key in stored if key not in actual and stored[key] != 0]
+    deltas.update({key: -stored[key] for key in orphans})
+
+    await _add_deltas(session, model, key_column, count_column, deltas)
+    return sum(1 for delta in deltas.values() if delta)
+
+# Recalcula os contadores a partir de ExecutedExercise e TrainingSheetWeekUserLink, corrigindo desvios.
+# Retorna quantos contadores de cada tipo foram corrigidos. Quem chama é responsável pelo commit.
+async def reconcile_counters(session: AsyncSession) -> dict[str, int]:
+    if session.get_bind().dialect.name == "postgresql":
+        # Bloqueia escritas nos contadores até o commit, para que nenhuma transação concorrente
+        # altere os contadores entre a leitura das tabelas de origem e a correção
+        await session.exec(text(f"LOCK TABLE {ExerciseExecutionCount.__tablename__}, {TrainingSheetUserCount.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+    exercises = await _reconcile(
+        session, ExerciseExecutionCount, "exercise_id", "execution_count",
+        select(ExecutedExercise.id_exercise, func.count(ExecutedExercise.id)).group_by(ExecutedExercise.id_exercise),
+    )
+    training_sheets = await _reconcile(
+        session, TrainingSheetUserCount, "training_sheet_week_id", "user_count",
+        select(TrainingSheetWeekUserLink.training_sheet_week_id, func.count(TrainingSheetWeekUserLink.user_id)).group_by(TrainingSheetWeekUserLink.training_sheet_week_id),
+    )
+    return {"exercises": exercises, "training_sheets": training_sheets}
+
+# Remove os contadores de um exercício ou ficha que está sendo excluído (a FK impediria a exclusão)
+async def delete_exercise_counter(session: AsyncSession, exercise_id: int):
+    await session.exec(delete(ExerciseExecutionCount).where(ExerciseExecutionCount.exercise_id == exercise_id))
+
+async def delete_training_sheet_counter(session: AsyncSession, training_sheet_week_id: int):
+    await session.exec(delete(TrainingSheetUserCount).where(TrainingSheetUserCount.training_sheet_week_id == training_sheet_week_id))
@@ -0,0 +1,5 @@
+from enum import Enum
+
+class progress_period(Enum):
+    week = 'week'
+    month = 'month'
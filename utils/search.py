@@ -0,0 +1,158 @@
+import re
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import Float, column, event, literal_column, table
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.pagination import PaginationParams, decode_cursor, encode_cursor
+
+# Busca textual com ranking e prefixo:
+# - PostgreSQL: coluna tsvector gerada (search_vector) com índice GIN, consultada com to_tsquery + ts_rank
+# - SQLite: tabela virtual FTS5 (<tabela>_fts) mantida por triggers, consultada com MATCH + bm25
+# Os objetos de busca são criados junto com a tabela (create_all) e pela migração correspondente, que
+# guarda uma cópia fixa do DDL: mudanças aqui precisam de uma migração nova (ver tests/test_search_migration.py).
+
+SEARCH_CONFIG = "simple" # Sem stemming: a busca por prefixo já cobre plurais e variações simples
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+# Pesos do bm25 equivalentes aos pesos A-D do ts_rank
+_BM25_WEIGHTS = {"A": 10.0, "B": 4.0, "C": 2.0, "D": 1.0}
+
+# Tabela -> colunas indexadas e seus pesos, na ordem das colunas da FTS5
+_search_indexes: dict[str, dict[str, str]] = {}
+
+def _fts_table_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+def _search_vector_index_name(table_name: str) -> str:
+    return f"ix_{table_name}_{SEARCH_VECTOR_COLUMN}"
+
+def _postgres_ddl(table_name: str, columns: dict[str, str]) -> list[str]:
+    vector = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({name}, '')), '{weight}')"
+        for name, weight in columns.items()
+    )
+    return [
+        f"ALTER TABLE {table_name} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX {_search_vector_index_name(table_name)} ON {table_name} USING GIN ({SEARCH_VECTOR_COLUMN})",
+    ]
+
+def _sqlite_ddl(table_name: str, columns: dict[str, str]) -> list[str]:
+    fts = _fts_table_name(table_name)
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table_name}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+    ]
+
+# Registra as colunas pesquisáveis de um model (peso "A" a "D", do mais para o menos relevante)
+# e cria os objetos de busca sempre que a tabela for criada pelo metadata.
+def register_search_index(model, columns: dict[str, str]):
+    table_name = model.__tablename__
+    _search_indexes[table_name] = columns
+
+    def _create_search_objects(target, connection, **kw):
+        if connection.dialect.name == "postgresql":
+            statements = _postgres_ddl(table_name, columns)
+        elif connection.dialect.name == "sqlite":
+            statements = _sqlite_ddl(table_name, columns)
+        else:
+            statements = []
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+
+    def _drop_search_objects(target, connection, **kw):
+        # A tabela FTS5 não depende da tabela de conteúdo, então precisa ser removida à parte
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {_fts_table_name(table_name)}")
+
+    event.listen(model.__table__, "after_create", _create_search_objects)
+    event.listen(model.__table__, "before_drop", _drop_search_objects)
+
+# Usado pelo autogenerate do alembic para não tentar remover os objetos de busca,
+# que não fazem parte do metadata
+def is_search_object(name: Optional[str], type_: str) -> bool:
+    if type_ == "column" and name == SEARCH_VECTOR_COLUMN:
+        return True
+    for table_name in _search_indexes:
+        if type_ == "index" and name == _search_vector_index_name(table_name):
+            return True
+        if type_ == "table" and name and name.startswith(_fts_table_name(table_name)):
+            return True
+    return False
+
+def _search_terms(keywords: str) -> list[str]:
+    # Só letras e números: o restante é separador e não pode chegar à sintaxe de consulta do banco
+    terms = re.findall(r"[^\W_]+", keywords.lower())
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query must contain at least one word")
+    return terms
+
+# Subconsulta (id, rank) com os registros que contêm todos os termos, cada um como prefixo de palavra.
+# rank maior significa mais relevante nos dois bancos.
+def _ranked_matches(session: AsyncSession, model, keywords: str):
+    table_name = model.__tablename__
+    columns = _search_indexes[table_name]
+    terms = _search_terms(keywords)
+
+    if session.get_bind().dialect.name == "postgresql":
+        query = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column(f"{table_name}.{SEARCH_VECTOR_COLUMN}")
+        statement = (
+            select(model.id.label("id"), func.ts_rank(vector, query, type_=Float).label("rank"))
+            .where(vector.op("@@")(query))
+        )
+    else:
+        fts_name = _fts_table_name(table_name)
+        fts = table(fts_name, column("rowid"), column(fts_name))
+        weights = [_BM25_WEIGHTS[weight] for weight in columns.values()]
+        # bm25 é negativo e menor para os mais relevantes
+        statement = (
+            select(fts.c.rowid.label("id"), (-func.bm25(literal_column(fts_name), *weights, type_=Float)).label("rank"))
+            .where(fts.c[fts_name].match(" ".join(f'"{term}"*' for term in terms)))
+        )
+    return statement.subquery(f"{table_name}_search")
+
+# Condição para usar a busca textual como filtro (e na contagem de totais)
+def search_condition(session: AsyncSession, model, keywords: str):
+    matches = _ranked_matches(session, model, keywords)
+    return model.id.in_(select(matches.c.id))
+
+# Executa a busca paginada, ordenada por relevância. Como paginate, usa OFFSET sem cursor e keyset
+# (rank, id) com cursor, retornando os itens da página e o cursor da próxima.
+async def search(session: AsyncSession, model, keywords: str, pagination: PaginationParams) -> tuple[list, Optional[str]]:
+    matches = _ranked_matches(session, model, keywords)
+    statement = (
+        select(model, matches.c.rank)
+        .join(matches, matches.c.id == model.id)
+        .order_by(matches.c.rank.desc(), model.id)
+    )
+
+    key_columns = (matches.c.rank, model.id)
+    if pagination.after:
+        rank, last_id = decode_cursor(pagination.after, key_columns)
+        statement = statement.where(
+            (matches.c.rank < rank) | ((matches.c.rank == rank) & (model.id > last_id))
+        )
+    else:
+        statement = statement.offset((pagination.page-1) * pagination.per_page)
+
+    # Busca um item a mais só para saber se existe uma próxima página
+    rows = (await session.exec(statement.limit(pagination.per_page + 1))).all()
+
+    next_cursor = None
+    if len(rows) > pagination.per_page:
+        rows = rows[:pagination.per_page]
+        last, rank = rows[-1]
+        next_cursor = encode_cursor([rank, last.id])
+
+    return [item for item, _ in rows], next_cursor
@@ -0,0 +1,6 @@
+from enum import Enum
+
+class total_mode(Enum):
+    exact = 'exact'
+    approx = 'approx'
+    none = 'none'
\ No newline at end of file
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import and_, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.total_mode import total_mode
+
+# Tempo máximo que uma contagem fica em cache. A invalidação por escrita só enxerga o
+# processo atual, então o TTL limita o quanto outro worker pode ficar desatualizado.
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+
+_count_cache: dict[tuple[str, str], tuple[int, float]] = {}
+_count_cache_lock = threading.Lock()
+
+def _filter_key(conditions: list) -> str:
+    # Normaliza o filtro: SQL de cada condição + parâmetros, independente da ordem
+    normalized = []
+    for condition in conditions:
+        compiled = condition.compile()
+        params = sorted((k, repr(v)) for k, v in compiled.params.items())
+        normalized.append(f"{compiled} {params}")
+    return json.dumps(sorted(normalized))
+
+def invalidate_counts(table_name: str):
+    with _count_cache_lock:
+        for key in [key for key in _count_cache if key[0] == table_name]:
+            del _count_cache[key]
+
+async def _exact_count(session: AsyncSession, model, conditions: list) -> int:
+    key = (model.__tablename__, _filter_key(conditions))
+    now = time.monotonic()
+
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    count_stmt = select(func.count()).select_from(model)
+    if conditions:
+        count_stmt = count_stmt.where(*conditions)
+    total = (await session.exec(count_stmt)).one()
+
+    with _count_cache_lock:
+        _count_cache[key] = (total, now + COUNT_CACHE_TTL)
+    return total
+
+async def _planner_estimate(session: AsyncSession, model, conditions: list) -> Optional[int]:
+    # Só o PostgreSQL expõe estimativas do planner; nos outros bancos cai para a contagem exata
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+
+    if not conditions:
+        reltuples = (await session.exec(
+            text("SELECT reltuples FROM pg_class WHERE relname = :table_name AND relkind = 'r'"),
+            params={"table_name": model.__tablename__}
+        )).scalar()
+        # reltuples é -1 (ou 0) enquanto a tabela nunca foi analisada
+        if reltuples is None or reltuples < 1:
+            return None
+        return int(reltuples)
+
+    statement = select(model.id).where(and_(*conditions))
+    try:
+        compiled = statement.compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    except Exception:
+        return None
+    plan = (await session.exec(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+# Total de registros de model que satisfazem conditions, de acordo com o modo pedido:
+# exact (contagem em cache, invalidada nas escritas), approx (estimativa do planner) ou none.
+async def count_total(session: AsyncSession, model, conditions: list, mode: total_mode = total_mode.exact) -> Optional[int]:
+    if mode == total_mode.none:
+        return None
+
+    if mode == total_mode.approx:
+        estimate = await _planner_estimate(session, model, conditions)
+        if estimate is not None:
+            return estimate
+
+    return await _exact_count(session, model, conditions)
+
+# Registra as tabelas alteradas durante a sessão e invalida as contagens delas quando a transação é confirmada
+def _written_tables(session: OrmSession) -> set:
+    return session.info.setdefault("written_tables", set())
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_written_tables(session):
+    for table in session.info.pop("written_tables", set()):
+        invalidate_counts(table)
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_written_tables(session):
+    session.info.pop("written_tables", None)
@@ -0,0 +1,55 @@
+from collections import defaultdict
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dtos.training_sheet.training_sheet_day_responde import TrainingSheetDayResponse
+from dtos.training_sheet.training_sheet_week_response import TrainingSheetWeekResponse
+from models.models_links import TrainingSheetDayExerciseLink
+from models.training_sheet_day import TrainingSheetDay
+from models.training_sheet_week import TrainingSheetWeek
+
+# Monta os TrainingSheetWeekResponse de uma lista de semanas com um número fixo de consultas:
+# uma para os dias de todas as semanas e outra para os links (ordenados) de todos os dias.
+async def build_training_sheet_week_responses(session: AsyncSession, training_sheet_weeks: list[TrainingSheetWeek]) -> list[TrainingSheetWeekResponse]:
+    if not training_sheet_weeks:
+        return []
+
+    week_ids = [week.id for week in training_sheet_weeks]
+
+    # Obtendo os dias de treino de todas as semanas de uma vez
+    days_statement = (
+        select(TrainingSheetDay)
+        .where(TrainingSheetDay.training_sheet_week_id.in_(week_ids))
+        .order_by(TrainingSheetDay.id)
+    )
+    training_sheet_days = (await session.exec(days_statement)).all()
+
+    # Obtendo os exercícios de todos os dias de uma vez, já na ordem definida na ficha
+    exercise_ids_by_day: dict[int, list[int]] = defaultdict(list)
+    day_ids = [day.id for day in training_sheet_days]
+    if day_ids:
+        links_statement = (
+            select(TrainingSheetDayExerciseLink.training_sheet_day_id, TrainingSheetDayExerciseLink.exercise_id)
+            .where(TrainingSheetDayExerciseLink.training_sheet_day_id.in_(day_ids))
+            .order_by(TrainingSheetDayExerciseLink.training_sheet_day_id, TrainingSheetDayExerciseLink.order)
+        )
+        for day_id, exercise_id in (await session.exec(links_statement)).all():
+            exercise_ids_by_day[day_id].append(exercise_id)
+
+    # Agrupando os dias por semana
+    days_response_by_week: dict[int, list[TrainingSheetDayResponse]] = defaultdict(list)
+    for day in training_sheet_days:
+        days_response_by_week[day.training_sheet_week_id].append(TrainingSheetDayResponse(
+            focus_area=day.focus_area,
+            day_of_week=day.day_of_week,
+            exercises_ids=exercise_ids_by_day[day.id]
+        ))
+
+    return [
+        TrainingSheetWeekResponse(
+            id=week.id,
+            name=week.name,
+            description=week.description,
+            level=week.level,
+            training_sheet_days=days_response_by_week[week.id]
+        ) for week in training_sheet_weeks
+    ]
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import delete, func, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.executed_daily_training import ExecutedDailyTraining
+from models.executed_exercise import ExecutedExercise
+from models.training_volume_rollup import TrainingVolumeRollup
+from utils.progress_period import progress_period
+
+REBUILD_CHUNK_ROWS = 5000
+
+# Contribuição de um treino para os totais: quem chama informa os treinos inseridos (added)
+# e os removidos (removed); uma alteração é a remoção dos valores antigos mais a inclusão dos novos
+class TrainingContribution(NamedTuple):
+    user_id: int
+    training_date: date
+    total_duration: int
+    volume: float
+
+# exercises: qualquer objeto com sets_done, reps_done e weight_used (ExecutedExercise ou executed_exercise_dto)
+def training_contribution(user_id: int, training_date: date, total_duration: int, exercises: Iterable) -> TrainingContribution:
+    volume = sum(ex.sets_done * ex.reps_done * ex.weight_used for ex in exercises)
+    return TrainingContribution(user_id, training_date, total_duration, volume)
+
+def period_start(period: progress_period, training_date: date) -> date:
+    if period == progress_period.week:
+        return training_date - timedelta(days=training_date.weekday())
+    return training_date.replace(day=1)
+
+def _accumulate(deltas: dict, contribution: TrainingContribution, sign: int):
+    for period in progress_period:
+        key = (contribution.user_id, period.value, period_start(period, contribution.training_date))
+        delta = deltas[key]
+        delta[0] += sign * contribution.volume
+        delta[1] += sign
+        delta[2] += sign * contribution.total_duration
+
+def _rows(deltas: dict) -> list[dict]:
+    return [
+        {"user_id": user_id, "period": period, "period_start": start, "volume": volume, "session_count": sessions, "total_duration": duration}
+        for (user_id, period, start), (volume, sessions, duration) in deltas.items()
+    ]
+
+# Soma as contribuições aos totais com um único INSERT ... ON CONFLICT DO UPDATE em lote.
+# Períodos que ficam sem treinos são removidos. Quem chama é responsável pelo commit.
+async def update_training_volume_rollups(session: AsyncSession, added: Iterable[TrainingContribution] = (), removed: Iterable[TrainingContribution] = ()):
+    deltas = defaultdict(lambda: [0.0, 0, 0])
+    for contribution in added:
+        _accumulate(deltas, contribution, 1)
+    for contribution in removed:
+        _accumulate(deltas, contribution, -1)
+
+    # Uma alteração que não muda data, duração nem volume se anula
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    dialect = session.get_bind().dialect.name
+    upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    statement = upsert(TrainingVolumeRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "period", "period_start"],
+        set_={
+            "volume": TrainingVolumeRollup.volume + statement.excluded.volume,
+            "session_count": TrainingVolumeRollup.session_count + statement.excluded.session_count,
+            "total_duration": TrainingVolumeRollup.total_duration + statement.excluded.total_duration,
+        },
+    )
+    await session.exec(statement, params=_rows(deltas))
+
+    for user_id, period, start in [key for key, delta in deltas.items() if delta[1] < 0]:
+        await session.exec(delete(TrainingVolumeRollup).where(
+            TrainingVolumeRollup.user_id == user_id,
+            TrainingVolumeRollup.period == period,
+            TrainingVolumeRollup.period_start == start,
+            TrainingVolumeRollup.session_count <= 0,
+        ))
+
+async def delete_user_training_volume_rollups(session: AsyncSession, user_id: int):
+    await session.exec(delete(TrainingVolumeRollup).where(TrainingVolumeRollup.user_id == user_id))
+
+# Recalcula todos os totais a partir de ExecutedDailyTraining e ExecutedExercise (backfill).
+# O volume de cada treino é somado no banco e os treinos são lidos em lotes.
+# Retorna a quantidade de linhas gravadas. Quem chama é responsável pelo commit.
+async def rebuild_training_volume_rollups(session: AsyncSession) -> int:
+    if session.get_bind().dialect.name == "postgresql":
+        # Escritas concorrentes esperam o commit e então aplicam seus deltas sobre os totais recalculados
+        await session.exec(text(f"LOCK TABLE {TrainingVolumeRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+    await session.exec(delete(TrainingVolumeRollup))
+
+    statement = (
+        select(
+            ExecutedDailyTraining.user_id,
+            ExecutedDailyTraining.training_date,
+            ExecutedDailyTraining.total_duration,
+            func.coalesce(func.sum(ExecutedExercise.sets_done * ExecutedExercise.reps_done * ExecutedExercise.weight_used), 0.0),
+        )
+        .outerjoin(ExecutedExercise, ExecutedExercise.daily_training_id == ExecutedDailyTraining.id)
+        .group_by(ExecutedDailyTraining.id)
+        .execution_options(yield_per=REBUILD_CHUNK_ROWS)
+    )
+
+    deltas = defaultdict(lambda: [0.0, 0, 0])
+    result = await session.stream(statement)
+    async for partition in result.partitions():
+        for user_id, training_date, total_duration, volume in partition:
+            _accumulate(deltas, TrainingContribution(user_id, training_date, total_duration, volume), 1)
+
+    rows = _rows(deltas)
+    for start in range(0, len(rows), REBUILD_CHUNK_ROWS):
+        await session.exec(insert(TrainingVolumeRollup), params=rows[start:start + REBUILD_CHUNK_ROWS])
+    return len(rows)